@@ -1,10 +1,45 @@
 import sys
+import time
+
+# Début du chargement du module, pour --startup-profile
+_import_started = time.perf_counter()
+
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                             QHBoxLayout, QTextEdit, QPushButton, QLabel,
-                             QDialog, QLineEdit, QComboBox, QListWidget)
-from PyQt6.QtCore import Qt
-import requests
+                             QHBoxLayout, QTextEdit, QPlainTextEdit,
+                             QPushButton, QLabel,
+                             QDialog, QLineEdit, QComboBox, QListWidget,
+                             QCheckBox, QDoubleSpinBox, QSpinBox,
+                             QTabWidget, QButtonGroup, QLayout,
+                             QScrollArea, QFrame, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QFileDialog,
+                             QListView)
+from PyQt6.QtCore import (Qt, QTimer, QObject, QEvent, QPoint, QRect, QSize,
+                          QAbstractListModel, QModelIndex, pyqtSignal)
+from PyQt6.QtGui import QTextCursor
+import json
 import os
+from collections import namedtuple
+from itertools import product
+
+import config
+import core
+from cache import ModelCatalog, ResultCache
+from chunking import estimate_tokens
+from cleaning import DEFAULT_CLEANUP_PATTERNS, validate_patterns
+from history import HistoryStore
+from ollama_client import OllamaClient
+from telemetry import TelemetryStore
+from workers import RequestWorker, cancel_all_workers, if_current
+
+_import_finished = time.perf_counter()
+
+# Intervalle de regroupement des tokens affichés au fil de l'eau (ms)
+OUTPUT_FLUSH_MS = 30
+
+
+def qt_length(text):
+    # Positions d'un QTextDocument en unités UTF-16
+    return len(text.encode('utf-16-le')) // 2
 
 # Suppression des messages de debug
 os.environ['QT_LOGGING_RULES'] = '*.debug=false;qt.qpa.*=false'
@@ -18,7 +53,11 @@ os.environ['QT_MAC_WANTS_LAYER'] = '1'
 
 class PromptDialog(QDialog):
 
-    def __init__(self, current_prompt, parent=None):
+    def __init__(self,
+                 current_prompt,
+                 cleanup_patterns=None,
+                 stop_sequences=(),
+                 parent=None):
         super().__init__(parent)
         self.setWindowTitle("Configuration du Prompt")
         self.setStyleSheet("""
@@ -29,7 +68,7 @@ class PromptDialog(QDialog):
                 color: white;
                 font-size: 13px;
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: #3d3d3d;
                 color: white;
                 border: none;
@@ -63,6 +102,35 @@ class PromptDialog(QDialog):
         self.prompt_text.setText(current_prompt)
         layout.addWidget(self.prompt_text)
 
+        # Nettoyage de la réponse : lignes retirées au fil du flux
+        patterns_label = QLabel(
+            "Lignes à retirer (une expression régulière par ligne, "
+            "appliquée en début de ligne):")
+        self.patterns_text = QTextEdit()
+        self.patterns_text.setAcceptRichText(False)
+        self.patterns_text.setMaximumHeight(110)
+        self.patterns_text.setPlainText('\n'.join(
+            DEFAULT_CLEANUP_PATTERNS
+            if cleanup_patterns is None else cleanup_patterns))
+        layout.addWidget(patterns_label)
+        layout.addWidget(self.patterns_text)
+
+        stop_label = QLabel(
+            "Séquences d'arrêt envoyées à Ollama (une par ligne, \\n pour "
+            "un retour à la ligne):")
+        self.stop_text = QTextEdit()
+        self.stop_text.setAcceptRichText(False)
+        self.stop_text.setMaximumHeight(70)
+        self.stop_text.setPlainText('\n'.join(
+            stop.replace('\n', '\\n') for stop in stop_sequences))
+        layout.addWidget(stop_label)
+        layout.addWidget(self.stop_text)
+
+        self.error_label = QLabel()
+        self.error_label.setStyleSheet("color: #ff6b6b;")
+        self.error_label.hide()
+        layout.addWidget(self.error_label)
+
         buttons_layout = QHBoxLayout()
         ok_button = QPushButton("OK")
         cancel_button = QPushButton("Annuler")
@@ -72,11 +140,48 @@ class PromptDialog(QDialog):
         buttons_layout.addWidget(cancel_button)
         layout.addLayout(buttons_layout)
 
+    def cleanup_patterns(self):
+        # None : motifs par défaut, pour garder les clés de cache habituelles
+        patterns = [
+            line for line in self.patterns_text.toPlainText().split('\n')
+            if line.strip()
+        ]
+        return None if patterns == DEFAULT_CLEANUP_PATTERNS else patterns
+
+    def stop_sequences(self):
+        return [
+            line.replace('\\n', '\n')
+            for line in self.stop_text.toPlainText().split('\n')
+            if line.strip()
+        ]
+
+    def accept(self):
+        error = validate_patterns(self.cleanup_patterns() or [])
+        if error is not None:
+            self.error_label.setText(f"Expression invalide : {error}")
+            self.error_label.show()
+            return
+        super().accept()
 
-class SettingsDialog(QDialog):
 
-    def __init__(self, current_url, parent=None):
+class SettingsDialog(QDialog):
+    # Colonnes du tableau d'état des serveurs
+    ENDPOINT_COLUMNS = [
+        "Serveur", "État", "Sonde", "En cours", "Requêtes", "Erreurs", "Moy."
+    ]
+
+    def __init__(self,
+                 current_url,
+                 current_model,
+                 client,
+                 cache=None,
+                 catalog=None,
+                 parent=None):
         super().__init__(parent)
+        self.current_model = current_model
+        self.client = client
+        self.cache = cache
+        self.catalog = catalog or ModelCatalog()
         self.setWindowTitle("Configuration Ollama")
         self.setStyleSheet("""
             QDialog {
@@ -110,6 +215,27 @@ class SettingsDialog(QDialog):
                 image: none;
                 border: none;
             }
+            QListWidget, QTableWidget {
+                background-color: #3d3d3d;
+                color: white;
+                border: none;
+                border-radius: 8px;
+                font-size: 12px;
+            }
+            QHeaderView::section {
+                background-color: #424242;
+                color: white;
+                border: none;
+                padding: 4px;
+            }
+            QDoubleSpinBox {
+                background-color: #3d3d3d;
+                color: white;
+                border: none;
+                border-radius: 8px;
+                padding: 8px;
+                font-size: 13px;
+            }
             QPushButton {
                 background-color: #4CAF50;
                 color: white;
@@ -134,17 +260,100 @@ class SettingsDialog(QDialog):
         self.url_input.setText(current_url)
         layout.addWidget(url_label)
         layout.addWidget(self.url_input)
+        self.url_error_label = QLabel()
+        self.url_error_label.setStyleSheet("color: #ff6b6b;")
+        self.url_error_label.hide()
+        layout.addWidget(self.url_error_label)
+
+        # Serveurs supplémentaires : les requêtes vont au moins chargé
+        extra_urls_label = QLabel("Serveurs supplémentaires:")
+        self.extra_urls_list = QListWidget()
+        self.extra_urls_list.setMaximumHeight(80)
+        for url in client.endpoints.urls[1:]:
+            self.extra_urls_list.addItem(url)
+        extra_url_layout = QHBoxLayout()
+        self.new_url_input = QLineEdit()
+        self.new_url_input.setPlaceholderText("http://autre-serveur:11434")
+        add_url_button = QPushButton("Ajouter")
+        add_url_button.clicked.connect(self.add_extra_url)
+        remove_url_button = QPushButton("Supprimer")
+        remove_url_button.clicked.connect(self.remove_extra_url)
+        extra_url_layout.addWidget(self.new_url_input)
+        extra_url_layout.addWidget(add_url_button)
+        extra_url_layout.addWidget(remove_url_button)
+        layout.addWidget(extra_urls_label)
+        layout.addWidget(self.extra_urls_list)
+        layout.addLayout(extra_url_layout)
 
         # Liste des modèles
         models_label = QLabel("Modèle:")
         self.models_combo = QComboBox()
+        self.models_status_label = QLabel()
         layout.addWidget(models_label)
         layout.addWidget(self.models_combo)
+        layout.addWidget(self.models_status_label)
 
         # Bouton pour rafraîchir la liste des modèles
-        refresh_button = QPushButton("Rafraîchir les modèles")
-        refresh_button.clicked.connect(self.refresh_models)
-        layout.addWidget(refresh_button)
+        refresh_layout = QHBoxLayout()
+        self.refresh_button = QPushButton("Rafraîchir les modèles")
+        self.refresh_button.clicked.connect(self.refresh_models)
+        self.cancel_refresh_button = QPushButton("Annuler")
+        self.cancel_refresh_button.clicked.connect(self.cancel_refresh)
+        self.cancel_refresh_button.hide()
+        refresh_layout.addWidget(self.refresh_button)
+        refresh_layout.addWidget(self.cancel_refresh_button)
+        layout.addLayout(refresh_layout)
+        self.refresh_worker = None
+
+        # Délais réseau
+        timeouts_layout = QHBoxLayout()
+        self.connect_timeout_input = QDoubleSpinBox()
+        self.connect_timeout_input.setRange(0.5, 600)
+        self.connect_timeout_input.setSuffix(" s")
+        self.connect_timeout_input.setValue(client.connect_timeout)
+        self.read_timeout_input = QDoubleSpinBox()
+        self.read_timeout_input.setRange(1, 3600)
+        self.read_timeout_input.setSuffix(" s")
+        self.read_timeout_input.setValue(client.read_timeout)
+        timeouts_layout.addWidget(QLabel("Délai de connexion:"))
+        timeouts_layout.addWidget(self.connect_timeout_input)
+        timeouts_layout.addWidget(QLabel("Délai de lecture:"))
+        timeouts_layout.addWidget(self.read_timeout_input)
+        layout.addLayout(timeouts_layout)
+
+        # Durée de maintien du modèle en mémoire
+        keep_alive_label = QLabel("Maintien du modèle en mémoire (keep_alive):")
+        self.keep_alive_input = QLineEdit()
+        self.keep_alive_input.setText(str(client.keep_alive))
+        self.keep_alive_input.setPlaceholderText("30m, 1h, -1 (illimité)...")
+        layout.addWidget(keep_alive_label)
+        layout.addWidget(self.keep_alive_input)
+
+        # État de chaque serveur, mis à jour par les sondes en arrière-plan
+        self.endpoints_table = QTableWidget(0, len(self.ENDPOINT_COLUMNS))
+        self.endpoints_table.setHorizontalHeaderLabels(self.ENDPOINT_COLUMNS)
+        self.endpoints_table.verticalHeader().hide()
+        header = self.endpoints_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.endpoints_table.setEditTriggers(
+            QTableWidget.EditTrigger.NoEditTriggers)
+        self.endpoints_table.setMinimumHeight(110)
+        layout.addWidget(self.endpoints_table)
+
+        # Latences mesurées par le client partagé et efficacité du cache
+        self.stats_label = QLabel(self.format_stats())
+        self.stats_label.setWordWrap(True)
+        layout.addWidget(self.stats_label)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(1000)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start()
+        self.update_endpoints_table()
+        if cache is not None:
+            clear_cache_button = QPushButton("Vider le cache")
+            clear_cache_button.clicked.connect(self.clear_cache)
+            layout.addWidget(clear_cache_button)
 
         # Boutons OK/Annuler
         buttons_layout = QHBoxLayout()
@@ -156,642 +365,198 @@ class SettingsDialog(QDialog):
         buttons_layout.addWidget(cancel_button)
         layout.addLayout(buttons_layout)
 
-        self.setMinimumWidth(400)
+        self.setMinimumWidth(640)
+
+        # Ouverture immédiate avec la dernière liste connue, puis mise à jour
+        # en arrière-plan
+        self.show_models(self.catalog.get(current_url))
+        self.models_status_label.setText("Liste en cache, mise à jour...")
+        self.url_debounce = QTimer(self)
+        self.url_debounce.setSingleShot(True)
+        self.url_debounce.setInterval(600)
+        self.url_debounce.timeout.connect(self.refresh_models)
+        self.url_input.textEdited.connect(self.on_url_edited)
         self.refresh_models()
 
-    def refresh_models(self):
-        try:
-            response = requests.get(f"{self.url_input.text()}/api/tags")
-            if response.status_code == 200:
-                data = response.json()
-                self.models_combo.clear()
-                for model in data.get('models', []):
-                    self.models_combo.addItem(model['name'], model)
-        except Exception as e:
-            print(f"Erreur lors de la récupération des modèles: {e}")
-
-
-class TagButton(QPushButton):
-
-    def __init__(self, text, parent=None):
-        super().__init__(text, parent)
-        self.setCheckable(True)
-        self.setMinimumHeight(35)
-        self.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.updateStyle()
-
-    def updateStyle(self):
-        if self.isChecked():
-            style = """
-                QPushButton {
-                    background-color: #4CAF50;
-                    color: white;
-                    border: none;
-                    border-radius: 17px;
-                    padding: 5px 20px;
-                    font-size: 13px;
-                }
-                QPushButton:hover {
-                    background-color: #45a049;
-                }
-            """
-        else:
-            style = """
-                QPushButton {
-                    background-color: #424242;
-                    color: white;
-                    border: none;
-                    border-radius: 17px;
-                    padding: 5px 20px;
-                    font-size: 13px;
-                }
-                QPushButton:hover {
-                    background-color: #484848;
-                }
-            """
-        self.setStyleSheet(style)
-
-    def mouseReleaseEvent(self, event):
-        super().mouseReleaseEvent(event)
-        self.updateStyle()
-
-
-class TagManagementDialog(QDialog):
-
-    def __init__(self, current_tags, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Gestion des tags")
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #323232;
-            }
-            QLabel {
-                color: white;
-                font-size: 13px;
-            }
-            QLineEdit {
-                background-color: #3d3d3d;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 8px;
-                font-size: 13px;
-            }
-            QListWidget {
-                background-color: #3d3d3d;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 8px;
-                font-size: 13px;
-            }
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 8px;
-                font-size: 13px;
-                min-height: 35px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
-
-        layout = QVBoxLayout(self)
-        layout.setSpacing(15)
-        layout.setContentsMargins(20, 20, 20, 20)
-
-        # Liste des tags existants
-        self.tags_list = QListWidget()
-        for tag in current_tags:
-            self.tags_list.addItem(tag)
-        layout.addWidget(self.tags_list)
-
-        # Champ pour ajouter un nouveau tag
-        input_layout = QHBoxLayout()
-        self.new_tag_input = QLineEdit()
-        self.new_tag_input.setPlaceholderText("Nouveau tag...")
-        add_button = QPushButton("Ajouter")
-        add_button.clicked.connect(self.add_tag)
-        input_layout.addWidget(self.new_tag_input)
-        input_layout.addWidget(add_button)
-        layout.addLayout(input_layout)
-
-        # Bouton pour supprimer le tag sélectionné
-        delete_button = QPushButton("Supprimer le tag sélectionné")
-        delete_button.clicked.connect(self.delete_tag)
-        layout.addWidget(delete_button)
-
-        # Boutons OK/Annuler
-        buttons = QHBoxLayout()
-        ok_button = QPushButton("OK")
-        cancel_button = QPushButton("Annuler")
-        ok_button.clicked.connect(self.accept)
-        cancel_button.clicked.connect(self.reject)
-        buttons.addWidget(ok_button)
-        buttons.addWidget(cancel_button)
-        layout.addLayout(buttons)
-
-    def add_tag(self):
-        new_tag = self.new_tag_input.text().strip()
-        if new_tag:
-            self.tags_list.addItem(new_tag)
-            self.new_tag_input.clear()
-
-    def delete_tag(self):
-        current_item = self.tags_list.currentItem()
-        if current_item:
-            self.tags_list.takeItem(self.tags_list.row(current_item))
-
-    def get_tags(self):
-        return [
-            self.tags_list.item(i).text()
-            for i in range(self.tags_list.count())
-        ]
-
-
-class TagSection(QWidget):
-
-    def __init__(self, title, tags, parent=None):
-        super().__init__(parent)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #3d3d3d;
-                border-radius: 8px;
-            }
-            QLabel {
-                color: white;
-                font-size: 13px;
-                padding: 5px;
-                background-color: transparent;
-            }
-        """)
-
-        layout = QVBoxLayout(self)
-        layout.setSpacing(10)
-        layout.setContentsMargins(15, 15, 15, 15)
-
-        title_label = QLabel(title)
-        layout.addWidget(title_label)
-
-        tags_container = QWidget()
-        tags_container.setStyleSheet("background-color: transparent;")
-        tags_layout = QHBoxLayout(tags_container)
-        tags_layout.setSpacing(8)
-        tags_layout.setContentsMargins(0, 0, 0, 0)
-
-        self.buttons = []
-        for tag in tags:
-            btn = TagButton(tag)
-            btn.clicked.connect(lambda checked, b=btn: self.handleTagClick(b))
-            self.buttons.append(btn)
-            tags_layout.addWidget(btn)
-
-        # Ajouter le bouton + juste après les tags
-        manage_button = QPushButton("+")
-        manage_button.setFixedSize(30, 30)
-        manage_button.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                border-radius: 15px;
-                font-size: 20px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
-        manage_button.clicked.connect(self.manage_tags)
-        tags_layout.addWidget(manage_button)
-
-        tags_layout.addStretch()
-        layout.addWidget(tags_container)
-
-        # Sélectionner le premier tag par défaut
-        if self.buttons:
-            self.buttons[0].setChecked(True)
-            self.buttons[0].updateStyle()
-
-    def manage_tags(self):
-        current_tags = [btn.text() for btn in self.buttons]
-        dialog = TagManagementDialog(current_tags, self)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            new_tags = dialog.get_tags()
-            # Supprimer les anciens boutons
-            for btn in self.buttons:
-                btn.deleteLater()
-            self.buttons.clear()
-
-            # Créer les nouveaux boutons
-            tags_layout = self.findChild(QHBoxLayout)
-            for tag in new_tags:
-                btn = TagButton(tag)
-                btn.clicked.connect(
-                    lambda checked, b=btn: self.handleTagClick(b))
-                self.buttons.append(btn)
-                tags_layout.addWidget(btn)
-
-            # Sélectionner le premier tag par défaut
-            if self.buttons:
-                self.buttons[0].setChecked(True)
-                self.buttons[0].updateStyle()
-
-    def handleTagClick(self, clicked_button):
-        for button in self.buttons:
-            if button != clicked_button:
-                button.setChecked(False)
-                button.updateStyle()
-        clicked_button.setChecked(True)
-        clicked_button.updateStyle()
-
-    def getSelectedTag(self):
-        for button in self.buttons:
-            if button.isChecked():
-                return button.text()
-        return ""
-
-
-class ReformulatorApp(QMainWindow):
-
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("Reformulateur")
-        self.ollama_url = "http://localhost:11434"
-        self.current_model = "qwen2.5:3b"
-        self.system_prompt = """Tu es un expert en reformulation. Tu dois reformuler le texte selon les paramètres spécifiés par l'utilisateur: ton, format et longueur. IMPORTANT : retourne UNIQUEMENT le texte reformulé, sans aucune mention des paramètres. 
-Respecte scrupuleusement le format demandé, la longueur et le ton. Ne rajoute aucun autre commentaire."""
-
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #323232;
-            }
-            QLabel {
-                color: white;
-                font-size: 13px;
-            }
-            QTextEdit {
-                background-color: #3d3d3d;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 15px;
-                font-size: 13px;
-            }
-            QPushButton#mainButton {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 12px;
-                font-size: 14px;
-                min-height: 45px;
-            }
-            QPushButton#mainButton:hover {
-                background-color: #45a049;
-            }
-        """)
-
-        central_widget = QWidget()
-        self.setCentralWidget(central_widget)
-        layout = QVBoxLayout(central_widget)
-        layout.setSpacing(15)
-        layout.setContentsMargins(20, 20, 20, 20)
-
-        # Boutons de configuration
-        config_layout = QHBoxLayout()
-
-        settings_button = QPushButton("⚙️ Configuration Ollama")
-        settings_button.setObjectName("mainButton")
-        settings_button.clicked.connect(self.open_settings)
-
-        prompt_button = QPushButton("📝 Configuration Prompt")
-        prompt_button.setObjectName("mainButton")
-        prompt_button.clicked.connect(self.open_prompt_config)
-
-        translate_button = QPushButton("🌐 Traduction")
-        translate_button.setObjectName("mainButton")
-        translate_button.clicked.connect(self.open_translation)
-
-        config_layout.addWidget(settings_button)
-        config_layout.addWidget(prompt_button)
-        config_layout.addWidget(translate_button)
-        layout.addLayout(config_layout)
-
-        # Zone de texte d'entrée
-        input_label = QLabel("Entre ton texte à reformuler:")
-        layout.addWidget(input_label)
-
-        self.input_text = QTextEdit()
-        self.input_text.setMinimumHeight(100)
-        self.input_text.setPlaceholderText("Entrez votre texte ici...")
-        layout.addWidget(self.input_text)
-
-        # Sections de tags
-        self.tone_section = TagSection("Ton:", [
-            "Professionnel", "Informatif", "Décontracté", "Enthousiaste",
-            "Drôle", "Sarcastique"
-        ])
-        layout.addWidget(self.tone_section)
-
-        self.format_section = TagSection(
-            "Format:", ["Mail", "Paragraphe", "Idées", "Article de blog"])
-        layout.addWidget(self.format_section)
-
-        self.length_section = TagSection("Longueur:",
-                                         ["Court", "Moyen", "Long"])
-        layout.addWidget(self.length_section)
-
-        # Bouton Reformuler
-        self.reformulate_button = QPushButton("Reformuler")
-        self.reformulate_button.setObjectName("mainButton")
-        self.reformulate_button.clicked.connect(self.reformulate_text)
-        layout.addWidget(self.reformulate_button)
-
-        # Zone de réponse
-        response_label = QLabel("Réponse:")
-        layout.addWidget(response_label)
-
-        self.output_text = QTextEdit()
-        self.output_text.setMinimumHeight(120)
-        self.output_text.setReadOnly(True)
-        layout.addWidget(self.output_text)
-
-        # Boutons Copier/Effacer
-        buttons_layout = QHBoxLayout()
-        buttons_layout.setSpacing(10)
-
-        copy_button = QPushButton("Copier")
-        copy_button.setObjectName("mainButton")
-        clear_button = QPushButton("Effacer")
-        clear_button.setObjectName("mainButton")
-
-        copy_button.clicked.connect(self.copy_to_clipboard)
-        clear_button.clicked.connect(self.clear_output)
-
-        buttons_layout.addWidget(copy_button)
-        buttons_layout.addWidget(clear_button)
-        layout.addLayout(buttons_layout)
-
-        self.setMinimumSize(900, 1000)
-        self.resize(900, 1000)
-
-    def open_settings(self):
-        dialog = SettingsDialog(self.ollama_url, self)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            self.ollama_url = dialog.url_input.text()
-            selected_model = dialog.models_combo.currentText()
-            print(f"Modèle sélectionné: {selected_model}")  # Debug
-            if selected_model:
-                self.current_model = selected_model
-                print(f"Modèle sauvegardé: {self.current_model}")  # Debug
-
-    def open_prompt_config(self):
-        dialog = PromptDialog(self.system_prompt, self)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            self.system_prompt = dialog.prompt_text.toPlainText()
-
-    def open_translation(self):
-        dialog = TranslationDialog(self)
-        dialog.exec()
-
-    def reformulate_text(self):
-        input_text = self.input_text.toPlainText().strip()
-        if not input_text:
-            return
-
-        prompt = f"""<|im_start|>system
-{self.system_prompt}
-<|im_end|>
-<|im_start|>user
-Texte à reformuler: {input_text}
-Ton: {self.tone_section.getSelectedTag()}
-Format: {self.format_section.getSelectedTag()}
-Longueur: {self.length_section.getSelectedTag()}
-<|im_end|>
-<|im_start|>assistant"""
-
-        try:
-            self.reformulate_button.setEnabled(False)
-            self.reformulate_button.setText("En cours...")
-
-            response = requests.post(f'{self.ollama_url}/api/generate',
-                                     json={
-                                         "model": self.current_model,
-                                         "prompt": prompt,
-                                         "stream": False
-                                     })
-
-            if response.status_code == 200:
-                result = response.json()
-                reformulated_text = result['response']
-
-                # Nettoyage du texte
-                lines = reformulated_text.split('\n')
-                cleaned_lines = [
-                    line for line in lines
-                    if not any(x in line.lower() for x in [
-                        'paramètre', 'ton:', 'format:', 'longueur:', 'voici',
-                        'reformulation'
-                    ])
-                ]
-                cleaned_text = '\n'.join(cleaned_lines).strip()
-
-                self.output_text.setText(cleaned_text)
-            else:
-                self.output_text.setText(
-                    "Erreur lors de la reformulation. Veuillez réessayer.")
-
-        except Exception as e:
-            self.output_text.setText(
-                f"Erreur lors de la reformulation: {str(e)}")
-        finally:
-            self.reformulate_button.setEnabled(True)
-            self.reformulate_button.setText("Reformuler")
-
-    def copy_to_clipboard(self):
-        clipboard = QApplication.clipboard()
-        clipboard.setText(self.output_text.toPlainText())
-
-    def clear_output(self):
-        self.output_text.clear()
-
-
-class TranslationDialog(QDialog):
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Traduction")
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #323232;
-            }
-            QLabel {
-                color: white;
-                font-size: 13px;
-            }
-            QTextEdit {
-                background-color: #3d3d3d;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 15px;
-                font-size: 13px;
-            }
-            QComboBox {
-                background-color: #3d3d3d;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 8px;
-                font-size: 13px;
-                min-height: 35px;
-            }
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 8px;
-                font-size: 13px;
-                min-height: 35px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
-
-        layout = QVBoxLayout(self)
-        layout.setSpacing(15)
-        layout.setContentsMargins(20, 20, 20, 20)
-
-        # Zone de texte d'entrée
-        input_label = QLabel("Texte à traduire:")
-        self.input_text = QTextEdit()
-        self.input_text.setPlaceholderText("Entrez votre texte ici...")
-        layout.addWidget(input_label)
-        layout.addWidget(self.input_text)
-
-        # Sélecteur de langue
-        lang_layout = QHBoxLayout()
-        lang_label = QLabel("Traduire vers:")
-        self.lang_combo = QComboBox()
-        self.lang_combo.addItems([
-            "Anglais", "Français", "Espagnol", "Allemand", "Italien",
-            "Portugais"
-        ])
-        lang_layout.addWidget(lang_label)
-        lang_layout.addWidget(self.lang_combo)
-        layout.addLayout(lang_layout)
-
-        # Bouton traduire
-        self.translate_button = QPushButton("Traduire")
-        self.translate_button.clicked.connect(self.translate_text)
-        layout.addWidget(self.translate_button)
-
-        # Zone de texte de sortie
-        output_label = QLabel("Traduction:")
-        self.output_text = QTextEdit()
-        self.output_text.setReadOnly(True)
-        layout.addWidget(output_label)
-        layout.addWidget(self.output_text)
-
-        # Boutons copier/fermer
-        buttons_layout = QHBoxLayout()
-        copy_button = QPushButton("Copier")
-        close_button = QPushButton("Fermer")
-        copy_button.clicked.connect(self.copy_translation)
-        close_button.clicked.connect(self.close)
-        buttons_layout.addWidget(copy_button)
-        buttons_layout.addWidget(close_button)
-        layout.addLayout(buttons_layout)
-
-        self.setMinimumSize(800, 900)  # Définit la taille minimale
-        self.resize(800, 900)  # Définit la taille par défaut
-
-        # Ajustez aussi la taille des zones de texte
-        self.input_text.setMinimumHeight(
-            200)  # Zone de texte d'entrée plus grande
-        self.output_text.setMinimumHeight(200)  # Zone de texte de sortie plus
-
-    def translate_text(self):
-        input_text = self.input_text.toPlainText().strip()
-        target_lang = self.lang_combo.currentText()
-        if not input_text:
-            return
-        prompt = f"""<|im_start|>system
-    Tu es un traducteur automatique. Détecte automatiquement la langue source du texte et traduis-le en {target_lang}. Retourne UNIQUEMENT la traduction, sans aucun autre commentaire.
-    <|im_end|>
-    <|im_start|>user
-    {input_text}
-    <|im_end|>
-    <|im_start|>assistant"""
-        try:
-            self.translate_button.setEnabled(False)
-            self.translate_button.setText("En cours...")
-            response = requests.post(
-                f'{self.parent().ollama_url}/api/generate',
-                json={
-                    "model": self.parent().current_model,
-                    "prompt": prompt,
-                    "stream": False
-                })
-
-            if response.status_code == 200:
-                result = response.json()
-                translated_text = result['response'].strip()
-                self.output_text.setText(translated_text)
-            else:
-                self.output_text.setText(
-                    "Erreur lors de la traduction. Veuillez réessayer.")
-
-        except Exception as e:
-            self.output_text.setText(f"Erreur lors de la traduction: {str(e)}")
-        finally:
-            self.translate_button.setEnabled(True)
-            self.translate_button.setText("Traduire")
-
-    def copy_translation(self):
-        clipboard = QApplication.clipboard()
-        clipboard.setText(self.output_text.toPlainText())
-
-
-def main():
-    app = QApplication(sys.argv)
-    window = ReformulatorApp()
-    window.show()
-    sys.exit(app.exec())
-
-
-if __name__ == "__main__":
-    main()
-
-import sys
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                             QHBoxLayout, QTextEdit, QPushButton, QLabel,
-                             QDialog, QLineEdit, QComboBox, QListWidget)
-from PyQt6.QtCore import Qt
-import requests
-import os
-
-# Suppression des messages de debug
-os.environ['QT_LOGGING_RULES'] = '*.debug=false;qt.qpa.*=false'
-# Suppression du message IMK
-import warnings
+    def add_extra_url(self):
+        url = self.new_url_input.text().strip().rstrip('/')
+        if url and url not in self.endpoint_urls():
+            self.extra_urls_list.addItem(url)
+        self.new_url_input.clear()
 
-warnings.filterwarnings("ignore")
-# Configuration pour macOS
-os.environ['QT_MAC_WANTS_LAYER'] = '1'
+    def remove_extra_url(self):
+        current_item = self.extra_urls_list.currentItem()
+        if current_item:
+            self.extra_urls_list.takeItem(self.extra_urls_list.row(current_item))
 
+    def accept(self):
+        # Sans URL principale, le client n'aurait plus aucun serveur
+        if not self.url_input.text().strip():
+            self.url_error_label.setText("L'URL d'Ollama est obligatoire.")
+            self.url_error_label.show()
+            return
+        super().accept()
 
-class PromptDialog(QDialog):
+    def endpoint_urls(self):
+        return [self.url_input.text().strip()] + [
+            self.extra_urls_list.item(i).text()
+            for i in range(self.extra_urls_list.count())
+        ]
+
+    def update_stats(self):
+        self.stats_label.setText(self.format_stats())
+        self.update_endpoints_table()
 
-    def __init__(self, current_prompt, parent=None):
+    def update_endpoints_table(self):
+        rows = self.client.endpoints.stats()
+        self.endpoints_table.setRowCount(len(rows))
+        for row, stats in enumerate(rows):
+            if stats['healthy']:
+                state = "OK"
+            else:
+                state = "Injoignable" if stats['last_error'] else "?"
+            values = [
+                stats['url'], state,
+                f"{stats['probe_ms']:.0f} ms"
+                if stats['probe_ms'] is not None else "-",
+                str(stats['active']),
+                str(stats['requests']),
+                str(stats['errors']),
+                f"{stats['avg_ms']:.0f} ms"
+                if stats['avg_ms'] is not None else "-"
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == 1 and stats['last_error']:
+                    item.setToolTip(stats['last_error'])
+                self.endpoints_table.setItem(row, column, item)
+
+    def on_url_edited(self):
+        # Attend la fin de la saisie avant d'interroger la nouvelle URL
+        self.show_models(self.catalog.get(self.url_input.text()))
+        self.url_debounce.start()
+
+    def refresh_models(self):
+        self.url_debounce.stop()
+        self.cancel_refresh()
+        url = self.url_input.text().rstrip('/')
+        worker = RequestWorker(lambda token, emit: (url, (
+            self.client.list_models(cancel_token=token, base_url=url))))
+        worker.succeeded.connect(self.on_models_loaded)
+        worker.failed.connect(self.on_models_failed)
+        worker.finished.connect(lambda: self.on_refresh_finished(worker))
+        self.refresh_worker = worker
+        self.refresh_button.setEnabled(False)
+        self.refresh_button.setText("Chargement...")
+        self.cancel_refresh_button.show()
+        worker.start()
+
+    def cancel_refresh(self):
+        if self.refresh_worker is not None:
+            self.refresh_worker.cancel()
+
+    def on_models_loaded(self, result):
+        url, models = result
+        self.catalog.put(url, models)
+        self.show_models(models)
+        self.models_status_label.setText(f"{len(models)} modèles disponibles")
+
+    def on_models_failed(self, error):
+        print(f"Erreur lors de la récupération des modèles: {error}")
+        self.models_status_label.setText(
+            "Serveur injoignable, liste en cache affichée")
+
+    def show_models(self, models):
+        # Conserve la sélection en cours, sinon le modèle actif
+        selected = self.selected_model() or self.current_model
+        self.models_combo.clear()
+        for model in models:
+            self.models_combo.addItem(self.describe_model(model), model)
+            if model['name'] == selected:
+                self.models_combo.setCurrentIndex(self.models_combo.count() -
+                                                  1)
+
+    @staticmethod
+    def describe_model(model):
+        details = model.get('details') or {}
+        infos = []
+        if model.get('size'):
+            infos.append(f"{model['size'] / 1e9:.1f} Go")
+        for key in ('family', 'parameter_size', 'quantization_level'):
+            if details.get(key):
+                infos.append(details[key])
+        if not infos:
+            return model['name']
+        return f"{model['name']}  ({' · '.join(infos)})"
+
+    def selected_model(self):
+        model = self.models_combo.currentData()
+        return model['name'] if model else ''
+
+    def on_refresh_finished(self, worker):
+        if worker is not self.refresh_worker:
+            return
+        self.refresh_worker = None
+        self.refresh_button.setEnabled(True)
+        self.refresh_button.setText("Rafraîchir les modèles")
+        self.cancel_refresh_button.hide()
+        self.update_stats()
+
+    def format_stats(self):
+        lines = []
+        for path, values in sorted(self.client.stats().items()):
+            line = (f"{path}: {values['count']} requêtes, "
+                    f"moy. {values['avg_ms']:.0f} ms, "
+                    f"max {values['max_ms']:.0f} ms, "
+                    f"{values['errors']} erreurs")
+            if values['prompt_eval_count']:
+                # Tokens de prompt réellement évalués : baisse quand Ollama
+                # réutilise le préfixe commun
+                line += (f", prompt moy. "
+                         f"{values['prompt_eval_count'] / values['count']:.0f}"
+                         f" tokens en "
+                         f"{values['prompt_eval_ms'] / values['count']:.0f}"
+                         f" ms")
+            if values['coalesced']:
+                # Demandes identiques servies par une génération en cours
+                line += f", {values['coalesced']} regroupées"
+            lines.append(line)
+        if self.cache is not None:
+            stats = self.cache.stats()
+            lines.append(
+                f"Cache: {stats['hits_memory']} succès mémoire, "
+                f"{stats['hits_disk']} succès disque, "
+                f"{stats['misses']} échecs ({stats['hit_rate']:.0%})")
+        return '\n'.join(lines) or "Aucune requête pour le moment."
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.stats_label.setText(self.format_stats())
+
+    def done(self, result):
+        self.stats_timer.stop()
+        self.url_debounce.stop()
+        self.cancel_refresh()
+        super().done(result)
+
+
+class TelemetryDialog(QDialog):
+    # Colonnes du résumé, dans l'ordre de TelemetryStore.summary()
+    COLUMNS = [
+        ("Modèle", 'model'), ("Opération", 'operation'),
+        ("Requêtes", 'count'), ("Erreurs", 'errors'),
+        ("Tokens/s", 'tokens_per_s'), ("1er token p50", 'first_token_p50_ms'),
+        ("1er token p95", 'first_token_p95_ms'),
+        ("Latence p50", 'round_trip_p50_ms'),
+        ("Latence p95", 'round_trip_p95_ms'), ("Chargement", 'load_ms'),
+        ("Tronquées", 'truncated'), ("num_ctx", 'num_ctx')
+    ]
+
+    def __init__(self, telemetry, parent=None):
         super().__init__(parent)
-        self.setWindowTitle("Configuration du Prompt")
+        self.telemetry = telemetry
+        self.shown_version = None
+        self.setWindowTitle("Performances")
         self.setStyleSheet("""
             QDialog {
                 background-color: #323232;
@@ -800,13 +565,18 @@ class PromptDialog(QDialog):
                 color: white;
                 font-size: 13px;
             }
-            QTextEdit {
+            QTableWidget {
                 background-color: #3d3d3d;
                 color: white;
                 border: none;
                 border-radius: 8px;
-                padding: 15px;
-                font-size: 13px;
+                font-size: 12px;
+            }
+            QHeaderView::section {
+                background-color: #424242;
+                color: white;
+                border: none;
+                padding: 4px;
             }
             QPushButton {
                 background-color: #4CAF50;
@@ -826,29 +596,172 @@ class PromptDialog(QDialog):
         layout.setSpacing(15)
         layout.setContentsMargins(20, 20, 20, 20)
 
-        prompt_label = QLabel("Prompt système:")
-        layout.addWidget(prompt_label)
-
-        self.prompt_text = QTextEdit()
-        self.prompt_text.setMinimumSize(400, 300)
-        self.prompt_text.setText(current_prompt)
-        layout.addWidget(self.prompt_text)
+        # Une ligne par modèle et par opération, sur les dernières mesures
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(
+            [title for title, _ in self.COLUMNS])
+        self.table.verticalHeader().setVisible(False)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setMinimumHeight(200)
+        layout.addWidget(self.table)
 
         buttons_layout = QHBoxLayout()
-        ok_button = QPushButton("OK")
-        cancel_button = QPushButton("Annuler")
-        ok_button.clicked.connect(self.accept)
-        cancel_button.clicked.connect(self.reject)
-        buttons_layout.addWidget(ok_button)
-        buttons_layout.addWidget(cancel_button)
+        export_csv_button = QPushButton("Exporter en CSV")
+        export_csv_button.clicked.connect(lambda: self.export('csv'))
+        export_json_button = QPushButton("Exporter en JSON")
+        export_json_button.clicked.connect(lambda: self.export('json'))
+        clear_button = QPushButton("Effacer")
+        clear_button.clicked.connect(self.clear)
+        close_button = QPushButton("Fermer")
+        close_button.clicked.connect(self.close)
+        buttons_layout.addWidget(export_csv_button)
+        buttons_layout.addWidget(export_json_button)
+        buttons_layout.addWidget(clear_button)
+        buttons_layout.addWidget(close_button)
         layout.addLayout(buttons_layout)
 
+        self.setMinimumSize(900, 360)
+
+        # Rafraîchi chaque seconde tant que le panneau est ouvert, et
+        # seulement si de nouvelles mesures sont arrivées
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.update_table)
+        self.update_table()
+
+    @staticmethod
+    def format_value(key, value):
+        if value is None:
+            return "-"
+        if key.endswith('_ms'):
+            return f"{value:.0f} ms"
+        if key == 'tokens_per_s':
+            return f"{value:.1f}"
+        return str(value)
+
+    def update_table(self):
+        if self.telemetry.version == self.shown_version:
+            return
+        self.shown_version = self.telemetry.version
+        rows = self.telemetry.summary()
+        self.summary_label.setText(
+            f"{sum(row['count'] for row in rows)} générations mesurées "
+            f"(les {self.telemetry.max_entries} dernières au plus)")
+        self.table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, (_, key) in enumerate(self.COLUMNS):
+                self.table.setItem(
+                    row, column,
+                    QTableWidgetItem(self.format_value(key, values[key])))
+
+    def export(self, kind):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Exporter les mesures",
+            f"textrefine-mesures-{time.strftime('%Y%m%d-%H%M%S')}.{kind}",
+            "CSV (*.csv)" if kind == 'csv' else "JSON (*.json)")
+        if not path:
+            return
+        try:
+            if kind == 'csv':
+                self.telemetry.export_csv(path)
+            else:
+                self.telemetry.export_json(path)
+        except OSError as e:
+            print(f"Erreur lors de l'export des mesures: {e}")
+            self.summary_label.setText(f"Export impossible : {e}")
+
+    def clear(self):
+        self.telemetry.clear()
+        self.update_table()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_table()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
 
-class SettingsDialog(QDialog):
 
-    def __init__(self, current_url, parent=None):
+def describe_history_params(entry):
+    params = entry['params']
+    if entry['kind'] == 'traduction':
+        return f"→ {params.get('target_lang', '?')}"
+    return " · ".join(params.get(key) or '-'
+                      for key in ('tone', 'format', 'length'))
+
+
+class HistoryModel(QAbstractListModel):
+    # Liste virtuelle : la vue ne demande une page à SQLite qu'en arrivant
+    # en bas de ce qui est déjà chargé
+    page_size = 200
+
+    def __init__(self, store, parent=None):
         super().__init__(parent)
-        self.setWindowTitle("Configuration Ollama")
+        self.store = store
+        self.query = ''
+        self.entries = []
+        self.exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            when = time.strftime('%d/%m %H:%M',
+                                 time.localtime(entry['created_at']))
+            preview = ' '.join(entry['preview'].split())
+            return (f"{when}  {entry['kind'].capitalize()} · "
+                    f"{entry['model']} · {describe_history_params(entry)}"
+                    f" — {preview}")
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return entry['preview']
+        if role == Qt.ItemDataRole.UserRole:
+            return entry['id']
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        before_id = self.entries[-1]['id'] if self.entries else None
+        rows = self.store.page(self.query, before_id, self.page_size)
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self.entries),
+                                 len(self.entries) + len(rows) - 1)
+            self.entries.extend(rows)
+            self.endInsertRows()
+
+    def set_query(self, query):
+        self.beginResetModel()
+        self.query = query
+        self.entries = []
+        self.exhausted = False
+        self.endResetModel()
+
+    def refresh(self):
+        self.set_query(self.query)
+
+
+class HistoryDialog(QDialog):
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.setWindowTitle("Historique")
         self.setStyleSheet("""
             QDialog {
                 background-color: #323232;
@@ -857,29 +770,16 @@ class SettingsDialog(QDialog):
                 color: white;
                 font-size: 13px;
             }
-            QLineEdit {
-                background-color: #3d3d3d;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 8px;
-                font-size: 13px;
-            }
-            QComboBox {
+            QLineEdit, QListView, QPlainTextEdit {
                 background-color: #3d3d3d;
                 color: white;
                 border: none;
                 border-radius: 8px;
                 padding: 8px;
                 font-size: 13px;
-                min-height: 35px;
             }
-            QComboBox::drop-down {
-                border: none;
-            }
-            QComboBox::down-arrow {
-                image: none;
-                border: none;
+            QListView::item:selected {
+                background-color: #4CAF50;
             }
             QPushButton {
                 background-color: #4CAF50;
@@ -899,47 +799,245 @@ class SettingsDialog(QDialog):
         layout.setSpacing(15)
         layout.setContentsMargins(20, 20, 20, 20)
 
-        # URL d'Ollama
-        url_label = QLabel("URL d'Ollama:")
-        self.url_input = QLineEdit()
-        self.url_input.setText(current_url)
-        layout.addWidget(url_label)
-        layout.addWidget(self.url_input)
-
-        # Liste des modèles
-        models_label = QLabel("Modèle:")
-        self.models_combo = QComboBox()
-        layout.addWidget(models_label)
-        layout.addWidget(self.models_combo)
-
-        # Bouton pour rafraîchir la liste des modèles
-        refresh_button = QPushButton("Rafraîchir les modèles")
-        refresh_button.clicked.connect(self.refresh_models)
-        layout.addWidget(refresh_button)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Rechercher dans l'historique...")
+        self.search_input.setClearButtonEnabled(True)
+        layout.addWidget(self.search_input)
+        # Recherche relancée une fois la saisie terminée
+        self.search_debounce = QTimer(self)
+        self.search_debounce.setSingleShot(True)
+        self.search_debounce.setInterval(250)
+        self.search_debounce.timeout.connect(self.apply_search)
+        self.search_input.textChanged.connect(self.search_debounce.start)
+
+        self.model = HistoryModel(store, self)
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        # Lignes de hauteur fixe : la vue n'a pas à mesurer chaque entrée
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.list_view.selectionModel().currentChanged.connect(
+            self.show_preview)
+        self.list_view.activated.connect(self.restore_selected)
+        layout.addWidget(self.list_view, 2)
+
+        self.preview_text = QPlainTextEdit()
+        self.preview_text.setReadOnly(True)
+        layout.addWidget(self.preview_text, 1)
 
-        # Boutons OK/Annuler
         buttons_layout = QHBoxLayout()
-        ok_button = QPushButton("OK")
-        cancel_button = QPushButton("Annuler")
-        ok_button.clicked.connect(self.accept)
-        cancel_button.clicked.connect(self.reject)
-        buttons_layout.addWidget(ok_button)
-        buttons_layout.addWidget(cancel_button)
+        restore_button = QPushButton("Restaurer")
+        restore_button.clicked.connect(self.restore_selected)
+        delete_button = QPushButton("Supprimer")
+        delete_button.clicked.connect(self.delete_selected)
+        close_button = QPushButton("Fermer")
+        close_button.clicked.connect(self.close)
+        buttons_layout.addWidget(restore_button)
+        buttons_layout.addWidget(delete_button)
+        buttons_layout.addWidget(close_button)
         layout.addLayout(buttons_layout)
 
-        self.setMinimumWidth(400)
-        self.refresh_models()
+        self.setMinimumSize(800, 600)
 
-    def refresh_models(self):
-        try:
-            response = requests.get(f"{self.url_input.text()}/api/tags")
-            if response.status_code == 200:
-                data = response.json()
-                self.models_combo.clear()
-                for model in data.get('models', []):
-                    self.models_combo.addItem(model['name'], model)
-        except Exception as e:
-            print(f"Erreur lors de la récupération des modèles: {e}")
+    def apply_search(self):
+        self.model.set_query(self.search_input.text())
+        self.preview_text.clear()
+
+    def selected_entry(self):
+        index = self.list_view.currentIndex()
+        if not index.isValid():
+            return None
+        return self.store.get(index.data(Qt.ItemDataRole.UserRole))
+
+    def show_preview(self, *_):
+        entry = self.selected_entry()
+        if entry is None:
+            self.preview_text.clear()
+            return
+        timing = (f", {entry['elapsed_ms']:.0f} ms"
+                  if entry['elapsed_ms'] is not None else "")
+        self.preview_text.setPlainText(
+            f"{entry['model']} · {describe_history_params(entry)}{timing}\n\n"
+            f"{entry['input']}\n\n—\n\n{entry['output']}")
+
+    def restore_selected(self, *_):
+        entry = self.selected_entry()
+        if entry is not None:
+            self.parent().restore_history_entry(entry)
+
+    def delete_selected(self):
+        index = self.list_view.currentIndex()
+        if not index.isValid():
+            return
+        self.store.delete(index.data(Qt.ItemDataRole.UserRole))
+        self.model.refresh()
+        self.preview_text.clear()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.model.refresh()
+
+    def done(self, result):
+        self.search_debounce.stop()
+        super().done(result)
+
+
+# Feuille de style des tags, installée une seule fois au niveau de
+# l'application : l'état sélectionné passe par le pseudo-état :checked, sans
+# recalcul de style par bouton
+TAG_STYLESHEET = """
+    TagSection QLabel {
+        color: white;
+        font-size: 13px;
+        padding: 5px;
+        background-color: transparent;
+    }
+    TagSection QLineEdit {
+        background-color: #3d3d3d;
+        color: white;
+        border: none;
+        border-radius: 8px;
+        padding: 5px 10px;
+        font-size: 13px;
+    }
+    TagSection QScrollArea {
+        background-color: transparent;
+        border: none;
+    }
+    TagButton {
+        background-color: #424242;
+        color: white;
+        border: none;
+        border-radius: 17px;
+        padding: 5px 20px;
+        font-size: 13px;
+    }
+    TagButton:hover {
+        background-color: #484848;
+    }
+    TagButton:checked {
+        background-color: #4CAF50;
+    }
+    TagButton:checked:hover {
+        background-color: #45a049;
+    }
+    QPushButton#manageTagsButton {
+        background-color: #4CAF50;
+        color: white;
+        border: none;
+        border-radius: 15px;
+        font-size: 20px;
+        font-weight: bold;
+    }
+    QPushButton#manageTagsButton:hover {
+        background-color: #45a049;
+    }
+"""
+
+
+def install_tag_stylesheet():
+    app = QApplication.instance()
+    if app is not None and not app.property("tagStylesheetInstalled"):
+        app.setStyleSheet(app.styleSheet() + TAG_STYLESHEET)
+        app.setProperty("tagStylesheetInstalled", True)
+
+
+class FlowLayout(QLayout):
+    # Disposition qui passe à la ligne quand la largeur est atteinte, pour
+    # les sections qui contiennent beaucoup de tags
+
+    def __init__(self, parent=None, spacing=8):
+        super().__init__(parent)
+        self._items = []
+        # Hauteur par largeur et taille minimale, recalculées seulement
+        # après invalidation de la disposition
+        self._height_cache = {}
+        self._minimum_size = None
+        self.setSpacing(spacing)
+        self.setContentsMargins(0, 0, 0, 0)
+
+    def addItem(self, item):
+        self._items.append(item)
+        self.invalidate()
+
+    def count(self):
+        return len(self._items)
+
+    def itemAt(self, index):
+        if 0 <= index < len(self._items):
+            return self._items[index]
+        return None
+
+    def takeAt(self, index):
+        if 0 <= index < len(self._items):
+            return self._items.pop(index)
+        return None
+
+    def reorder(self, widgets):
+        # Range les éléments dans l'ordre de `widgets` sans les recréer
+        position = {id(widget): i for i, widget in enumerate(widgets)}
+        self._items.sort(
+            key=lambda item: position.get(id(item.widget()), len(position)))
+        self.invalidate()
+
+    def invalidate(self):
+        self._height_cache.clear()
+        self._minimum_size = None
+        super().invalidate()
+
+    def expandingDirections(self):
+        return Qt.Orientation(0)
+
+    def hasHeightForWidth(self):
+        return True
+
+    def heightForWidth(self, width):
+        if width not in self._height_cache:
+            self._height_cache[width] = self._do_layout(
+                QRect(0, 0, width, 0), True)
+        return self._height_cache[width]
+
+    def setGeometry(self, rect):
+        super().setGeometry(rect)
+        self._do_layout(rect, False)
+
+    def sizeHint(self):
+        return self.minimumSize()
+
+    def minimumSize(self):
+        if self._minimum_size is None:
+            size = QSize()
+            for item in self._items:
+                size = size.expandedTo(item.minimumSize())
+            margins = self.contentsMargins()
+            self._minimum_size = size + QSize(
+                margins.left() + margins.right(),
+                margins.top() + margins.bottom())
+        return self._minimum_size
+
+    def _do_layout(self, rect, test_only):
+        margins = self.contentsMargins()
+        area = rect.adjusted(margins.left(), margins.top(), -margins.right(),
+                             -margins.bottom())
+        spacing = self.spacing()
+        x = area.x()
+        y = area.y()
+        line_height = 0
+        for item in self._items:
+            if item.isEmpty():
+                continue
+            hint = item.sizeHint()
+            next_x = x + hint.width() + spacing
+            if next_x - spacing > area.right() + 1 and line_height > 0:
+                x = area.x()
+                y += line_height + spacing
+                next_x = x + hint.width() + spacing
+                line_height = 0
+            if not test_only:
+                item.setGeometry(QRect(QPoint(x, y), hint))
+            x = next_x
+            line_height = max(line_height, hint.height())
+        return y + line_height - rect.y() + margins.bottom()
 
 
 class TagButton(QPushButton):
@@ -949,42 +1047,6 @@ class TagButton(QPushButton):
         self.setCheckable(True)
         self.setMinimumHeight(35)
         self.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.updateStyle()
-
-    def updateStyle(self):
-        if self.isChecked():
-            style = """
-                QPushButton {
-                    background-color: #4CAF50;
-                    color: white;
-                    border: none;
-                    border-radius: 17px;
-                    padding: 5px 20px;
-                    font-size: 13px;
-                }
-                QPushButton:hover {
-                    background-color: #45a049;
-                }
-            """
-        else:
-            style = """
-                QPushButton {
-                    background-color: #424242;
-                    color: white;
-                    border: none;
-                    border-radius: 17px;
-                    padding: 5px 20px;
-                    font-size: 13px;
-                }
-                QPushButton:hover {
-                    background-color: #484848;
-                }
-            """
-        self.setStyleSheet(style)
-
-    def mouseReleaseEvent(self, event):
-        super().mouseReleaseEvent(event)
-        self.updateStyle()
 
 
 class TagManagementDialog(QDialog):
@@ -1084,106 +1146,247 @@ class TagManagementDialog(QDialog):
 
 
 class TagSection(QWidget):
+    # Émis avec le texte du tag nouvellement sélectionné
+    selection_changed = pyqtSignal(str)
+    # Au-delà de ce nombre de tags, le champ de filtre est affiché
+    filter_threshold = 12
+    # Hauteur maximale de la zone des tags avant défilement
+    max_tags_height = 180
 
     def __init__(self, title, tags, parent=None):
         super().__init__(parent)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #3d3d3d;
-                border-radius: 8px;
-            }
-            QLabel {
-                color: white;
-                font-size: 13px;
-                padding: 5px;
-                background-color: transparent;
-            }
-        """)
+        install_tag_stylesheet()
 
         layout = QVBoxLayout(self)
         layout.setSpacing(10)
         layout.setContentsMargins(15, 15, 15, 15)
 
+        # En-tête : titre, filtre et bouton de gestion
+        header_layout = QHBoxLayout()
+        header_layout.setSpacing(8)
         title_label = QLabel(title)
-        layout.addWidget(title_label)
-
-        tags_container = QWidget()
-        tags_container.setStyleSheet("background-color: transparent;")
-        tags_layout = QHBoxLayout(tags_container)
-        tags_layout.setSpacing(8)
-        tags_layout.setContentsMargins(0, 0, 0, 0)
+        header_layout.addWidget(title_label)
+        header_layout.addStretch()
 
-        self.buttons = []
-        for tag in tags:
-            btn = TagButton(tag)
-            btn.clicked.connect(lambda checked, b=btn: self.handleTagClick(b))
-            self.buttons.append(btn)
-            tags_layout.addWidget(btn)
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filtrer...")
+        self.filter_input.setClearButtonEnabled(True)
+        self.filter_input.setFixedWidth(180)
+        self.filter_input.textChanged.connect(self.apply_filter)
+        header_layout.addWidget(self.filter_input)
 
-        # Ajouter le bouton + juste après les tags
         manage_button = QPushButton("+")
+        manage_button.setObjectName("manageTagsButton")
         manage_button.setFixedSize(30, 30)
-        manage_button.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                border-radius: 15px;
-                font-size: 20px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
         manage_button.clicked.connect(self.manage_tags)
-        tags_layout.addWidget(manage_button)
-
-        tags_layout.addStretch()
-        layout.addWidget(tags_container)
+        header_layout.addWidget(manage_button)
+        layout.addLayout(header_layout)
+
+        # Les tags passent à la ligne et défilent s'ils sont trop nombreux
+        self.tags_container = QWidget()
+        self.tags_layout = FlowLayout(self.tags_container)
+        self.tags_scroll = QScrollArea()
+        self.tags_scroll.setWidget(self.tags_container)
+        self.tags_scroll.setWidgetResizable(True)
+        self.tags_scroll.setFrameShape(QFrame.Shape.NoFrame)
+        self.tags_scroll.setHorizontalScrollBarPolicy(
+            Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.tags_scroll.viewport().setAutoFillBackground(False)
+        self.tags_container.setAutoFillBackground(False)
+        layout.addWidget(self.tags_scroll)
+
+        # Exclusivité gérée nativement par le groupe de boutons
+        self.button_group = QButtonGroup(self)
+        self.button_group.setExclusive(True)
+        self.button_group.buttonToggled.connect(self.on_button_toggled)
+        self.buttons = []
+        for tag in tags:
+            self.buttons.append(self.create_button(tag))
 
         # Sélectionner le premier tag par défaut
         if self.buttons:
             self.buttons[0].setChecked(True)
-            self.buttons[0].updateStyle()
+        self.update_filter_visibility()
+
+    def create_button(self, tag):
+        btn = TagButton(tag)
+        self.button_group.addButton(btn)
+        self.tags_layout.addWidget(btn)
+        return btn
 
     def manage_tags(self):
         current_tags = [btn.text() for btn in self.buttons]
         dialog = TagManagementDialog(current_tags, self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            new_tags = dialog.get_tags()
-            # Supprimer les anciens boutons
-            for btn in self.buttons:
+            self.set_tags(dialog.get_tags())
+
+    def set_tags(self, new_tags):
+        # Mise à jour incrémentale : seuls les tags ajoutés ou supprimés
+        # créent ou détruisent des boutons, les autres sont réordonnés
+        selected = self.getSelectedTag()
+        available = {}
+        for btn in self.buttons:
+            available.setdefault(btn.text(), []).append(btn)
+
+        container_visible = self.tags_container.isVisible()
+        if container_visible:
+            self.tags_container.hide()
+        buttons = []
+        for tag in new_tags:
+            if available.get(tag):
+                buttons.append(available[tag].pop(0))
+            else:
+                buttons.append(self.create_button(tag))
+        for removed in available.values():
+            for btn in removed:
+                self.button_group.removeButton(btn)
+                self.tags_layout.removeWidget(btn)
                 btn.deleteLater()
-            self.buttons.clear()
-
-            # Créer les nouveaux boutons
-            tags_layout = self.findChild(QHBoxLayout)
-            for tag in new_tags:
-                btn = TagButton(tag)
-                btn.clicked.connect(
-                    lambda checked, b=btn: self.handleTagClick(b))
-                self.buttons.append(btn)
-                tags_layout.addWidget(btn)
-
-            # Sélectionner le premier tag par défaut
+        self.tags_layout.reorder(buttons)
+        self.buttons = buttons
+        if container_visible:
+            self.tags_container.show()
+        self.apply_filter(self.filter_input.text())
+
+        # Conserver la sélection si le tag existe toujours
+        if self.getSelectedTag() != selected or not selected:
             if self.buttons:
                 self.buttons[0].setChecked(True)
-                self.buttons[0].updateStyle()
+        self.update_filter_visibility()
 
-    def handleTagClick(self, clicked_button):
-        for button in self.buttons:
-            if button != clicked_button:
-                button.setChecked(False)
-                button.updateStyle()
-        clicked_button.setChecked(True)
-        clicked_button.updateStyle()
+    def apply_filter(self, text):
+        needle = text.strip().lower()
+        changes = [
+            btn for btn in self.buttons
+            if btn.isHidden() == (needle in btn.text().lower())
+        ]
+        if changes:
+            # Afficher un bouton dans un parent visible recalcule toute la
+            # disposition : le conteneur est masqué le temps des changements
+            # pour qu'elle ne soit calculée qu'une fois
+            container_visible = self.tags_container.isVisible()
+            if container_visible:
+                self.tags_container.hide()
+            for btn in changes:
+                btn.setVisible(btn.isHidden())
+            if container_visible:
+                self.tags_container.show()
+        self.update_tags_height()
+
+    def update_filter_visibility(self):
+        show_filter = len(self.buttons) > self.filter_threshold
+        if not show_filter and self.filter_input.text():
+            self.filter_input.clear()
+        self.filter_input.setVisible(show_filter)
+        self.update_tags_height()
+
+    def update_tags_height(self):
+        # La zone des tags prend la hauteur de son contenu, bornée pour
+        # qu'une longue liste défile au lieu d'agrandir la fenêtre
+        width = self.tags_scroll.viewport().width()
+        if width <= 0:
+            return
+        height = self.tags_layout.heightForWidth(width)
+        self.tags_scroll.setFixedHeight(min(height, self.max_tags_height))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_tags_height()
+
+    def on_button_toggled(self, button, checked):
+        # En sélection unique, un changement décoche un bouton et en coche un
+        # autre : seul le second est signalé
+        if checked or not self.button_group.exclusive():
+            self.selection_changed.emit(button.text())
+
+    def set_multi_select(self, enabled):
+        if not enabled:
+            # Retour à la sélection unique : seul le premier tag coché reste
+            checked = [btn for btn in self.buttons if btn.isChecked()]
+            for btn in checked[1:]:
+                btn.setChecked(False)
+            if not checked and self.buttons:
+                self.buttons[0].setChecked(True)
+        self.button_group.setExclusive(not enabled)
 
     def getSelectedTag(self):
+        button = self.button_group.checkedButton()
+        if button is None:
+            # Sélection multiple : checkedButton() ne renvoie rien
+            selected = self.getSelectedTags()
+            return selected[0] if selected else ""
+        return button.text()
+
+    def getSelectedTags(self):
+        return [btn.text() for btn in self.buttons if btn.isChecked()]
+
+    def select_tag(self, tag):
         for button in self.buttons:
-            if button.isChecked():
-                return button.text()
-        return ""
+            if button.text() == tag:
+                button.setChecked(True)
+                return True
+        return False
+
+
+# Paramètres d'une reformulation : un calcul anticipé n'est réutilisé que
+# si la demande est identique
+ReformulationRequest = namedtuple('ReformulationRequest', [
+    'text', 'tone', 'text_format', 'length', 'model', 'system_prompt',
+    'document_mode', 'cleanup_patterns', 'stop'
+])
+
+
+class SpeculativeJob:
+    # Reformulation lancée en arrière-plan avant le clic sur « Reformuler » :
+    # la progression est conservée pour être rejouée si elle est adoptée
+
+    def __init__(self, request, worker):
+        self.request = request
+        self.worker = worker
+        self.events = []
+        self.outcome = None
+        self.adopted = False
+
+
+class VariantCard(QFrame):
+    # Résultat d'une combinaison de tags en mode variantes, copiable en un
+    # clic
+
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        self.setObjectName("variantCard")
+        self.setFixedWidth(280)
+        layout = QVBoxLayout(self)
+        layout.setSpacing(6)
+        layout.setContentsMargins(8, 8, 8, 8)
+
+        header_layout = QHBoxLayout()
+        self.title = title
+        self.title_label = QLabel(title)
+        header_layout.addWidget(self.title_label)
+        header_layout.addStretch()
+        copy_button = QPushButton("Copier")
+        copy_button.setObjectName("variantCopyButton")
+        copy_button.clicked.connect(self.copy_to_clipboard)
+        header_layout.addWidget(copy_button)
+        layout.addLayout(header_layout)
+
+        # Texte brut : une réponse contenant des balises n'est pas rendue en
+        # HTML
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setPlaceholderText("En cours...")
+        layout.addWidget(self.text)
+
+    def set_result(self, text):
+        self.text.setPlainText(text)
+        if core.is_truncated(text):
+            self.title_label.setText(f"{self.title} (tronquée)")
+            self.title_label.setToolTip(
+                "Limite de longueur atteinte : réponse incomplète")
+
+    def copy_to_clipboard(self):
+        QApplication.clipboard().setText(self.text.toPlainText())
 
 
 class ReformulatorApp(QMainWindow):
@@ -1191,10 +1394,31 @@ class ReformulatorApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Reformulateur")
-        self.ollama_url = "http://localhost:11434"
-        self.current_model = "qwen2.5:3b"
-        self.system_prompt = """Tu es un expert en reformulation. Tu dois reformuler le texte selon les paramètres spécifiés par l'utilisateur: ton, format et longueur. IMPORTANT : retourne UNIQUEMENT le texte reformulé, sans aucune mention des paramètres. 
-Respecte scrupuleusement le format demandé, la longueur et le ton. Ne rajoute aucun autre commentaire."""
+        # Client HTTP partagé par la fenêtre et ses dialogues
+        self.client = OllamaClient(config.DEFAULT_OLLAMA_URL,
+                                   extra_urls=config.EXTRA_OLLAMA_URLS)
+        # Mesures de chaque génération, consultables dans le panneau
+        # Performances
+        self.telemetry = TelemetryStore()
+        self.client.telemetry = self.telemetry
+        self.telemetry_dialog = None
+        # Demandes passées, restaurables sans nouvel appel au modèle
+        self.history = HistoryStore()
+        self.history_dialog = None
+        self.current_model = config.DEFAULT_MODEL
+        # Résultats déjà générés, partagés avec le dialogue de traduction
+        self.cache = ResultCache()
+        self.model_catalog = ModelCatalog()
+        self.translation_dialog = None
+        self.bypass_cache = False
+        self.system_prompt = core.DEFAULT_SYSTEM_PROMPT
+        # Nettoyage de la réponse (None : motifs par défaut) et séquences
+        # d'arrêt transmises à Ollama
+        self.cleanup_patterns = None
+        self.stop_sequences = []
+
+        # Affichage progressif des tokens pendant la génération
+        self.stream_output = True
 
         self.setStyleSheet("""
             QMainWindow {
@@ -1204,7 +1428,7 @@ Respecte scrupuleusement le format demandé, la longueur et le ton. Ne rajoute a
                 color: white;
                 font-size: 13px;
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: #3d3d3d;
                 color: white;
                 border: none;
@@ -1224,6 +1448,41 @@ Respecte scrupuleusement le format demandé, la longueur et le ton. Ne rajoute a
             QPushButton#mainButton:hover {
                 background-color: #45a049;
             }
+            QCheckBox {
+                color: white;
+                font-size: 13px;
+            }
+            QSpinBox {
+                background-color: #3d3d3d;
+                color: white;
+                border: none;
+                border-radius: 8px;
+                padding: 4px;
+                font-size: 13px;
+            }
+            QFrame#variantCard {
+                background-color: #3d3d3d;
+                border-radius: 8px;
+            }
+            QFrame#variantCard QPlainTextEdit {
+                background-color: #424242;
+                padding: 6px;
+            }
+            QScrollArea {
+                background-color: transparent;
+                border: none;
+            }
+            QPushButton#variantCopyButton {
+                background-color: #4CAF50;
+                color: white;
+                border: none;
+                border-radius: 8px;
+                padding: 3px 10px;
+                font-size: 12px;
+            }
+            QPushButton#variantCopyButton:hover {
+                background-color: #45a049;
+            }
         """)
 
         central_widget = QWidget()
@@ -1249,47 +1508,157 @@ Respecte scrupuleusement le format demandé, la longueur et le ton. Ne rajoute a
 
         config_layout.addWidget(settings_button)
         config_layout.addWidget(prompt_button)
+        telemetry_button = QPushButton("📊 Performances")
+        telemetry_button.setObjectName("mainButton")
+        telemetry_button.clicked.connect(self.open_telemetry)
+
+        history_button = QPushButton("🕘 Historique")
+        history_button.setObjectName("mainButton")
+        history_button.clicked.connect(self.open_history)
+
         config_layout.addWidget(translate_button)
+        config_layout.addWidget(history_button)
+        config_layout.addWidget(telemetry_button)
         layout.addLayout(config_layout)
 
+        # État du modèle côté Ollama (préchargement)
+        self.model_status_label = QLabel()
+        layout.addWidget(self.model_status_label)
+        self.warmup_worker = None
+
         # Zone de texte d'entrée
         input_label = QLabel("Entre ton texte à reformuler:")
         layout.addWidget(input_label)
 
-        self.input_text = QTextEdit()
+        # Éditeurs en texte brut : un document de plusieurs centaines de Ko se
+        # colle et s'affiche sans mise en page riche
+        self.input_text = QPlainTextEdit()
         self.input_text.setMinimumHeight(100)
         self.input_text.setPlaceholderText("Entrez votre texte ici...")
+        self.input_text.textChanged.connect(self.on_input_changed)
+        # Copie du texte d'entrée, refaite seulement après une modification
+        self.input_snapshot = None
         layout.addWidget(self.input_text)
 
         # Sections de tags
-        self.tone_section = TagSection("Ton:", [
-            "Professionnel", "Informatif", "Décontracté", "Enthousiaste",
-            "Drôle", "Sarcastique"
-        ])
+        self.tone_section = TagSection("Ton:", core.TONES)
         layout.addWidget(self.tone_section)
 
-        self.format_section = TagSection(
-            "Format:", ["Mail", "Paragraphe", "Idées", "Article de blog"])
+        self.format_section = TagSection("Format:", core.FORMATS)
         layout.addWidget(self.format_section)
 
-        self.length_section = TagSection("Longueur:",
-                                         ["Court", "Moyen", "Long"])
+        self.length_section = TagSection("Longueur:", core.LENGTHS)
         layout.addWidget(self.length_section)
-
-        # Bouton Reformuler
+        for section in (self.tone_section, self.format_section,
+                        self.length_section):
+            section.selection_changed.connect(self.schedule_speculation)
+
+        options_layout = QHBoxLayout()
+        self.stream_checkbox = QCheckBox("Affichage progressif")
+        self.stream_checkbox.setChecked(self.stream_output)
+        self.stream_checkbox.toggled.connect(self.set_stream_output)
+        self.bypass_cache_checkbox = QCheckBox("Ignorer le cache")
+        self.bypass_cache_checkbox.setChecked(self.bypass_cache)
+        self.bypass_cache_checkbox.toggled.connect(self.set_bypass_cache)
+        self.document_checkbox = QCheckBox("Document long")
+        self.document_checkbox.setToolTip(
+            "Découpe le texte et reformule les parties en parallèle")
+        self.document_checkbox.toggled.connect(self.schedule_speculation)
+        options_layout.addWidget(self.stream_checkbox)
+        options_layout.addWidget(self.bypass_cache_checkbox)
+        options_layout.addWidget(self.document_checkbox)
+
+        # Reformulation anticipée dès que le texte et les tags sont stables
+        self.speculative_checkbox = QCheckBox("Anticipation")
+        self.speculative_checkbox.setToolTip(
+            "Lance la reformulation dès que le texte et les tags sont stables")
+        self.speculative_checkbox.toggled.connect(self.schedule_speculation)
+        self.speculation_delay_input = QSpinBox()
+        self.speculation_delay_input.setRange(200, 10000)
+        self.speculation_delay_input.setSingleStep(100)
+        self.speculation_delay_input.setSuffix(" ms")
+        self.speculation_delay_input.setValue(config.SPECULATIVE_DEBOUNCE_MS)
+        self.speculation_delay_input.setToolTip(
+            "Délai sans modification avant de lancer la reformulation")
+        options_layout.addWidget(self.speculative_checkbox)
+        options_layout.addWidget(self.speculation_delay_input)
+
+        # Mode variantes : plusieurs tags par section, une reformulation par
+        # combinaison
+        self.variants_checkbox = QCheckBox("Variantes")
+        self.variants_checkbox.setToolTip(
+            "Plusieurs tags par section : chaque combinaison est reformulée "
+            "en parallèle")
+        self.variants_checkbox.toggled.connect(self.set_variants_mode)
+        options_layout.addWidget(self.variants_checkbox)
+        options_layout.addStretch()
+        layout.addLayout(options_layout)
+        self.speculation = None
+        self.speculation_timer = QTimer(self)
+        self.speculation_timer.setSingleShot(True)
+        self.speculation_timer.timeout.connect(self.start_speculation)
+
+        # Boutons Reformuler/Annuler
+        action_layout = QHBoxLayout()
         self.reformulate_button = QPushButton("Reformuler")
         self.reformulate_button.setObjectName("mainButton")
         self.reformulate_button.clicked.connect(self.reformulate_text)
-        layout.addWidget(self.reformulate_button)
+        self.cancel_button = QPushButton("Annuler")
+        self.cancel_button.setObjectName("mainButton")
+        self.cancel_button.clicked.connect(self.cancel_reformulation)
+        self.cancel_button.hide()
+        action_layout.addWidget(self.reformulate_button)
+        action_layout.addWidget(self.cancel_button)
+        layout.addLayout(action_layout)
+        self.worker = None
+        self.worker_key = None
 
         # Zone de réponse
         response_label = QLabel("Réponse:")
         layout.addWidget(response_label)
 
-        self.output_text = QTextEdit()
+        self.output_text = QPlainTextEdit()
         self.output_text.setMinimumHeight(120)
         self.output_text.setReadOnly(True)
         layout.addWidget(self.output_text)
+        # Réponse coupée par la limite de tokens : elle n'est pas mise en
+        # cache et l'utilisateur en est averti
+        self.truncated_label = QLabel(
+            "Réponse tronquée : la limite de longueur a été atteinte. "
+            "Choisissez une longueur plus grande pour une réponse complète.")
+        self.truncated_label.setWordWrap(True)
+        self.truncated_label.setStyleSheet("color: #ffb74d;")
+        self.truncated_label.hide()
+        layout.addWidget(self.truncated_label)
+        # Tokens reçus regroupés en blocs avant insertion, et morceaux déjà
+        # affichés pour éviter de réécrire la réponse finale
+        self.pending_output = []
+        self.output_pieces = []
+        # Parties d'un document long, dans l'ordre (None : en cours)
+        self.document_parts = []
+        self.output_flush_timer = QTimer(self)
+        self.output_flush_timer.setSingleShot(True)
+        self.output_flush_timer.setInterval(OUTPUT_FLUSH_MS)
+        self.output_flush_timer.timeout.connect(self.flush_output)
+
+        # Résultats du mode variantes, côte à côte
+        self.variants_scroll = QScrollArea()
+        self.variants_scroll.setWidgetResizable(True)
+        self.variants_scroll.setFrameShape(QFrame.Shape.NoFrame)
+        self.variants_scroll.setMinimumHeight(120)
+        self.variants_scroll.setVerticalScrollBarPolicy(
+            Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.variants_scroll.viewport().setAutoFillBackground(False)
+        variants_container = QWidget()
+        self.variants_layout = QHBoxLayout(variants_container)
+        self.variants_layout.setContentsMargins(0, 0, 0, 0)
+        self.variants_layout.setSpacing(10)
+        self.variants_layout.addStretch()
+        self.variants_scroll.setWidget(variants_container)
+        variants_container.setAutoFillBackground(False)
+        self.variants_scroll.hide()
+        layout.addWidget(self.variants_scroll)
+        self.variant_cards = []
 
         # Boutons Copier/Effacer
         buttons_layout = QHBoxLayout()
@@ -1310,85 +1679,618 @@ Respecte scrupuleusement le format demandé, la longueur et le ton. Ne rajoute a
         self.setMinimumSize(900, 1000)
         self.resize(900, 1000)
 
+        # Préchargement du modèle une fois la fenêtre affichée
+        QTimer.singleShot(0, self.warm_up_model)
+
+    @property
+    def ollama_url(self):
+        return self.client.base_url
+
+    @ollama_url.setter
+    def ollama_url(self, url):
+        self.client.base_url = url.rstrip('/')
+
     def open_settings(self):
-        dialog = SettingsDialog(self.ollama_url, self)
+        dialog = SettingsDialog(self.ollama_url,
+                                self.current_model,
+                                self.client,
+                                cache=self.cache,
+                                catalog=self.model_catalog,
+                                parent=self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            self.ollama_url = dialog.url_input.text()
-            selected_model = dialog.models_combo.currentText()
+            previous = (self.ollama_url, self.current_model,
+                        self.client.keep_alive)
+            self.client.set_urls(dialog.endpoint_urls())
+            self.client.connect_timeout = dialog.connect_timeout_input.value()
+            self.client.read_timeout = dialog.read_timeout_input.value()
+            self.client.keep_alive = (dialog.keep_alive_input.text().strip()
+                                      or config.KEEP_ALIVE)
+            selected_model = dialog.selected_model()
             print(f"Modèle sélectionné: {selected_model}")  # Debug
             if selected_model:
                 self.current_model = selected_model
                 print(f"Modèle sauvegardé: {self.current_model}")  # Debug
+            if (self.ollama_url, self.current_model,
+                    self.client.keep_alive) != previous:
+                self.warm_up_model()
+                self.schedule_speculation()
+
+    def warm_up_model(self):
+        # Charge le modèle en arrière-plan pour que la première requête ne
+        # paie pas le temps de chargement
+        if self.warmup_worker is not None:
+            self.warmup_worker.cancel()
+        client = self.client
+        model = self.current_model
+        worker = RequestWorker(
+            lambda token, emit: client.preload(
+                model, cancel_token=token, options=core.preload_options()))
+        worker.succeeded.connect(lambda _: self.show_model_status(
+            worker, f"Modèle {model} : prêt (maintenu {client.keep_alive})"))
+        worker.failed.connect(lambda error: self.show_model_status(
+            worker, f"Modèle {model} : erreur de chargement ({error})"))
+        worker.finished.connect(lambda: self.on_warmup_finished(worker))
+        self.warmup_worker = worker
+        self.model_status_label.setText(f"Modèle {model} : chargement...")
+        worker.start()
+
+    def show_model_status(self, worker, status):
+        if worker is self.warmup_worker:
+            self.model_status_label.setText(status)
+
+    def on_warmup_finished(self, worker):
+        if worker is self.warmup_worker:
+            self.warmup_worker = None
 
     def open_prompt_config(self):
-        dialog = PromptDialog(self.system_prompt, self)
+        dialog = PromptDialog(self.system_prompt, self.cleanup_patterns,
+                              self.stop_sequences, self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             self.system_prompt = dialog.prompt_text.toPlainText()
+            self.cleanup_patterns = dialog.cleanup_patterns()
+            self.stop_sequences = dialog.stop_sequences()
+            self.schedule_speculation()
 
     def open_translation(self):
-        dialog = TranslationDialog(self)
-        dialog.exec()
+        # Construit au premier usage puis réutilisé
+        if self.translation_dialog is None:
+            self.translation_dialog = TranslationDialog(self)
+        self.translation_dialog.exec()
+
+    def open_telemetry(self):
+        # Non modal : le panneau reste ouvert pendant les générations
+        if self.telemetry_dialog is None:
+            self.telemetry_dialog = TelemetryDialog(self.telemetry, self)
+        self.telemetry_dialog.show()
+        self.telemetry_dialog.raise_()
+
+    def open_history(self):
+        if self.history_dialog is None:
+            self.history_dialog = HistoryDialog(self.history, self)
+        self.history_dialog.show()
+        self.history_dialog.raise_()
+
+    def add_history(self, kind, model, params, input_text, output_text,
+                    worker=None):
+        if not output_text:
+            return
+        try:
+            self.history.add(kind, model, params, input_text, output_text,
+                             worker.elapsed_ms() if worker else None)
+        except Exception as e:
+            # L'historique ne doit jamais bloquer l'affichage du résultat
+            print(f"Erreur lors de l'enregistrement de l'historique: {e}")
+            return
+        if (self.history_dialog is not None
+                and self.history_dialog.isVisible()):
+            self.history_dialog.model.refresh()
+
+    def record_reformulation(self, request, worker, text):
+        self.add_history(
+            'reformulation', request.model, {
+                'tone': request.tone,
+                'format': request.text_format,
+                'length': request.length
+            }, request.text, text, worker)
+
+    def restore_history_entry(self, entry):
+        # Le texte et le résultat enregistrés reviennent tels quels, sans
+        # nouvelle requête
+        if entry['kind'] == 'traduction':
+            if self.translation_dialog is None:
+                self.translation_dialog = TranslationDialog(self)
+            self.translation_dialog.restore_entry(entry)
+            if not self.translation_dialog.isVisible():
+                self.open_translation()
+            return
+        # Le résultat restauré ne doit pas être remplacé par celui d'une
+        # reformulation encore en cours
+        self.preempt_reformulation()
+        if self.variants_checkbox.isChecked():
+            self.variants_checkbox.setChecked(False)
+        params = entry['params']
+        self.tone_section.select_tag(params.get('tone'))
+        self.format_section.select_tag(params.get('format'))
+        self.length_section.select_tag(params.get('length'))
+        self.input_text.setPlainText(entry['input'])
+        self.set_output(entry['output'])
+        # Pas de reformulation anticipée d'un texte déjà traité
+        self.cancel_speculation()
+
+    def on_input_changed(self):
+        self.input_snapshot = None
+        self.schedule_speculation()
+
+    def input_plain_text(self):
+        if self.input_snapshot is None:
+            self.input_snapshot = self.input_text.toPlainText().strip()
+        return self.input_snapshot
+
+    def current_request(self):
+        input_text = self.input_plain_text()
+        # Les textes trop longs pour un seul prompt passent par le découpage
+        document_mode = (self.document_checkbox.isChecked()
+                         or estimate_tokens(input_text)
+                         > config.LONG_DOCUMENT_TOKENS)
+        return ReformulationRequest(input_text,
+                                    self.tone_section.getSelectedTag(),
+                                    self.format_section.getSelectedTag(),
+                                    self.length_section.getSelectedTag(),
+                                    self.current_model, self.system_prompt,
+                                    document_mode, self.cleanup_patterns,
+                                    self.stop_sequences)
+
+    def cached_reformulation(self, request):
+        if self.bypass_cache:
+            return None
+        return self.cache.get(
+            core.reformulation_cache_key(
+                request.model,
+                request.system_prompt,
+                request.text,
+                request.tone,
+                request.text_format,
+                request.length,
+                cleanup_patterns=request.cleanup_patterns,
+                stop=request.stop))
+
+    def reformulation_task(self, request, stream):
+        client = self.client
+        cache = self.cache
+
+        def task(cancel_token, emit):
+            if request.document_mode:
+                return core.reformulate_document(
+                    client,
+                    request.model,
+                    request.system_prompt,
+                    request.text,
+                    request.tone,
+                    request.text_format,
+                    request.length,
+                    cache=cache,
+                    read_cache=False,
+                    on_part=lambda *part: emit(part),
+                    cancel_token=cancel_token,
+                    cleanup_patterns=request.cleanup_patterns,
+                    stop=request.stop)
+            return core.reformulate(client,
+                                    request.model,
+                                    request.system_prompt,
+                                    request.text,
+                                    request.tone,
+                                    request.text_format,
+                                    request.length,
+                                    cache=cache,
+                                    read_cache=False,
+                                    on_chunk=emit if stream else None,
+                                    cancel_token=cancel_token,
+                                    cleanup_patterns=request.cleanup_patterns,
+                                    stop=request.stop)
+
+        return task
 
     def reformulate_text(self):
-        input_text = self.input_text.toPlainText().strip()
-        if not input_text:
+        # Nouveau clic pendant une reformulation : la demande en cours est
+        # remplacée, sauf si elle est identique
+        if self.worker is not None:
+            if self.worker_key == self.current_job_key():
+                return
+            self.preempt_reformulation()
+        if self.variants_checkbox.isChecked():
+            self.reformulate_variants()
+            return
+        request = self.current_request()
+        if not request.text:
             return
 
-        prompt = f"""<|im_start|>system
-{self.system_prompt}
-<|im_end|>
-<|im_start|>user
-Texte à reformuler: {input_text}
-Ton: {self.tone_section.getSelectedTag()}
-Format: {self.format_section.getSelectedTag()}
-Longueur: {self.length_section.getSelectedTag()}
-<|im_end|>
-<|im_start|>assistant"""
+        self.speculation_timer.stop()
+        job = self.speculation
+        if job is not None and job.request == request:
+            self.speculation = None
+            self.adopt_speculation(job)
+            return
+        self.cancel_speculation()
 
-        try:
-            self.reformulate_button.setEnabled(False)
-            self.reformulate_button.setText("En cours...")
-
-            response = requests.post(f'{self.ollama_url}/api/generate',
-                                     json={
-                                         "model": self.current_model,
-                                         "prompt": prompt,
-                                         "stream": False
-                                     })
-
-            if response.status_code == 200:
-                result = response.json()
-                reformulated_text = result['response']
-
-                # Nettoyage du texte
-                lines = reformulated_text.split('\n')
-                cleaned_lines = [
-                    line for line in lines
-                    if not any(x in line.lower() for x in [
-                        'paramètre', 'ton:', 'format:', 'longueur:', 'voici',
-                        'reformulation'
-                    ])
-                ]
-                cleaned_text = '\n'.join(cleaned_lines).strip()
-
-                self.output_text.setText(cleaned_text)
-            else:
-                self.output_text.setText(
-                    "Erreur lors de la reformulation. Veuillez réessayer.")
+        cached_text = self.cached_reformulation(request)
+        if cached_text is not None:
+            print("Reformulation servie depuis le cache")
+            self.set_output(cached_text)
+            self.record_reformulation(request, None, cached_text)
+            return
 
-        except Exception as e:
-            self.output_text.setText(
-                f"Erreur lors de la reformulation: {str(e)}")
-        finally:
-            self.reformulate_button.setEnabled(True)
-            self.reformulate_button.setText("Reformuler")
+        worker = RequestWorker(
+            self.reformulation_task(request, self.stream_output))
+        worker.progress.connect(
+            if_current(self, worker,
+                       lambda value: self.show_progress(request, value)))
+        worker.succeeded.connect(
+            if_current(self, worker, self.on_reformulation_done))
+        worker.succeeded.connect(
+            if_current(
+                self, worker, lambda result: self.record_reformulation(
+                    request, worker, result)))
+        worker.failed.connect(
+            if_current(self, worker, self.on_reformulation_failed))
+        worker.cancelled.connect(
+            if_current(self, worker, self.on_reformulation_cancelled))
+        worker.finished.connect(lambda: self.on_worker_finished(worker))
+        self.set_output('')
+        self.set_busy(worker, request)
+        worker.start()
+
+    def set_variants_mode(self, enabled):
+        for section in (self.tone_section, self.format_section,
+                        self.length_section):
+            section.set_multi_select(enabled)
+        self.output_text.setVisible(not enabled)
+        self.truncated_label.hide()
+        self.variants_scroll.setVisible(enabled)
+        self.schedule_speculation()
+
+    def reformulate_variants(self):
+        request = self.current_request()
+        if not request.text:
+            return
+        combinations = list(
+            product(self.tone_section.getSelectedTags(),
+                    self.format_section.getSelectedTags(),
+                    self.length_section.getSelectedTags()))
+        self.clear_variant_cards()
+        if not combinations:
+            self.show_variants_message(
+                "Sélectionne au moins un tag dans chaque section.")
+            return
+        if len(combinations) > config.MAX_VARIANTS:
+            self.show_variants_message(
+                f"{len(combinations)} combinaisons sélectionnées : "
+                f"{config.MAX_VARIANTS} au maximum.")
+            return
+        if request.document_mode:
+            self.show_variants_message(
+                "Les variantes ne sont pas disponibles pour les documents "
+                "longs.")
+            return
+
+        for combination in combinations:
+            card = VariantCard(" · ".join(combination))
+            self.variants_layout.insertWidget(len(self.variant_cards), card)
+            self.variant_cards.append(card)
+
+        client = self.client
+        cache = self.cache
+        read_cache = not self.bypass_cache
+        # Autant de requêtes simultanées que d'emplacements parallèles du
+        # serveur, les suivantes attendent leur tour
+        max_workers = min(config.MAX_PARALLEL_REQUESTS, len(combinations))
+        worker = RequestWorker(lambda token, emit: core.reformulate_variants(
+            client,
+            request.model,
+            request.system_prompt,
+            request.text,
+            combinations,
+            max_workers=max_workers,
+            cache=cache,
+            read_cache=read_cache,
+            on_result=lambda *result: emit(result),
+            cancel_token=token,
+            cleanup_patterns=request.cleanup_patterns,
+            stop=request.stop))
+        worker.progress.connect(
+            if_current(
+                self, worker, lambda result: self.on_variant_done(
+                    request, combinations, worker, result)))
+        worker.failed.connect(
+            if_current(
+                self, worker, lambda error: self.show_variants_message(
+                    f"Erreur lors de la reformulation: {error}")))
+        worker.cancelled.connect(
+            if_current(self, worker, self.on_variants_cancelled))
+        worker.finished.connect(lambda: self.on_worker_finished(worker))
+        self.set_busy(worker, ('variantes', request, tuple(combinations)))
+        worker.start()
+
+    def on_variant_done(self, request, combinations, worker, result):
+        index, text, error = result
+        card = self.variant_cards[index]
+        if error is not None:
+            card.text.setPlainText(
+                f"Erreur lors de la reformulation: {error}")
+        else:
+            card.set_result(text)
+            tone, text_format, length = combinations[index]
+            self.record_reformulation(
+                request._replace(tone=tone,
+                                 text_format=text_format,
+                                 length=length), worker, text)
+
+    def on_variants_cancelled(self):
+        for card in self.variant_cards:
+            if not card.text.toPlainText():
+                card.text.setPlaceholderText("Reformulation annulée.")
+
+    def show_variants_message(self, message):
+        card = VariantCard("Variantes")
+        card.text.setPlainText(message)
+        self.variants_layout.insertWidget(len(self.variant_cards), card)
+        self.variant_cards.append(card)
+
+    def clear_variant_cards(self):
+        for card in self.variant_cards:
+            self.variants_layout.removeWidget(card)
+            card.deleteLater()
+        self.variant_cards = []
+
+    def set_busy(self, worker, key):
+        # key décrit la demande traitée : toute modification de la demande
+        # l'interrompt. Le bouton reste actif pour relancer.
+        self.worker = worker
+        self.worker_key = key
+        self.reformulate_button.setText("En cours...")
+        self.cancel_button.show()
+
+    def set_idle(self):
+        self.worker = None
+        self.worker_key = None
+        self.reformulate_button.setText("Reformuler")
+        self.cancel_button.hide()
+
+    def current_job_key(self):
+        request = self.current_request()
+        if not self.variants_checkbox.isChecked():
+            return request
+        return ('variantes', request,
+                tuple(
+                    product(self.tone_section.getSelectedTags(),
+                            self.format_section.getSelectedTags(),
+                            self.length_section.getSelectedTags())))
+
+    def preempt_reformulation(self):
+        # Le travail remplacé ferme sa connexion pour qu'Ollama arrête de
+        # générer ; ses derniers signaux sont ignorés
+        worker = self.worker
+        if worker is None:
+            return
+        self.set_idle()
+        worker.cancel()
+
+    def preempt_if_stale(self):
+        if self.worker is None:
+            return
+        key = self.worker_key
+        if key == self.current_job_key():
+            return
+        print("Demande modifiée : reformulation en cours interrompue")
+        self.preempt_reformulation()
+        if not isinstance(key, ReformulationRequest):
+            self.on_variants_cancelled()
+        else:
+            self.set_output("Reformulation interrompue : la demande a changé.")
+
+    def show_progress(self, request, value):
+        if request.document_mode:
+            self.show_document_part(value)
+        elif self.stream_output:
+            self.append_output(value)
+
+    def schedule_speculation(self, *_):
+        # Toute modification rend le calcul anticipé obsolète : il est
+        # annulé aussitôt pour libérer le serveur, comme la reformulation en
+        # cours si elle ne correspond plus à la demande
+        self.preempt_if_stale()
+        self.cancel_speculation()
+        if self.speculative_checkbox.isChecked():
+            self.speculation_timer.start(self.speculation_delay_input.value())
+
+    def cancel_speculation(self):
+        self.speculation_timer.stop()
+        if self.speculation is not None:
+            self.speculation.worker.cancel()
+            self.speculation = None
+
+    def start_speculation(self):
+        if (self.worker is not None or self.speculation is not None
+                or self.variants_checkbox.isChecked()):
+            return
+        request = self.current_request()
+        # Les documents longs mobiliseraient le serveur pour plusieurs
+        # parties : ils ne sont pas anticipés
+        if (not request.text or request.document_mode
+                or self.cached_reformulation(request) is not None):
+            return
+        worker = RequestWorker(self.reformulation_task(request, True))
+        job = SpeculativeJob(request, worker)
+        worker.progress.connect(
+            lambda value: self.on_speculation_progress(job, value))
+        worker.succeeded.connect(
+            lambda result: self.on_speculation_outcome(job, 'succeeded',
+                                                       result))
+        worker.failed.connect(
+            lambda error: self.on_speculation_outcome(job, 'failed', error))
+        worker.cancelled.connect(
+            lambda: self.on_speculation_outcome(job, 'cancelled', None))
+        worker.finished.connect(lambda: self.on_speculation_finished(job))
+        self.speculation = job
+        print("Reformulation anticipée lancée")
+        worker.start()
+
+    def on_speculation_progress(self, job, value):
+        job.events.append(value)
+        if job.adopted and job.worker is self.worker:
+            self.show_progress(job.request, value)
+
+    def on_speculation_outcome(self, job, outcome, value):
+        job.outcome = (outcome, value)
+        if job.adopted and job.worker is self.worker:
+            self.show_outcome(job)
+
+    def on_speculation_finished(self, job):
+        if job.adopted:
+            self.on_worker_finished(job.worker)
+        elif self.speculation is job and job.outcome[0] != 'succeeded':
+            self.speculation = None
+
+    def adopt_speculation(self, job):
+        # Le résultat anticipé, terminé ou en cours, s'affiche aussitôt
+        print("Reformulation anticipée réutilisée")
+        job.adopted = True
+        self.set_output('')
+        if job.outcome is not None:
+            self.show_outcome(job)
+            return
+        for value in job.events:
+            self.show_progress(job.request, value)
+        self.set_busy(job.worker, job.request)
+
+    def show_outcome(self, job):
+        outcome, value = job.outcome
+        if outcome == 'succeeded':
+            self.on_reformulation_done(value)
+            self.record_reformulation(job.request, job.worker, value)
+        elif outcome == 'failed':
+            self.on_reformulation_failed(value)
+        else:
+            self.on_reformulation_cancelled()
+
+    def cancel_reformulation(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def set_output(self, text):
+        # Remplacement complet : réservé aux changements de réponse
+        self.output_flush_timer.stop()
+        self.pending_output = []
+        self.output_pieces = []
+        self.document_parts = []
+        self.output_text.setPlainText(text)
+        self.truncated_label.hide()
+
+    def append_output(self, token):
+        self.pending_output.append(token)
+        if not self.output_flush_timer.isActive():
+            self.output_flush_timer.start()
+
+    def flush_output(self):
+        self.output_flush_timer.stop()
+        if not self.pending_output:
+            return
+        block = ''.join(self.pending_output)
+        self.pending_output = []
+        self.output_pieces.append(block)
+        cursor = self.output_text.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(block)
+        self.output_text.setTextCursor(cursor)
+
+    def document_part_text(self, index):
+        text = self.document_parts[index]
+        if text is None:
+            return (f"[Partie {index + 1}/{len(self.document_parts)} "
+                    f"en cours...]")
+        return text
+
+    def document_layout(self):
+        return '\n\n'.join(
+            self.document_part_text(i)
+            for i in range(len(self.document_parts)))
+
+    def show_document_part(self, part):
+        # Les parties terminées s'affichent à leur place, dans l'ordre : seul
+        # le texte de la partie est remplacé
+        index, text, total = part
+        if len(self.document_parts) != total:
+            self.document_parts = [None] * total
+        elif (self.output_text.document().characterCount() ==
+              qt_length(self.document_layout()) + 1):
+            self.replace_document_part(index, text)
+            return
+        # Première partie, ou sortie remplacée entre-temps : les positions ne
+        # correspondent plus, tout est réaffiché
+        self.document_parts[index] = text
+        parts = self.document_parts
+        self.set_output(self.document_layout())
+        self.document_parts = parts
+
+    def replace_document_part(self, index, text):
+        start = sum(
+            qt_length(self.document_part_text(i)) + 2 for i in range(index))
+        cursor = self.output_text.textCursor()
+        cursor.setPosition(start)
+        cursor.setPosition(start + qt_length(self.document_part_text(index)),
+                           QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(text)
+        self.document_parts[index] = text
+
+    def on_reformulation_done(self, reformulated_text):
+        # Réponse déjà affichée au fil de l'eau ou partie par partie : rien à
+        # réécrire
+        self.flush_output()
+        if self.output_pieces:
+            shown = ''.join(self.output_pieces)
+        elif self.document_parts and None not in self.document_parts:
+            shown = '\n\n'.join(self.document_parts)
+        else:
+            shown = None
+        if shown is None or shown.rstrip() != reformulated_text:
+            self.set_output(reformulated_text)
+        elif shown != reformulated_text:
+            # Seuls les blancs finaux diffèrent : ils sont retirés sur place
+            cursor = self.output_text.textCursor()
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.movePosition(QTextCursor.MoveOperation.Left,
+                                QTextCursor.MoveMode.KeepAnchor,
+                                qt_length(shown) -
+                                qt_length(reformulated_text))
+            cursor.removeSelectedText()
+        self.truncated_label.setVisible(core.is_truncated(reformulated_text))
+
+    def on_reformulation_failed(self, error):
+        self.set_output(f"Erreur lors de la reformulation: {error}")
+
+    def on_reformulation_cancelled(self):
+        self.set_output("Reformulation annulée.")
+
+    def on_worker_finished(self, worker):
+        if worker is not self.worker:
+            return
+        self.set_idle()
+
+    def set_stream_output(self, enabled):
+        self.stream_output = enabled
+
+    def set_bypass_cache(self, enabled):
+        self.bypass_cache = enabled
 
     def copy_to_clipboard(self):
         clipboard = QApplication.clipboard()
         clipboard.setText(self.output_text.toPlainText())
 
     def clear_output(self):
-        self.output_text.clear()
+        # Les résultats tardifs de la demande en cours n'ont plus de place où
+        # s'afficher : elle est interrompue
+        self.preempt_reformulation()
+        self.set_output('')
+        self.clear_variant_cards()
 
 
 class TranslationDialog(QDialog):
@@ -1404,7 +2306,7 @@ class TranslationDialog(QDialog):
                 color: white;
                 font-size: 13px;
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: #3d3d3d;
                 color: white;
                 border: none;
@@ -1433,6 +2335,31 @@ class TranslationDialog(QDialog):
             QPushButton:hover {
                 background-color: #45a049;
             }
+            QCheckBox {
+                color: white;
+                font-size: 13px;
+            }
+            QSpinBox {
+                background-color: #3d3d3d;
+                color: white;
+                border: none;
+                border-radius: 8px;
+                padding: 8px;
+                font-size: 13px;
+            }
+            QTabWidget::pane {
+                border: none;
+            }
+            QTabBar::tab {
+                background-color: #3d3d3d;
+                color: white;
+                padding: 8px 15px;
+                border-top-left-radius: 8px;
+                border-top-right-radius: 8px;
+            }
+            QTabBar::tab:selected {
+                background-color: #4CAF50;
+            }
         """)
 
         layout = QVBoxLayout(self)
@@ -1441,7 +2368,7 @@ class TranslationDialog(QDialog):
 
         # Zone de texte d'entrée
         input_label = QLabel("Texte à traduire:")
-        self.input_text = QTextEdit()
+        self.input_text = QPlainTextEdit()
         self.input_text.setPlaceholderText("Entrez votre texte ici...")
         layout.addWidget(input_label)
         layout.addWidget(self.input_text)
@@ -1450,25 +2377,67 @@ class TranslationDialog(QDialog):
         lang_layout = QHBoxLayout()
         lang_label = QLabel("Traduire vers:")
         self.lang_combo = QComboBox()
-        self.lang_combo.addItems([
-            "Anglais", "Français", "Espagnol", "Allemand", "Italien",
-            "Portugais"
-        ])
+        self.lang_combo.addItems(core.LANGUAGES)
         lang_layout.addWidget(lang_label)
         lang_layout.addWidget(self.lang_combo)
+        self.bypass_cache_checkbox = QCheckBox("Ignorer le cache")
+        self.bypass_cache_checkbox.setChecked(parent.bypass_cache)
+        lang_layout.addWidget(self.bypass_cache_checkbox)
         layout.addLayout(lang_layout)
 
-        # Bouton traduire
+        # Traduction simultanée vers plusieurs langues
+        multi_layout = QHBoxLayout()
+        self.language_checkboxes = {}
+        for lang in core.LANGUAGES:
+            checkbox = QCheckBox(lang)
+            checkbox.setChecked(lang != "Français")
+            self.language_checkboxes[lang] = checkbox
+            multi_layout.addWidget(checkbox)
+        multi_layout.addStretch()
+        multi_layout.addWidget(QLabel("Requêtes simultanées:"))
+        self.concurrency_input = QSpinBox()
+        self.concurrency_input.setRange(1, 16)
+        self.concurrency_input.setValue(config.MAX_PARALLEL_REQUESTS)
+        multi_layout.addWidget(self.concurrency_input)
+        layout.addLayout(multi_layout)
+
+        # Boutons traduire/annuler
+        translate_layout = QHBoxLayout()
         self.translate_button = QPushButton("Traduire")
         self.translate_button.clicked.connect(self.translate_text)
-        layout.addWidget(self.translate_button)
-
-        # Zone de texte de sortie
+        self.cancel_button = QPushButton("Annuler")
+        self.cancel_button.clicked.connect(self.cancel_translation)
+        self.cancel_button.hide()
+        self.translate_all_button = QPushButton(
+            "Traduire vers les langues cochées")
+        self.translate_all_button.clicked.connect(self.translate_all)
+        translate_layout.addWidget(self.translate_button)
+        translate_layout.addWidget(self.translate_all_button)
+        translate_layout.addWidget(self.cancel_button)
+        layout.addLayout(translate_layout)
+        self.worker = None
+        self.worker_key = None
+        # Une traduction en cours qui ne correspond plus au texte ou aux
+        # langues choisies est interrompue
+        self.input_text.textChanged.connect(self.preempt_if_stale)
+        self.lang_combo.currentTextChanged.connect(self.preempt_if_stale)
+        for checkbox in self.language_checkboxes.values():
+            checkbox.toggled.connect(self.preempt_if_stale)
+
+        # Zone de texte de sortie, puis un onglet par langue en mode multiple
         output_label = QLabel("Traduction:")
-        self.output_text = QTextEdit()
+        self.output_text = QPlainTextEdit()
         self.output_text.setReadOnly(True)
+        self.results_tabs = QTabWidget()
+        self.results_tabs.addTab(self.output_text, "Traduction")
+        self.language_outputs = {}
         layout.addWidget(output_label)
-        layout.addWidget(self.output_text)
+        layout.addWidget(self.results_tabs)
+        self.truncated_label = QLabel(
+            "Traduction tronquée : la limite de longueur a été atteinte.")
+        self.truncated_label.setStyleSheet("color: #ffb74d;")
+        self.truncated_label.hide()
+        layout.addWidget(self.truncated_label)
 
         # Boutons copier/fermer
         buttons_layout = QHBoxLayout()
@@ -1489,50 +2458,278 @@ class TranslationDialog(QDialog):
         self.output_text.setMinimumHeight(200)  # Zone de texte de sortie plus
 
     def translate_text(self):
+        key = self.job_key('traduction')
+        if self.worker is not None:
+            if self.worker_key == key:
+                return
+            self.preempt_translation()
         input_text = self.input_text.toPlainText().strip()
         target_lang = self.lang_combo.currentText()
         if not input_text:
             return
-        prompt = f"""<|im_start|>system
-    Tu es un traducteur automatique. Détecte automatiquement la langue source du texte et traduis-le en {target_lang}. Retourne UNIQUEMENT la traduction, sans aucun autre commentaire.
-    <|im_end|>
-    <|im_start|>user
-    {input_text}
-    <|im_end|>
-    <|im_start|>assistant"""
-        try:
-            self.translate_button.setEnabled(False)
-            self.translate_button.setText("En cours...")
-            response = requests.post(
-                f'{self.parent().ollama_url}/api/generate',
-                json={
-                    "model": self.parent().current_model,
-                    "prompt": prompt,
-                    "stream": False
-                })
-
-            if response.status_code == 200:
-                result = response.json()
-                translated_text = result['response'].strip()
-                self.output_text.setText(translated_text)
-            else:
-                self.output_text.setText(
-                    "Erreur lors de la traduction. Veuillez réessayer.")
+        client = self.parent().client
+        model = self.parent().current_model
+        cache = self.parent().cache
+        if not self.bypass_cache_checkbox.isChecked():
+            cached_text = cache.get(
+                core.translation_cache_key(model, input_text, target_lang))
+            if cached_text is not None:
+                print("Traduction servie depuis le cache")
+                self.output_text.setPlainText(cached_text)
+                self.truncated_label.hide()
+                self.results_tabs.setCurrentWidget(self.output_text)
+                self.parent().add_history('traduction', model,
+                                          {'target_lang': target_lang},
+                                          input_text, cached_text)
+                return
+        worker = RequestWorker(lambda token, emit: core.translate(
+            client,
+            model,
+            input_text,
+            target_lang,
+            cache=cache,
+            read_cache=False,
+            cancel_token=token))
+        worker.succeeded.connect(
+            if_current(self, worker, self.on_translation_done))
+        worker.succeeded.connect(
+            if_current(
+                self, worker, lambda result: self.parent().add_history(
+                    'traduction', model, {'target_lang': target_lang},
+                    input_text, result, worker)))
+        worker.failed.connect(
+            if_current(self, worker, self.on_translation_failed))
+        worker.cancelled.connect(
+            if_current(self, worker, self.on_translation_cancelled))
+        self.output_text.clear()
+        self.truncated_label.hide()
+        self.results_tabs.setCurrentWidget(self.output_text)
+        self.start_worker(worker, key)
+
+    def translate_all(self):
+        key = self.job_key('traductions')
+        if self.worker is not None:
+            if self.worker_key == key:
+                return
+            self.preempt_translation()
+        input_text = self.input_text.toPlainText().strip()
+        languages = [
+            lang for lang, checkbox in self.language_checkboxes.items()
+            if checkbox.isChecked()
+        ]
+        if not input_text or not languages:
+            return
+        client = self.parent().client
+        model = self.parent().current_model
+        cache = self.parent().cache
+        read_cache = not self.bypass_cache_checkbox.isChecked()
+        max_workers = self.concurrency_input.value()
+
+        # Un onglet par langue, rempli dès que sa traduction est prête
+        while self.results_tabs.count() > 1:
+            # removeTab ne détruit pas la page retirée
+            page = self.results_tabs.widget(1)
+            self.results_tabs.removeTab(1)
+            page.deleteLater()
+        self.language_outputs = {}
+        for lang in languages:
+            output = QPlainTextEdit()
+            output.setReadOnly(True)
+            output.setPlaceholderText("Traduction en cours...")
+            self.language_outputs[lang] = output
+            self.results_tabs.addTab(output, lang)
+        self.results_tabs.setCurrentIndex(1)
+        self.truncated_label.hide()
+
+        def task(cancel_token, emit):
+            return core.translate_many(
+                client,
+                model,
+                input_text,
+                languages,
+                max_workers=max_workers,
+                cache=cache,
+                read_cache=read_cache,
+                on_result=lambda *result: emit(result),
+                cancel_token=cancel_token)
+
+        worker = RequestWorker(task)
+        worker.progress.connect(
+            if_current(self, worker, self.on_language_done))
+        worker.progress.connect(
+            if_current(
+                self, worker, lambda result: self.parent().add_history(
+                    'traduction', model, {'target_lang': result[0]},
+                    input_text, result[1] if not result[2] else '', worker)))
+        worker.failed.connect(
+            if_current(self, worker, self.on_translation_failed))
+        worker.cancelled.connect(
+            if_current(self, worker, self.on_translation_cancelled))
+        self.start_worker(worker, key)
+
+    def job_key(self, kind):
+        # kind : "traduction" (langue du menu) ou "traductions" (langues
+        # cochées)
+        if kind == 'traduction':
+            languages = self.lang_combo.currentText()
+        else:
+            languages = tuple(
+                lang for lang, checkbox in self.language_checkboxes.items()
+                if checkbox.isChecked())
+        return (kind, self.parent().current_model,
+                self.input_text.toPlainText().strip(), languages)
+
+    def start_worker(self, worker, key):
+        # Les boutons restent actifs : un nouveau clic remplace la demande
+        worker.finished.connect(lambda: self.on_worker_finished(worker))
+        self.worker = worker
+        self.worker_key = key
+        self.translate_button.setText("En cours...")
+        self.cancel_button.show()
+        worker.start()
+
+    def set_idle(self):
+        self.worker = None
+        self.worker_key = None
+        self.translate_button.setText("Traduire")
+        self.cancel_button.hide()
+
+    def preempt_translation(self):
+        # Connexion fermée : Ollama arrête de générer, les derniers signaux
+        # du travail remplacé sont ignorés
+        worker = self.worker
+        if worker is None:
+            return
+        self.set_idle()
+        worker.cancel()
 
-        except Exception as e:
-            self.output_text.setText(f"Erreur lors de la traduction: {str(e)}")
-        finally:
-            self.translate_button.setEnabled(True)
-            self.translate_button.setText("Traduire")
+    def preempt_if_stale(self, *_):
+        if self.worker is None:
+            return
+        if self.job_key(self.worker_key[0]) == self.worker_key:
+            return
+        print("Demande modifiée : traduction en cours interrompue")
+        self.preempt_translation()
+        self.mark_unfinished("Traduction interrompue : la demande a changé.")
+
+    def on_language_done(self, result):
+        target_lang, translated_text, error = result
+        output = self.language_outputs.get(target_lang)
+        if output is None:
+            return
+        if error:
+            output.setPlainText(f"Erreur lors de la traduction: {error}")
+        else:
+            output.setPlainText(translated_text)
+            if core.is_truncated(translated_text):
+                self.results_tabs.setTabText(
+                    self.results_tabs.indexOf(output),
+                    f"{target_lang} (tronquée)")
+                self.truncated_label.show()
+
+    def restore_entry(self, entry):
+        self.preempt_translation()
+        self.input_text.setPlainText(entry['input'])
+        self.lang_combo.setCurrentText(entry['params'].get('target_lang', ''))
+        self.output_text.setPlainText(entry['output'])
+        self.truncated_label.hide()
+        self.results_tabs.setCurrentWidget(self.output_text)
+
+    def cancel_translation(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def on_translation_done(self, translated_text):
+        self.output_text.setPlainText(translated_text)
+        self.truncated_label.setVisible(core.is_truncated(translated_text))
+
+    def on_translation_failed(self, error):
+        self.results_tabs.currentWidget().setPlainText(
+            f"Erreur lors de la traduction: {error}")
+
+    def on_translation_cancelled(self):
+        self.mark_unfinished("Traduction annulée.")
+
+    def mark_unfinished(self, message):
+        for output in [self.output_text, *self.language_outputs.values()]:
+            if not output.toPlainText():
+                output.setPlainText(message)
+
+    def on_worker_finished(self, worker):
+        if worker is not self.worker:
+            return
+        self.set_idle()
+
+    def done(self, result):
+        self.cancel_translation()
+        super().done(result)
 
     def copy_translation(self):
         clipboard = QApplication.clipboard()
-        clipboard.setText(self.output_text.toPlainText())
+        clipboard.setText(self.results_tabs.currentWidget().toPlainText())
+
+
+class StartupProfiler(QObject):
+    # Mesure le démarrage à froid : imports du module, construction de la
+    # fenêtre principale et premier affichage
+
+    def __init__(self, exit_after_startup=False):
+        super().__init__()
+        self.exit_after_startup = exit_after_startup
+        self.timings = {
+            'imports_ms': (_import_finished - _import_started) * 1000,
+            'import_budget_ms': config.IMPORT_BUDGET_MS
+        }
+        self.window_started = None
+
+    def window_creating(self):
+        self.window_started = time.perf_counter()
+
+    def window_created(self, window):
+        self.timings['window_init_ms'] = (time.perf_counter() -
+                                          self.window_started) * 1000
+        window.installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+            self.timings['first_paint_ms'] = (time.perf_counter() -
+                                              _import_started) * 1000
+            QTimer.singleShot(0, self.report)
+        return False
+
+    def report(self):
+        timings = self.timings
+        print(f"Profil de démarrage : imports {timings['imports_ms']:.0f} ms "
+              f"(budget {timings['import_budget_ms']:.0f} ms), "
+              f"ReformulatorApp.__init__ {timings['window_init_ms']:.0f} ms, "
+              f"premier affichage à {timings['first_paint_ms']:.0f} ms",
+              file=sys.stderr)
+        if timings['imports_ms'] > timings['import_budget_ms']:
+            print("Attention : budget d'import dépassé", file=sys.stderr)
+        print(json.dumps({key: round(value, 1)
+                          for key, value in timings.items()}),
+              file=sys.stderr)
+        if self.exit_after_startup:
+            QApplication.quit()
 
 
 def main():
+    if '--server' in sys.argv:
+        # Sans fenêtre : API HTTP locale (voir server.py)
+        import server
+        sys.exit(server.main([arg for arg in sys.argv[1:]
+                              if arg != '--server']))
+    profiler = None
+    if '--startup-profile' in sys.argv:
+        profiler = StartupProfiler('--exit-after-startup' in sys.argv)
     app = QApplication(sys.argv)
+    app.aboutToQuit.connect(cancel_all_workers)
+    if profiler is not None:
+        profiler.window_creating()
     window = ReformulatorApp()
+    if profiler is not None:
+        profiler.window_created(window)
     window.show()
     sys.exit(app.exec())
 
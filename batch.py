@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import config
+import core
+from cache import ResultCache
+from ollama_client import CancelToken, Cancelled, OllamaClient
+from telemetry import TelemetryStore
+
+# Traitement par lots sans interface graphique : reformule ou traduit un
+# dossier de fichiers texte ou un fichier JSONL, avec reprise sur incident
+
+
+def load_records(source, text_field):
+    # Un fichier illisible ou une ligne invalide devient un enregistrement en
+    # erreur (clé _error) : le lot continue
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if not name.endswith('.txt'):
+                    continue
+                path = os.path.join(root, name)
+                record = {'id': os.path.relpath(path, source), 'text': None}
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        record['text'] = f.read()
+                except (OSError, UnicodeDecodeError) as e:
+                    record['_error'] = f"lecture impossible : {e}"
+                yield record
+        return
+    # Lignes décodées une à une : un octet invalide ne touche que sa ligne
+    with open(source, 'rb') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = {'_error': f"ligne JSON invalide : {e}"}
+            if not isinstance(record, dict):
+                record = {'_error': "la ligne doit être un objet JSON"}
+            record.setdefault('id', line_number)
+            record['id'] = str(record['id'])
+            record['text'] = record.get(text_field, '')
+            yield record
+
+
+def load_completed(output_path):
+    # Le fichier de sortie sert de point de reprise : les enregistrements
+    # réussis ne sont pas retraités
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if 'output' in result:
+                completed.add(str(result['id']))
+    return completed
+
+
+def process_record(record, args, client, cache, cancel_token):
+    # Erreurs propres à l'enregistrement, écrites dans le fichier de sortie
+    if '_error' in record:
+        raise ValueError(record['_error'])
+    if not isinstance(record['text'], str):
+        raise ValueError(f"champ '{args.text_field}' non textuel "
+                         f"({type(record['text']).__name__})")
+    text = record['text'].strip()
+    start = time.perf_counter()
+    if args.lang or record.get('target_lang'):
+        output = core.translate(client,
+                                args.model,
+                                text,
+                                record.get('target_lang', args.lang),
+                                cache=cache,
+                                cancel_token=cancel_token)
+    else:
+        output = core.reformulate(client,
+                                  args.model,
+                                  args.system_prompt,
+                                  text,
+                                  record.get('tone', args.tone),
+                                  record.get('format', args.format),
+                                  record.get('length', args.length),
+                                  cache=cache,
+                                  cancel_token=cancel_token)
+    return {
+        'id': record['id'],
+        'output': output,
+        'truncated': core.is_truncated(output),
+        'model': args.model,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000)
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Reformulation ou traduction par lots via Ollama")
+    parser.add_argument('source',
+                        help="dossier de fichiers .txt ou fichier JSONL")
+    parser.add_argument('-o',
+                        '--output',
+                        required=True,
+                        help="fichier JSONL des résultats (point de reprise)")
+    parser.add_argument('--text-field',
+                        default='text',
+                        help="champ texte des enregistrements JSONL")
+    parser.add_argument('--tone', default=core.TONES[0])
+    parser.add_argument('--format', default=core.FORMATS[0])
+    parser.add_argument('--length', default=core.LENGTHS[0])
+    parser.add_argument('--lang',
+                        help="langue cible : traduit au lieu de reformuler")
+    parser.add_argument('--system-prompt-file',
+                        help="fichier contenant le prompt système")
+    parser.add_argument('--model', default=config.DEFAULT_MODEL)
+    parser.add_argument('--url', default=config.DEFAULT_OLLAMA_URL)
+    parser.add_argument('--extra-url',
+                        action='append',
+                        default=list(config.EXTRA_OLLAMA_URLS),
+                        help="serveur Ollama supplémentaire (répétable)")
+    parser.add_argument('-j',
+                        '--concurrency',
+                        type=int,
+                        default=config.MAX_PARALLEL_REQUESTS,
+                        help="nombre de requêtes simultanées vers Ollama")
+    parser.add_argument('--no-cache',
+                        action='store_true',
+                        help="ne pas utiliser le cache des résultats")
+    parser.add_argument('--telemetry',
+                        help="fichier .csv ou .json des mesures de chaque "
+                        "génération (débit, premier token, latence)")
+    args = parser.parse_args(argv)
+    args.system_prompt = core.DEFAULT_SYSTEM_PROMPT
+    if args.system_prompt_file:
+        with open(args.system_prompt_file, encoding='utf-8') as f:
+            args.system_prompt = f.read()
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    completed = load_completed(args.output)
+    records = [
+        record for record in load_records(args.source, args.text_field)
+        if record['id'] not in completed and (
+            '_error' in record or not isinstance(record['text'], str)
+            or record['text'].strip())
+    ]
+    print(f"{len(records)} enregistrements à traiter, "
+          f"{len(completed)} déjà terminés",
+          file=sys.stderr)
+
+    client = OllamaClient(args.url,
+                          pool_size=max(config.POOL_SIZE, args.concurrency),
+                          extra_urls=args.extra_url)
+    client.log_timings = False
+    if args.telemetry:
+        client.telemetry = TelemetryStore(
+            max(config.TELEMETRY_ENTRIES, len(records)))
+    cache = None if args.no_cache else ResultCache()
+
+    try:
+        return run_records(records, args, client, cache)
+    finally:
+        if client.telemetry is not None:
+            if args.telemetry.endswith('.csv'):
+                client.telemetry.export_csv(args.telemetry)
+            else:
+                client.telemetry.export_json(args.telemetry)
+            print(f"Mesures enregistrées dans {args.telemetry}",
+                  file=sys.stderr)
+
+
+def run_records(records, args, client, cache):
+    cancel_token = CancelToken()
+    write_lock = threading.Lock()
+    failures = 0
+
+    with open(args.output, 'a', encoding='utf-8') as output, \
+            ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = {
+            executor.submit(process_record, record, args, client, cache,
+                            cancel_token): record
+            for record in records
+        }
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                record = futures[future]
+                try:
+                    result = future.result()
+                    status = f"ok ({result['elapsed_ms']} ms)"
+                except Cancelled:
+                    continue
+                except Exception as e:
+                    failures += 1
+                    result = {'id': record['id'], 'error': str(e)}
+                    status = f"erreur : {e}"
+                # Écriture au fil de l'eau pour que la reprise soit exacte
+                with write_lock:
+                    output.write(json.dumps(result, ensure_ascii=False) +
+                                 '\n')
+                    output.flush()
+                print(f"[{done}/{len(records)}] {record['id']} {status}",
+                      file=sys.stderr)
+        except KeyboardInterrupt:
+            print("Interruption : arrêt des requêtes en cours",
+                  file=sys.stderr)
+            cancel_token.cancel()
+            for future in futures:
+                future.cancel()
+            return 130
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Collage et affichage d'un long document dans la fenêtre principale :
+# chaque étape doit rendre la main à la boucle d'événements en moins de
+# --budget ms
+#   python -m benchmarks.bench_large_text [--size 1000000] [--budget 100]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PARAGRAPH = ("Le présent contrat est conclu entre les parties pour une durée "
+             "de douze mois, renouvelable par tacite reconduction. ")
+
+
+def make_document(size):
+    paragraph = PARAGRAPH * 4 + "\n\n"
+    return (paragraph * (size // len(paragraph) + 1))[:size]
+
+
+def timed(action):
+    from PyQt6.QtWidgets import QApplication
+
+    start = time.perf_counter()
+    action()
+    QApplication.processEvents()
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def legacy_paste(text):
+    # Ancien éditeur : QTextEdit en texte riche
+    from PyQt6.QtWidgets import QApplication, QTextEdit
+
+    editor = QTextEdit()
+    editor.resize(800, 300)
+    editor.show()
+    QApplication.processEvents()
+    QApplication.clipboard().setText(text)
+    elapsed = timed(editor.paste)
+    editor.close()
+    editor.deleteLater()
+    return elapsed
+
+
+def bench_window(text, parts):
+    import app
+    from PyQt6.QtWidgets import QApplication
+
+    window = app.ReformulatorApp()
+    window.client.log_timings = False
+    # Pas de requête anticipée ni de préchargement pendant la mesure
+    window.speculative_checkbox.setChecked(False)
+    window.resize(900, 900)
+    window.show()
+    QApplication.processEvents()
+    timings = {}
+
+    QApplication.clipboard().setText(text)
+    timings['collage'] = timed(window.input_text.paste)
+    timings['lecture du texte'] = timed(window.current_request)
+    timings['affichage du résultat'] = timed(
+        lambda: window.on_reformulation_done(text))
+
+    # Réponse reçue au fil de l'eau : un bloc par intervalle de regroupement
+    window.set_output('')
+    block_size = len(text) // 200
+    blocks = []
+    for start in range(0, len(text), block_size):
+        window.append_output(text[start:start + block_size])
+        blocks.append(timed(window.flush_output))
+    timings['bloc le plus long'] = max(blocks)
+    timings['fin du flux'] = timed(lambda: window.on_reformulation_done(text))
+
+    # Document découpé : parties terminées dans le désordre
+    window.set_output('')
+    window.document_parts = []
+    size = len(text) // parts
+    samples = []
+    for index in reversed(range(parts)):
+        part = text[index * size:(index + 1) * size]
+        samples.append(
+            timed(lambda: window.show_document_part((index, part, parts))))
+    timings['partie la plus longue'] = max(samples)
+    timings['copie'] = timed(window.copy_to_clipboard)
+
+    window.close()
+    window.deleteLater()
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Collage et affichage d'un long document")
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--parts', type=int, default=8)
+    parser.add_argument('--budget', type=float, default=100.0)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    # Cache et historique isolés des données de l'utilisateur
+    os.environ.setdefault('TEXTREFINE_HOME',
+                          tempfile.mkdtemp(prefix='textrefine-bench-'))
+    sys.path.insert(0, ROOT)
+    from PyQt6.QtWidgets import QApplication
+
+    qt_app = QApplication.instance() or QApplication(sys.argv[:1])
+    text = make_document(args.size)
+    print(f"{len(text)} caractères : ancien collage (QTextEdit) "
+          f"{legacy_paste(text)} ms")
+    timings = bench_window(text, args.parts)
+    over_budget = []
+    for name, value in timings.items():
+        print(f"  {name} : {value} ms")
+        if value > args.budget:
+            over_budget.append(name)
+    qt_app.quit()
+    if over_budget:
+        print(f"Au-delà de {args.budget:.0f} ms : {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
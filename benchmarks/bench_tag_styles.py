@@ -0,0 +1,157 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Coût d'un clic sur un tag : ancienne mise en forme (setStyleSheet sur
+# chaque bouton à chaque clic) contre la feuille de style partagée, puis
+# filtre et mise à jour incrémentale d'une section de nombreux tags
+#   python -m benchmarks.bench_tag_styles [--tags 6,50,200] [--clicks 50]
+#                                         [--large 1000]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LEGACY_STYLE = """
+    QPushButton {
+        background-color: %s;
+        color: white;
+        border: none;
+        border-radius: 17px;
+        padding: 5px 20px;
+        font-size: 13px;
+    }
+    QPushButton:hover {
+        background-color: %s;
+    }
+"""
+
+
+def legacy_section(tags):
+    # Réplique de l'ancienne TagSection : chaque clic refait le style de
+    # tous les boutons de la section
+    from PyQt6.QtWidgets import QHBoxLayout, QPushButton, QWidget
+
+    widget = QWidget()
+    layout = QHBoxLayout(widget)
+    buttons = []
+
+    def restyle(button):
+        if button.isChecked():
+            button.setStyleSheet(LEGACY_STYLE % ('#4CAF50', '#45a049'))
+        else:
+            button.setStyleSheet(LEGACY_STYLE % ('#424242', '#484848'))
+
+    def handle_click(clicked_button):
+        for button in buttons:
+            if button is not clicked_button:
+                button.setChecked(False)
+                restyle(button)
+        clicked_button.setChecked(True)
+        restyle(clicked_button)
+
+    for tag in tags:
+        button = QPushButton(tag)
+        button.setCheckable(True)
+        button.clicked.connect(lambda checked, b=button: handle_click(b))
+        restyle(button)
+        buttons.append(button)
+        layout.addWidget(button)
+    return widget, buttons
+
+
+def shared_section(tags):
+    import app
+
+    section = app.TagSection("Ton", tags)
+    return section, section.buttons
+
+
+def time_clicks(widget, buttons, clicks):
+    from PyQt6.QtWidgets import QApplication
+
+    widget.show()
+    QApplication.processEvents()
+    samples = []
+    for i in range(clicks):
+        button = buttons[(i * 7 + 1) % len(buttons)]
+        start = time.perf_counter()
+        button.click()
+        # Inclut le recalcul de style et le repeint déclenchés par le clic
+        QApplication.processEvents()
+        samples.append((time.perf_counter() - start) * 1000)
+    widget.close()
+    widget.deleteLater()
+    QApplication.processEvents()
+    return {
+        'mean_ms': round(statistics.mean(samples), 3),
+        'max_ms': round(max(samples), 3)
+    }
+
+
+def timed(action):
+    from PyQt6.QtWidgets import QApplication
+
+    start = time.perf_counter()
+    action()
+    QApplication.processEvents()
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def bench_large_section(count):
+    import app
+
+    tags = [f"Preset {i}" for i in range(count)]
+    timings = {}
+    sections = []
+    timings['construction'] = timed(
+        lambda: sections.append(app.TagSection("Ton", tags)))
+    section = sections[0]
+    section.resize(860, 400)
+    timings['affichage'] = timed(section.show)
+    timings['filtre'] = timed(lambda: section.filter_input.setText("9"))
+    timings['filtre effacé'] = timed(section.filter_input.clear)
+    # Un tag retiré et un ajouté : un seul bouton créé, un seul détruit
+    edited = tags[1:] + ["Nouveau preset"]
+    timings['mise à jour'] = timed(lambda: section.set_tags(edited))
+    timings['clic'] = timed(section.buttons[count // 2].click)
+    timings['redimensionnement'] = timed(lambda: section.resize(500, 400))
+    section.close()
+    section.deleteLater()
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Coût d'un clic sur un tag selon la mise en forme")
+    parser.add_argument('--tags', default='6,50,200')
+    parser.add_argument('--clicks', type=int, default=50)
+    parser.add_argument('--large',
+                        type=int,
+                        default=1000,
+                        help="nombre de tags de la section filtrée")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, ROOT)
+    from PyQt6.QtWidgets import QApplication
+
+    qt_app = QApplication.instance() or QApplication(sys.argv[:1])
+    for count in [int(value) for value in args.tags.split(',')]:
+        tags = [f"Tag {i}" for i in range(count)]
+        legacy = time_clicks(*legacy_section(tags), args.clicks)
+        shared = time_clicks(*shared_section(tags), args.clicks)
+        print(f"{count} tags : ancien {legacy['mean_ms']} ms/clic "
+              f"(max {legacy['max_ms']}), partagé {shared['mean_ms']} ms/clic "
+              f"(max {shared['max_ms']})")
+    if args.large:
+        timings = bench_large_section(args.large)
+        print(f"{args.large} tags : " +
+              ", ".join(f"{name} {value} ms"
+                        for name, value in timings.items()))
+    qt_app.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
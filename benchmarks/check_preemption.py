@@ -0,0 +1,230 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Vérifie contre le faux serveur Ollama qu'une demande remplacée (texte
+# modifié, tag changé, nouveau clic) arrête réellement la génération côté
+# serveur et que son résultat tardif n'est pas affiché
+#   python -m benchmarks.check_preemption
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_TEXT = ("Bonjour, je voulais savoir si la réunion de demain est "
+               "toujours maintenue à 10h.")
+
+
+def settle(seconds):
+    # Laisse arriver les signaux tardifs des travaux remplacés
+    from PyQt6.QtWidgets import QApplication
+
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        QApplication.processEvents()
+        time.sleep(0.005)
+
+
+class Checker:
+
+    def __init__(self, fake):
+        self.fake = fake
+        self.failures = []
+
+    def expect(self, name, condition, detail=''):
+        print(f"  {'ok' if condition else 'ÉCHEC'} : {name}"
+              f"{f' ({detail})' if detail else ''}")
+        if not condition:
+            self.failures.append(name)
+
+    def aborted(self):
+        return self.fake.snapshot()['aborted_generations']
+
+    def wait_generating(self, count=1):
+        from benchmarks.run_benchmarks import wait_until
+
+        wait_until(lambda: self.fake.snapshot()['active_generations'] >= count,
+                   timeout=10)
+
+    @contextmanager
+    def slow_first_token(self, seconds=5.0):
+        from benchmarks.run_benchmarks import wait_until
+
+        # Les interruptions des scénarios précédents ne doivent pas compter
+        wait_until(lambda: self.fake.snapshot()['active_generations'] == 0,
+                   timeout=30)
+        latency = self.fake.latency
+        self.fake.latency = seconds
+        try:
+            yield
+        finally:
+            self.fake.latency = latency
+
+    def expect_stopped(self, name, before, count=1):
+        # La génération remplacée doit être interrompue, pas menée à terme
+        from benchmarks.run_benchmarks import wait_until
+
+        try:
+            wait_until(lambda: self.aborted() >= before + count, timeout=5)
+            stopped = True
+        except TimeoutError:
+            stopped = False
+        self.expect(name, stopped,
+                    f"{self.aborted() - before} génération(s) interrompue(s)")
+
+
+def check_window(checker):
+    import app
+    from benchmarks.run_benchmarks import wait_until
+
+    window = app.ReformulatorApp()
+    window.client.log_timings = False
+    window.ollama_url = checker.fake.url
+    window.bypass_cache = True
+    window.stream_output = True
+    window.speculative_checkbox.setChecked(False)
+    window.show()
+    wait_until(lambda: window.warmup_worker is None)
+
+    print("Fenêtre principale")
+    window.input_text.setPlainText(SAMPLE_TEXT)
+    before = checker.aborted()
+    window.reformulate_text()
+    checker.wait_generating()
+    window.input_text.setPlainText(SAMPLE_TEXT + " Merci.")
+    checker.expect("texte modifié : travail détaché", window.worker is None)
+    checker.expect_stopped("texte modifié : génération arrêtée", before)
+    settle(0.5)
+    checker.expect("texte modifié : résultat tardif ignoré",
+                   window.output_text.toPlainText().startswith(
+                       "Reformulation interrompue"))
+
+    # Remplacée avant le premier token (chargement du modèle, évaluation
+    # d'un long prompt) : Ollama n'a encore envoyé aucun en-tête
+    with checker.slow_first_token():
+        before = checker.aborted()
+        window.reformulate_text()
+        checker.wait_generating()
+        window.input_text.setPlainText(SAMPLE_TEXT + " Avant le 1er token.")
+        checker.expect_stopped("avant le premier token : génération arrêtée",
+                               before)
+
+    before = checker.aborted()
+    window.reformulate_text()
+    checker.wait_generating()
+    tones = window.tone_section.getSelectedTags()
+    other = next(tone for tone in app.core.TONES if tone not in tones)
+    window.tone_section.select_tag(other)
+    checker.expect_stopped("tag changé : génération arrêtée", before)
+
+    # Même demande : le second clic garde la génération en cours
+    before = checker.aborted()
+    window.reformulate_text()
+    worker = window.worker
+    window.reformulate_text()
+    checker.expect("clic identique : travail conservé",
+                   window.worker is worker)
+    # Demande modifiée sans signal (prompt système) puis nouveau clic
+    window.system_prompt += " Sois concis."
+    window.reformulate_text()
+    checker.expect("nouveau clic : travail remplacé",
+                   window.worker is not worker)
+    checker.expect_stopped("nouveau clic : génération arrêtée", before)
+    wait_until(lambda: window.worker is None, timeout=30)
+    checker.expect("nouveau clic : seul le dernier résultat est affiché",
+                   not window.output_text.toPlainText().startswith(
+                       "Reformulation"))
+    return window
+
+
+def check_translation(checker, window):
+    import app
+    from benchmarks.run_benchmarks import wait_until
+
+    print("Fenêtre de traduction")
+    dialog = app.TranslationDialog(window)
+    dialog.bypass_cache_checkbox.setChecked(True)
+    dialog.input_text.setPlainText(SAMPLE_TEXT)
+
+    before = checker.aborted()
+    dialog.lang_combo.setCurrentText("Anglais")
+    dialog.translate_text()
+    checker.wait_generating()
+    dialog.lang_combo.setCurrentText("Espagnol")
+    checker.expect("langue changée : travail détaché", dialog.worker is None)
+    checker.expect_stopped("langue changée : génération arrêtée", before)
+    settle(0.5)
+    checker.expect("langue changée : résultat tardif ignoré",
+                   dialog.output_text.toPlainText().startswith(
+                       "Traduction interrompue"))
+
+    before = checker.aborted()
+    dialog.translate_all()
+    checker.wait_generating(2)
+    running = checker.fake.snapshot()['active_generations']
+    dialog.input_text.setPlainText(SAMPLE_TEXT + " Merci.")
+    checker.expect_stopped("langues multiples : générations arrêtées", before,
+                           running)
+
+    with checker.slow_first_token():
+        before = checker.aborted()
+        dialog.translate_text()
+        checker.wait_generating()
+        dialog.lang_combo.setCurrentText("Italien")
+        checker.expect_stopped(
+            "avant le premier token : traduction arrêtée", before)
+
+    # Nouveau clic sur une autre langue pendant une traduction
+    before = checker.aborted()
+    dialog.translate_text()
+    checker.wait_generating()
+    dialog.lang_combo.blockSignals(True)
+    dialog.lang_combo.setCurrentText("Allemand")
+    dialog.lang_combo.blockSignals(False)
+    dialog.translate_text()
+    checker.expect_stopped("nouveau clic : traduction arrêtée", before)
+    wait_until(lambda: dialog.worker is None, timeout=30)
+    dialog.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Interruption des demandes remplacées")
+    parser.add_argument('--tps',
+                        type=float,
+                        default=40.0,
+                        help="débit du faux serveur (tokens/s)")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    os.environ.setdefault('TEXTREFINE_HOME',
+                          tempfile.mkdtemp(prefix='textrefine-check-'))
+    sys.path.insert(0, ROOT)
+    from PyQt6.QtWidgets import QApplication
+
+    from benchmarks.fake_ollama import FakeOllama
+
+    qt_app = QApplication.instance() or QApplication(sys.argv[:1])
+    # Générations assez longues pour être remplacées en cours de route
+    with FakeOllama(latency=0.05,
+                    tokens_per_second=args.tps,
+                    response_tokens=200,
+                    parallel=4) as fake:
+        checker = Checker(fake)
+        window = check_window(checker)
+        check_translation(checker, window)
+        settle(0.2)
+        checker.expect("aucune génération restante",
+                       fake.snapshot()['active_generations'] == 0)
+        window.close()
+    qt_app.quit()
+    if checker.failures:
+        print(f"{len(checker.failures)} vérification(s) en échec")
+        return 1
+    print("Toutes les vérifications sont passées")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
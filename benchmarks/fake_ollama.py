@@ -0,0 +1,332 @@
+import argparse
+import json
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Faux serveur Ollama pour les mesures : /api/generate, /api/chat,
+# /api/tags, /api/version et /api/ps avec latence, débit et nombre de
+# générations simultanées configurables
+
+WORDS = ("Bonjour à tous, voici une réponse simulée qui imite la sortie "
+         "d'un modèle de langage.").split()
+
+MODELS = [{
+    'name': 'qwen2.5:3b',
+    'size': 1929912432,
+    'details': {
+        'family': 'qwen2',
+        'parameter_size': '3.1B',
+        'quantization_level': 'Q4_K_M'
+    }
+}, {
+    'name': 'llama3.2:3b',
+    'size': 2019393189,
+    'details': {
+        'family': 'llama',
+        'parameter_size': '3.2B',
+        'quantization_level': 'Q4_K_M'
+    }
+}]
+
+
+class FakeOllama:
+
+    def __init__(self,
+                 host='127.0.0.1',
+                 port=0,
+                 latency=0.05,
+                 tokens_per_second=200.0,
+                 response_tokens=60,
+                 parallel=4,
+                 tags_latency=0.0,
+                 load_latency=0.0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.tags_latency = tags_latency
+        # Durée du chargement du modèle lors d'un préchargement
+        self.load_latency = load_latency
+        self.slots = threading.BoundedSemaphore(parallel)
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.active_generations = 0
+        self.aborted_generations = 0
+        self.completed_generations = 0
+        self.tokens_sent = 0
+        self.prompt_tokens_evaluated = 0
+        # Changements de num_ctx : Ollama recharge alors le modèle
+        self.context_reloads = 0
+        self.num_ctx = None
+        # Derniers prompts évalués, un par génération simultanée : comme
+        # Ollama, seule la partie après le plus long préfixe commun est
+        # comptée dans prompt_eval_count
+        self.prompt_cache = []
+        self.prompt_cache_size = parallel
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, name, increment=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + increment
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters,
+                        active_generations=self.active_generations,
+                        aborted_generations=self.aborted_generations,
+                        completed_generations=self.completed_generations,
+                        tokens_sent=self.tokens_sent,
+                        prompt_tokens_evaluated=self.prompt_tokens_evaluated,
+                        context_reloads=self.context_reloads)
+
+    def evaluate_prompt(self, prompt):
+        # Renvoie (tokens du prompt, tokens réellement évalués)
+        with self.lock:
+            reused = 0
+            for cached in self.prompt_cache:
+                common = 0
+                for a, b in zip(cached, prompt):
+                    if a != b:
+                        break
+                    common += 1
+                reused = max(reused, common)
+            if prompt in self.prompt_cache:
+                self.prompt_cache.remove(prompt)
+            self.prompt_cache.append(prompt)
+            del self.prompt_cache[:-self.prompt_cache_size]
+            evaluated = max(1, (len(prompt) - reused) // 4)
+            self.prompt_tokens_evaluated += evaluated
+            return max(1, len(prompt) // 4), evaluated
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Pas d'algorithme de Nagle : chaque token part immédiatement
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.fake.count(self.path)
+        if self.path == '/api/tags':
+            try:
+                self._wait_connected(self.fake.tags_latency)
+            except ConnectionResetError:
+                return
+            self._send_json({'models': MODELS})
+        elif self.path == '/api/version':
+            self._send_json({'version': '0.0.0-fake'})
+        elif self.path == '/api/ps':
+            self._send_json({
+                'models': [{
+                    'name': MODELS[0]['name']
+                }],
+                'active_generations': self.fake.active_generations
+            })
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        self.fake.count(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if self.path not in ('/api/generate', '/api/chat'):
+            self._send_json({'error': 'not found'}, 404)
+            return
+        if not request.get('prompt') and not request.get('messages'):
+            # Préchargement du modèle
+            try:
+                self._wait_connected(self.fake.load_latency)
+            except ConnectionResetError:
+                return
+            self._send_json({
+                'model': request.get('model'),
+                'done': True,
+                'done_reason': 'load'
+            })
+            return
+        with self.fake.slots:
+            self._generate(request, self.path == '/api/chat')
+
+    def _message(self, request, chat, content, done=False, **extra):
+        message = {
+            'model': request.get('model'),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'done': done
+        }
+        if chat:
+            message['message'] = {'role': 'assistant', 'content': content}
+        else:
+            message['response'] = content
+        message.update(extra)
+        return message
+
+    def _generate(self, request, chat):
+        fake = self.fake
+        start = time.perf_counter()
+        options = request.get('options') or {}
+        token_count = min(fake.response_tokens,
+                          options.get('num_predict') or fake.response_tokens)
+        done_reason = 'length' if token_count < fake.response_tokens else 'stop'
+        with fake.lock:
+            num_ctx = options.get('num_ctx')
+            if num_ctx != fake.num_ctx:
+                if fake.num_ctx is not None:
+                    fake.context_reloads += 1
+                fake.num_ctx = num_ctx
+        # Gabarit ChatML appliqué par le serveur, comme le fait Ollama
+        if chat:
+            messages = request['messages']
+        else:
+            messages = [{'role': 'user', 'content': request.get('prompt', '')}]
+        prompt = ''.join(f"<|im_start|>{m.get('role')}\n{m.get('content', '')}"
+                         f"<|im_end|>\n" for m in messages)
+        prompt += "<|im_start|>assistant\n"
+        _, prompt_tokens = fake.evaluate_prompt(prompt)
+        tokens = [
+            WORDS[i % len(WORDS)] + (' ' if (i + 1) % 12 else '\n')
+            for i in range(token_count)
+        ]
+        interval = 1.0 / fake.tokens_per_second
+        with fake.lock:
+            fake.active_generations += 1
+        aborted = False
+        try:
+            # Chargement et évaluation du prompt : arrêtés si le client part
+            self._wait_connected(fake.latency)
+            if request.get('stream', True):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for token in tokens:
+                    self._write_chunk(self._message(request, chat, token))
+                    with fake.lock:
+                        fake.tokens_sent += 1
+                    time.sleep(interval)
+                self._write_chunk(
+                    self._message(request, chat, '', True,
+                                  **self._durations(start, prompt_tokens,
+                                                    token_count,
+                                                    done_reason)))
+                self.wfile.write(b'0\r\n\r\n')
+            else:
+                time.sleep(interval * token_count)
+                with fake.lock:
+                    fake.tokens_sent += token_count
+                self._send_json(
+                    self._message(request, chat, ''.join(tokens), True,
+                                  **self._durations(start, prompt_tokens,
+                                                    token_count,
+                                                    done_reason)))
+        except (BrokenPipeError, ConnectionResetError):
+            # Le client a fermé la connexion : la génération s'arrête
+            aborted = True
+        finally:
+            with fake.lock:
+                fake.active_generations -= 1
+                if aborted:
+                    fake.aborted_generations += 1
+                else:
+                    fake.completed_generations += 1
+
+    def _durations(self, start, prompt_tokens, token_count, done_reason):
+        total = int((time.perf_counter() - start) * 1e9)
+        eval_duration = int(token_count / self.fake.tokens_per_second * 1e9)
+        return {
+            'done_reason': done_reason,
+            'total_duration': total,
+            'load_duration': 1000000,
+            'prompt_eval_count': prompt_tokens,
+            'prompt_eval_duration': int(self.fake.latency * 1e9),
+            'eval_count': token_count,
+            'eval_duration': eval_duration
+        }
+
+    def _wait_connected(self, seconds):
+        # Comme Ollama, abandonne la requête dès que le client ferme la
+        # connexion, même avant l'envoi des en-têtes
+        deadline = time.perf_counter() + seconds
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            readable, _, _ = select.select([self.connection], [], [],
+                                           min(remaining, 0.02))
+            if readable and not self.connection.recv(1, socket.MSG_PEEK):
+                raise ConnectionResetError("client parti")
+
+    def _write_chunk(self, payload):
+        data = (json.dumps(payload) + '\n').encode('utf-8')
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Faux serveur Ollama")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency',
+                        type=float,
+                        default=0.05,
+                        help="délai avant le premier token (s)")
+    parser.add_argument('--tps',
+                        type=float,
+                        default=200.0,
+                        help="tokens générés par seconde")
+    parser.add_argument('--tokens', type=int, default=60)
+    parser.add_argument('--parallel', type=int, default=4)
+    args = parser.parse_args(argv)
+    fake = FakeOllama(args.host, args.port, args.latency, args.tps,
+                      args.tokens, args.parallel)
+    print(f"Faux Ollama sur {fake.url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,726 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Mesures de bout en bout contre le faux serveur Ollama :
+#   python -m benchmarks.run_benchmarks [--compare resultats_precedents.json]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+SAMPLE_TEXT = ("Notre service client reste joignable du lundi au vendredi. "
+               "Merci de préciser votre numéro de commande dans chaque "
+               "message afin que nous puissions vous répondre rapidement.")
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction *
+                                               (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    # samples : liste de secondes -> millisecondes agrégées
+    values = [sample * 1000 for sample in samples if sample is not None]
+    if not values:
+        return {}
+    return {
+        'mean_ms': round(statistics.mean(values), 2),
+        'p50_ms': round(percentile(values, 0.5), 2),
+        'p95_ms': round(percentile(values, 0.95), 2),
+        'max_ms': round(max(values), 2)
+    }
+
+
+def timed_call(function, **kwargs):
+    # Exécute function(on_chunk=...) et renvoie (temps au premier token,
+    # durée totale)
+    start = time.perf_counter()
+    first_token = []
+
+    def on_chunk(_):
+        if not first_token:
+            first_token.append(time.perf_counter() - start)
+
+    function(on_chunk=on_chunk, **kwargs)
+    return (first_token[0] if first_token else None,
+            time.perf_counter() - start)
+
+
+def bench_headless(fake, runs):
+    import core
+    from ollama_client import OllamaClient
+
+    client = OllamaClient(fake.url)
+    client.log_timings = False
+    results = {}
+    for name, function, kwargs in [
+        ('reformulate', core.reformulate, {
+            'system_prompt': core.DEFAULT_SYSTEM_PROMPT,
+            'tone': core.TONES[0],
+            'text_format': core.FORMATS[0],
+            'length': core.LENGTHS[0]
+        }),
+        ('translate', core.translate, {
+            'target_lang': core.LANGUAGES[0]
+        }),
+    ]:
+        ttft = []
+        total = []
+        for _ in range(runs):
+            first, elapsed = timed_call(function,
+                                        client=client,
+                                        model='qwen2.5:3b',
+                                        text=SAMPLE_TEXT,
+                                        **kwargs)
+            ttft.append(first)
+            total.append(elapsed)
+        results[f'headless_{name}'] = {
+            'runs': runs,
+            'time_to_first_token': summarize(ttft),
+            'total_latency': summarize(total)
+        }
+    client.close()
+    return results
+
+
+def bench_concurrency(fake, requests_per_level, levels):
+    import core
+    from ollama_client import OllamaClient
+
+    results = {}
+    for level in levels:
+        client = OllamaClient(fake.url, pool_size=max(level, 1))
+        client.log_timings = False
+        before = fake.snapshot().get('tokens_sent', 0)
+
+        def one_request(_):
+            start = time.perf_counter()
+            core.reformulate(client, 'qwen2.5:3b', core.DEFAULT_SYSTEM_PROMPT,
+                             SAMPLE_TEXT, core.TONES[0], core.FORMATS[0],
+                             core.LENGTHS[0])
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as executor:
+            latencies = list(
+                executor.map(one_request, range(requests_per_level)))
+        elapsed = time.perf_counter() - start
+        tokens = fake.snapshot()['tokens_sent'] - before
+        results[f'concurrency_{level}'] = {
+            'requests': requests_per_level,
+            'wall_time_s': round(elapsed, 3),
+            'requests_per_s': round(requests_per_level / elapsed, 2),
+            'tokens_per_s': round(tokens / elapsed, 1),
+            'latency': summarize(latencies)
+        }
+        client.close()
+    return results
+
+
+def bench_endpoints(requests_count, parallel):
+    # Même charge sur un serveur puis répartie sur deux, dont un troisième
+    # injoignable pour vérifier le repli
+    import core
+    from benchmarks.fake_ollama import FakeOllama
+    from ollama_client import OllamaClient
+
+    results = {}
+    first = FakeOllama(parallel=parallel).start()
+    second = FakeOllama(parallel=parallel).start()
+    try:
+        for name, extra_urls in [('single', []),
+                                 ('two_plus_dead',
+                                  [second.url, 'http://127.0.0.1:9'])]:
+            client = OllamaClient(first.url,
+                                  pool_size=requests_count,
+                                  extra_urls=extra_urls)
+            client.log_timings = False
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=requests_count) as executor:
+                list(
+                    executor.map(
+                        lambda i: core.reformulate(
+                            client, 'qwen2.5:3b', core.
+                            DEFAULT_SYSTEM_PROMPT, f"{SAMPLE_TEXT} {i}", core.
+                            TONES[0], core.FORMATS[0], core.LENGTHS[0]),
+                        range(requests_count)))
+            elapsed = time.perf_counter() - start
+            results[name] = {
+                'requests': requests_count,
+                'wall_time_s': round(elapsed, 3),
+                'per_endpoint': {
+                    stats['url']: stats['requests']
+                    for stats in client.endpoints.stats()
+                }
+            }
+            client.close()
+    finally:
+        first.stop()
+        second.stop()
+    return {'endpoints': results}
+
+
+def bench_variants(fake, runs):
+    # Six combinaisons ton/longueur : une par une, puis en parallèle
+    import config
+    import core
+    from ollama_client import OllamaClient
+
+    combinations = [(tone, core.FORMATS[0], length)
+                    for tone in core.TONES[:2] for length in core.LENGTHS]
+    client = OllamaClient(fake.url)
+    client.log_timings = False
+    sequential = []
+    concurrent = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for tone, text_format, length in combinations:
+            core.reformulate(client, 'qwen2.5:3b', core.DEFAULT_SYSTEM_PROMPT,
+                             SAMPLE_TEXT, tone, text_format, length)
+        sequential.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        core.reformulate_variants(client,
+                                  'qwen2.5:3b',
+                                  core.DEFAULT_SYSTEM_PROMPT,
+                                  SAMPLE_TEXT,
+                                  combinations,
+                                  max_workers=config.MAX_PARALLEL_REQUESTS)
+        concurrent.append(time.perf_counter() - start)
+    client.close()
+    return {
+        'variants': {
+            'runs': runs,
+            'combinations': len(combinations),
+            'sequential': summarize(sequential),
+            'concurrent': summarize(concurrent)
+        }
+    }
+
+
+def legacy_generate(client, model, system_prompt, user_content):
+    # Ancien chemin : ChatML écrit à la main et envoyé à /api/generate,
+    # le gabarit du modèle s'y ajoute une seconde fois
+    prompt = (f"<|im_start|>system\n{system_prompt}\n<|im_end|>\n"
+              f"<|im_start|>user\n{user_content}\n<|im_end|>\n"
+              f"<|im_start|>assistant")
+    return client.generate(model, prompt)
+
+
+def bench_prompt_reuse(texts):
+    # Tokens de prompt évalués pour la même série de demandes (plusieurs
+    # tons et langues par texte), par l'ancien chemin puis par /api/chat
+    import core
+    from benchmarks.fake_ollama import FakeOllama
+    from ollama_client import OllamaClient
+
+    results = {}
+    for mode in ('generate', 'chat'):
+        with FakeOllama(latency=0.0,
+                        tokens_per_second=10000.0,
+                        response_tokens=5,
+                        parallel=1) as fake:
+            client = OllamaClient(fake.url)
+            client.log_timings = False
+            requests_sent = 0
+            for text in texts:
+                for tone in core.TONES[:3]:
+                    if mode == 'chat':
+                        client.chat('qwen2.5:3b',
+                                    core.build_reformulation_messages(
+                                        core.DEFAULT_SYSTEM_PROMPT, text,
+                                        tone, core.FORMATS[0],
+                                        core.LENGTHS[0]))
+                    else:
+                        legacy_generate(
+                            client, 'qwen2.5:3b', core.DEFAULT_SYSTEM_PROMPT,
+                            f"Texte à reformuler: {text}\nTon: {tone}\n"
+                            f"Format: {core.FORMATS[0]}\n"
+                            f"Longueur: {core.LENGTHS[0]}")
+                    requests_sent += 1
+                for lang in core.LANGUAGES[:3]:
+                    if mode == 'chat':
+                        client.chat('qwen2.5:3b',
+                                    core.build_translation_messages(
+                                        text, lang))
+                    else:
+                        legacy_generate(
+                            client, 'qwen2.5:3b',
+                            f"Tu es un traducteur automatique. Détecte "
+                            f"automatiquement la langue source du texte et "
+                            f"traduis-le en {lang}. Retourne UNIQUEMENT la "
+                            f"traduction, sans aucun autre commentaire.",
+                            text)
+                    requests_sent += 1
+            evaluated = fake.snapshot()['prompt_tokens_evaluated']
+            client.close()
+        results[mode] = {
+            'requests': requests_sent,
+            'prompt_tokens_evaluated': evaluated,
+            'prompt_tokens_per_request': round(evaluated / requests_sent, 1)
+        }
+    return {'prompt_reuse': results}
+
+
+def bench_generation_limits(texts):
+    # Tokens générés par un modèle bavard (1200 tokens quelle que soit la
+    # demande) selon le tag de longueur, sans puis avec les limites, et
+    # rechargements provoqués par les changements de num_ctx
+    import config
+    import core
+    from benchmarks.fake_ollama import FakeOllama
+    from ollama_client import OllamaClient
+
+    results = {}
+    enabled = config.GENERATION_LIMITS
+    try:
+        for mode, limits in (('without_limits', False), ('with_limits',
+                                                          True)):
+            config.GENERATION_LIMITS = limits
+            with FakeOllama(latency=0.0,
+                            tokens_per_second=100000.0,
+                            response_tokens=1200) as fake:
+                client = OllamaClient(fake.url)
+                client.log_timings = False
+                tokens = {}
+                for length in core.LENGTHS:
+                    before = fake.snapshot()['tokens_sent']
+                    for text in texts:
+                        core.reformulate(client, 'qwen2.5:3b',
+                                         core.DEFAULT_SYSTEM_PROMPT, text,
+                                         core.TONES[0], core.FORMATS[0],
+                                         length)
+                    tokens[length] = fake.snapshot()['tokens_sent'] - before
+                results[mode] = {
+                    'tokens_by_length': tokens,
+                    'context_reloads': fake.snapshot()['context_reloads']
+                }
+                client.close()
+    finally:
+        config.GENERATION_LIMITS = enabled
+    return {'generation_limits': results}
+
+
+def bench_coalescing(callers):
+    # Demandes identiques simultanées (double clic, plusieurs fenêtres) :
+    # générations envoyées au serveur et durée totale, sans puis avec
+    # regroupement
+    import core
+    from benchmarks.fake_ollama import FakeOllama
+    from ollama_client import OllamaClient
+
+    results = {}
+    for mode, coalesce in (('without_coalescing', False), ('with_coalescing',
+                                                           True)):
+        with FakeOllama(latency=0.05,
+                        tokens_per_second=500.0,
+                        response_tokens=60,
+                        parallel=2) as fake:
+            client = OllamaClient(fake.url)
+            client.log_timings = False
+            client.coalesce = coalesce
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=callers) as executor:
+                outputs = list(
+                    executor.map(
+                        lambda _: core.translate(client, 'qwen2.5:3b',
+                                                 SAMPLE_TEXT, 'Anglais'),
+                        range(callers)))
+            results[mode] = {
+                'callers': callers,
+                'generations': fake.snapshot()['completed_generations'],
+                'total_ms': round((time.perf_counter() - start) * 1000, 2),
+                'identical_outputs': len(set(outputs)) == 1,
+                'coalesced': client.stats()['/api/chat']['coalesced']
+            }
+            client.close()
+    return {'coalescing': results}
+
+
+LEGACY_CLEANUP_MARKERS = [
+    'paramètre', 'ton:', 'format:', 'longueur:', 'voici', 'reformulation'
+]
+
+
+def legacy_clean(text):
+    # Ancien filtre : toute ligne contenant un des marqueurs était retirée,
+    # une fois la réponse complète reçue
+    return '\n'.join(
+        line for line in text.split('\n')
+        if not any(x in line.lower() for x in LEGACY_CLEANUP_MARKERS)).strip()
+
+
+def bench_cleaner(runs, lines=2000):
+    # Nettoyage d'une longue réponse découpée en tokens : ancien filtre sur le
+    # texte complet contre nettoyage au fil du flux, et lignes légitimes
+    # perdues par chacun
+    from cleaning import OutputCleaner
+
+    legitimate = [
+        "Voici nos horaires d'ouverture pour la semaine prochaine.",
+        "Le ton de la réunion était cordial et constructif.",
+        "Cette reformulation du contrat entre en vigueur demain."
+    ]
+    body = [SAMPLE_TEXT] * (lines - len(legitimate)) + legitimate
+    text = "Voici la reformulation :\n\n" + '\n'.join(body)
+    tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+    legacy, streamed = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        legacy_result = legacy_clean(''.join(tokens))
+        legacy.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        cleaner = OutputCleaner()
+        for token in tokens:
+            cleaner.feed(token)
+        cleaner.finish()
+        streamed_result = cleaner.result()
+        streamed.append(time.perf_counter() - start)
+    return {
+        'cleaner': {
+            'tokens': len(tokens),
+            'legacy': summarize(legacy),
+            'streamed': summarize(streamed),
+            'legacy_lost_lines': sum(line not in legacy_result
+                                     for line in legitimate),
+            'streamed_lost_lines': sum(line not in streamed_result
+                                       for line in legitimate)
+        }
+    }
+
+
+def bench_history(entries, runs):
+    # Pages de l'historique avec de nombreuses entrées : première page, page
+    # profonde et recherche plein texte
+    from history import HistoryStore
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(os.path.join(directory, 'history.sqlite3'),
+                             max_entries=0)
+        db = store._connection()
+        db.executemany(
+            "INSERT INTO history (created_at, kind, model, params, input, "
+            "output, elapsed_ms) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((time.time(), 'reformulation', 'qwen2.5:3b', '{}',
+              f"{SAMPLE_TEXT} commande {i}", f"Réponse {i}", 100.0)
+             for i in range(entries)))
+        db.commit()
+        timings = {'first_page': [], 'deep_page': [], 'search': []}
+        for _ in range(runs):
+            start = time.perf_counter()
+            store.page(limit=200)
+            timings['first_page'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            store.page(before_id=entries // 10, limit=200)
+            timings['deep_page'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            store.page("commande service", limit=200)
+            timings['search'].append(time.perf_counter() - start)
+        result = {
+            'entries': entries,
+            'full_text': store.full_text,
+            **{name: summarize(values)
+               for name, values in timings.items()}
+        }
+        store.close()
+    return {'history': result}
+
+
+class StallMonitor:
+    # Mesure les blocages de la boucle d'événements Qt : un minuteur rapide
+    # devrait tourner toutes les `interval_ms` ; tout retard est un blocage
+
+    def __init__(self, interval_ms=5):
+        from PyQt6.QtCore import QTimer
+
+        self.interval = interval_ms / 1000
+        self.gaps = []
+        self.last = None
+        self.timer = QTimer()
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.tick)
+
+    def tick(self):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.gaps.append(max(0.0, now - self.last - self.interval))
+        self.last = now
+
+    def start(self):
+        self.gaps = []
+        self.last = time.perf_counter()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        return {
+            'max_stall_ms': round(max(self.gaps, default=0.0) * 1000, 2),
+            'total_stall_ms': round(sum(self.gaps) * 1000, 2)
+        }
+
+
+def wait_until(condition, timeout=30.0):
+    from PyQt6.QtWidgets import QApplication
+
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("délai dépassé pendant la mesure GUI")
+        QApplication.processEvents()
+        time.sleep(0.001)
+
+
+def bench_gui(fake, runs):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication
+
+    import app
+
+    qt_app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = app.ReformulatorApp()
+    window.client.log_timings = False
+    window.ollama_url = fake.url
+    window.bypass_cache = True
+    window.show()
+    # Laisse partir puis aboutir le préchargement lancé à l'affichage
+    qt_app.processEvents()
+    wait_until(lambda: window.warmup_worker is None)
+    monitor = StallMonitor()
+    results = {}
+
+    def measure(name, start_action, first_output, done):
+        ttft = []
+        total = []
+        stalls = []
+        for _ in range(runs):
+            monitor.start()
+            start = time.perf_counter()
+            start_action()
+            first = None
+            while not done():
+                if first is None and first_output():
+                    first = time.perf_counter() - start
+                qt_app.processEvents()
+                time.sleep(0.001)
+            total.append(time.perf_counter() - start)
+            ttft.append(first)
+            stalls.append(monitor.stop())
+        results[name] = {
+            'runs': runs,
+            'time_to_first_token': summarize(ttft),
+            'total_latency': summarize(total),
+            'max_stall_ms': max(s['max_stall_ms'] for s in stalls),
+            'total_stall_ms': round(
+                statistics.mean(s['total_stall_ms'] for s in stalls), 2)
+        }
+
+    window.input_text.setPlainText(SAMPLE_TEXT)
+    window.stream_output = True
+    measure('gui_reformulate_text', window.reformulate_text,
+            lambda: bool(window.output_text.toPlainText()),
+            lambda: window.worker is None)
+
+    # Reformulation anticipée : délai entre le clic et l'affichage quand le
+    # calcul a déjà été fait pendant que l'utilisateur relisait
+    click_times = []
+    window.speculation_delay_input.setValue(200)
+    window.speculative_checkbox.setChecked(True)
+    for run in range(runs):
+        window.input_text.setPlainText(f"{SAMPLE_TEXT} ({run})")
+        wait_until(lambda: window.speculation is not None and window.
+                   speculation.outcome is not None)
+        start = time.perf_counter()
+        window.reformulate_text()
+        click_times.append(time.perf_counter() - start)
+    window.speculative_checkbox.setChecked(False)
+    results['gui_speculative_click'] = {
+        'runs': runs,
+        'click_to_result': summarize(click_times)
+    }
+
+    dialog = app.TranslationDialog(window)
+    dialog.bypass_cache_checkbox.setChecked(True)
+    dialog.input_text.setPlainText(SAMPLE_TEXT)
+    measure('gui_translate_text', dialog.translate_text,
+            lambda: bool(dialog.output_text.toPlainText()),
+            lambda: dialog.worker is None)
+
+    open_times = []
+    refresh_times = []
+    stalls = []
+    for _ in range(runs):
+        monitor.start()
+        start = time.perf_counter()
+        settings = app.SettingsDialog(window.ollama_url,
+                                      window.current_model,
+                                      window.client,
+                                      cache=window.cache,
+                                      catalog=window.model_catalog,
+                                      parent=window)
+        open_times.append(time.perf_counter() - start)
+        wait_until(lambda: settings.refresh_worker is None)
+        refresh_times.append(time.perf_counter() - start)
+        stalls.append(monitor.stop())
+        settings.done(0)
+    results['gui_refresh_models'] = {
+        'runs': runs,
+        'dialog_open': summarize(open_times),
+        'models_loaded': summarize(refresh_times),
+        'max_stall_ms': max(s['max_stall_ms'] for s in stalls)
+    }
+
+    window.close()
+    return results
+
+
+def bench_startup(fake, runs):
+    # Démarrage à froid dans un processus neuf, via --startup-profile
+    env = dict(os.environ,
+               QT_QPA_PLATFORM='offscreen',
+               OLLAMA_URL=fake.url)
+    samples = {}
+    for _ in range(runs):
+        completed = subprocess.run([
+            sys.executable,
+            os.path.join(ROOT, 'app.py'), '--startup-profile',
+            '--exit-after-startup'
+        ],
+                                   env=env,
+                                   capture_output=True,
+                                   text=True,
+                                   timeout=60)
+        profile_lines = [
+            line for line in completed.stderr.splitlines()
+            if line.startswith('{')
+        ]
+        if not profile_lines:
+            raise RuntimeError(f"profil de démarrage absent :\n"
+                               f"{completed.stderr}")
+        for key, value in json.loads(profile_lines[-1]).items():
+            samples.setdefault(key, []).append(value / 1000)
+    budget = samples.pop('import_budget_ms')[0] * 1000
+    return {
+        'startup': {
+            'runs': runs,
+            'import_budget_ms': budget,
+            **{key: summarize(values)
+               for key, values in samples.items()}
+        }
+    }
+
+
+def compare(current, previous):
+    # Affiche l'évolution des moyennes par rapport à une exécution précédente
+    lines = []
+
+    def walk(new, old, path):
+        for key, value in new.items():
+            if key not in old:
+                continue
+            if isinstance(value, dict):
+                walk(value, old[key], f"{path}{key}.")
+            elif isinstance(value, (int, float)) and old[key]:
+                delta = (value - old[key]) / old[key] * 100
+                lines.append(f"{path}{key}: {old[key]} -> {value} "
+                             f"({delta:+.1f} %)")
+
+    walk(current['results'], previous.get('results', {}), '')
+    return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mesures de performance contre un faux Ollama")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency',
+                        type=float,
+                        default=0.05,
+                        help="délai avant le premier token (s)")
+    parser.add_argument('--tps', type=float, default=200.0)
+    parser.add_argument('--tokens', type=int, default=60)
+    parser.add_argument('--parallel',
+                        type=int,
+                        default=4,
+                        help="générations simultanées du faux serveur")
+    parser.add_argument('--concurrency',
+                        default='1,4,8',
+                        help="niveaux de concurrence mesurés")
+    parser.add_argument('--requests',
+                        type=int,
+                        default=16,
+                        help="requêtes par niveau de concurrence")
+    parser.add_argument('--history-entries',
+                        type=int,
+                        default=100000,
+                        help="entrées de l'historique pour sa mesure")
+    parser.add_argument('--skip-gui', action='store_true')
+    parser.add_argument('--output', help="fichier JSON des résultats")
+    parser.add_argument('--compare', help="résultats précédents à comparer")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Cache et historique isolés : les mesures ne touchent pas aux données
+    # de l'utilisateur
+    os.environ.setdefault('TEXTREFINE_HOME',
+                          tempfile.mkdtemp(prefix='textrefine-bench-'))
+    sys.path.insert(0, ROOT)
+    from benchmarks.fake_ollama import FakeOllama
+
+    results = {}
+    with FakeOllama(latency=args.latency,
+                    tokens_per_second=args.tps,
+                    response_tokens=args.tokens,
+                    parallel=args.parallel) as fake:
+        results.update(bench_headless(fake, args.runs))
+        levels = [int(level) for level in args.concurrency.split(',')]
+        results.update(bench_concurrency(fake, args.requests, levels))
+        results.update(bench_variants(fake, args.runs))
+        results.update(bench_endpoints(args.requests, args.parallel))
+        results.update(
+            bench_prompt_reuse([SAMPLE_TEXT, SAMPLE_TEXT[::-1], SAMPLE_TEXT * 3]))
+        results.update(bench_cleaner(args.runs))
+        results.update(
+            bench_generation_limits([SAMPLE_TEXT, SAMPLE_TEXT * 4]))
+        results.update(bench_history(args.history_entries, args.runs))
+        results.update(bench_coalescing(args.parallel * 2))
+        if not args.skip_gui:
+            results.update(bench_startup(fake, args.runs))
+            results.update(bench_gui(fake, args.runs))
+        server_counters = fake.snapshot()
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': vars(args),
+        'server': server_counters,
+        'results': results
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"Résultats enregistrés dans {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(report, json.load(f)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+
+class ResultCache:
+    # Cache à deux niveaux : LRU en mémoire devant une base SQLite qui
+    # survit aux redémarrages
+
+    def __init__(self,
+                 path=None,
+                 max_memory_entries=config.CACHE_MEMORY_ENTRIES,
+                 max_disk_entries=config.CACHE_DISK_ENTRIES,
+                 ttl=config.CACHE_TTL):
+        self.path = path or os.path.join(config.DATA_DIR, 'cache.sqlite3')
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._db = None
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+
+    @staticmethod
+    def make_key(model, system_prompt, text, params):
+        payload = json.dumps([model, system_prompt, text, params],
+                             ensure_ascii=False,
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _connection(self):
+        # Ouverture différée : aucun accès disque tant que le cache ne sert pas
+        if self._db is None:
+            import sqlite3
+
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed "
+                             "ON results(accessed_at)")
+            self._db.commit()
+        return self._db
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._hits_memory += 1
+                    return value
+                del self._memory[key]
+
+            db = self._connection()
+            row = db.execute(
+                "SELECT value, created_at FROM results WHERE key = ?",
+                (key, )).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                db.execute("DELETE FROM results WHERE key = ?", (key, ))
+                db.commit()
+                row = None
+            if row is None:
+                self._misses += 1
+                return None
+            db.execute("UPDATE results SET accessed_at = ? WHERE key = ?",
+                       (now, key))
+            db.commit()
+            self._remember(key, row[0], row[1])
+            self._hits_disk += 1
+            return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, value, now, now))
+            db.execute("DELETE FROM results WHERE created_at < ?",
+                       (now - self.ttl, ))
+            db.execute(
+                """DELETE FROM results WHERE key IN (
+                    SELECT key FROM results ORDER BY accessed_at DESC
+                    LIMIT -1 OFFSET ?)""", (self.max_disk_entries, ))
+            db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            db = self._connection()
+            db.execute("DELETE FROM results")
+            db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits_memory + self._hits_disk + self._misses
+            hits = self._hits_memory + self._hits_disk
+            return {
+                'hits_memory': self._hits_memory,
+                'hits_disk': self._hits_disk,
+                'misses': self._misses,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory)
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class ModelCatalog:
+    # Dernière liste de modèles connue pour chaque URL d'Ollama, pour ouvrir
+    # la configuration sans attendre le réseau
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(config.DATA_DIR, 'models.json')
+        self._lock = threading.Lock()
+        self._catalog = None
+
+    def _load(self):
+        if self._catalog is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self._catalog = json.load(f)
+            except (OSError, ValueError):
+                self._catalog = {}
+        return self._catalog
+
+    def get(self, url):
+        with self._lock:
+            entry = self._load().get(url.rstrip('/'))
+            return entry['models'] if entry else []
+
+    def put(self, url, models):
+        with self._lock:
+            catalog = self._load()
+            catalog[url.rstrip('/')] = {
+                'models': models,
+                'updated_at': time.time()
+            }
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, 'w', encoding='utf-8') as f:
+                json.dump(catalog, f, ensure_ascii=False)
+            os.replace(temporary_path, self.path)
@@ -0,0 +1,96 @@
+import re
+from collections import namedtuple
+
+import config
+
+# Découpage d'un document long en morceaux bornés en tokens, sur les limites
+# de sections et de paragraphes
+
+# Estimation grossière mais stable : environ 4 caractères par token
+CHARS_PER_TOKEN = 4
+
+Chunk = namedtuple('Chunk', ['index', 'text', 'context'])
+
+_PARAGRAPH_SEPARATOR = re.compile(r'\n\s*\n')
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+_HEADING = re.compile(r'^(#{1,6}\s|[A-ZÀ-Ý0-9][^\n]{0,80}:$)')
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _split_oversized(paragraph, max_tokens):
+    # Paragraphe trop long : découpe par phrases, puis par mots en dernier
+    # recours
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    current = ''
+    for sentence in _SENTENCE_END.split(paragraph):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _tail(text, max_tokens):
+    # Fin du morceau précédent, recalée sur un début de phrase ou de mot
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    tail = text[-max_chars:]
+    match = _SENTENCE_END.search(tail)
+    if match and match.end() < len(tail):
+        return tail[match.end():]
+    space = tail.find(' ')
+    return tail[space + 1:] if space >= 0 else tail
+
+
+def split_document(text,
+                   max_tokens=config.CHUNK_TOKENS,
+                   overlap_tokens=config.CHUNK_OVERLAP_TOKENS):
+    units = []
+    for paragraph in _PARAGRAPH_SEPARATOR.split(text.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) > max_tokens:
+            units.extend(_split_oversized(paragraph, max_tokens))
+        else:
+            units.append(paragraph)
+
+    texts = []
+    current = []
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        # Un titre de section ouvre de préférence un nouveau morceau
+        starts_section = (_HEADING.match(unit)
+                          and current_tokens > max_tokens // 2)
+        if current and (current_tokens + unit_tokens > max_tokens
+                        or starts_section):
+            texts.append('\n\n'.join(current))
+            current = []
+            current_tokens = 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        texts.append('\n\n'.join(current))
+
+    return [
+        Chunk(index, chunk_text,
+              _tail(texts[index - 1], overlap_tokens) if index else '')
+        for index, chunk_text in enumerate(texts)
+    ]
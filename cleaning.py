@@ -0,0 +1,122 @@
+import re
+from functools import lru_cache
+
+# Nettoyage de la sortie du modèle : retire les lignes de commentaire
+# (préambule, rappel des paramètres) au fil du flux de tokens
+
+# Expressions régulières appliquées au début de chaque ligne, sans tenir
+# compte de la casse. Elles visent des lignes entières pour ne pas retirer
+# une phrase légitime qui contiendrait simplement « voici » ou « ton ».
+DEFAULT_CLEANUP_PATTERNS = [
+    # « Voici la reformulation : », « Voilà le texte reformulé : »
+    r"(?:voici|voilà)\b.*(?:reformul|version|texte|traduction).*:\s*$",
+    # Rappel des paramètres : « Ton : Professionnel », « Longueur: Court »
+    r"(?:ton|format|longueur|paramètres?)\s*:\s*[^\n]{0,40}$",
+    # Titre seul : « Reformulation : », « Texte reformulé : »
+    r"(?:texte\s+)?reformul(?:ation|é|e)\s*:?\s*$",
+]
+
+# Au-delà de cette longueur sans retour à la ligne, une ligne est affichée
+# sans attendre sa fin : les motifs visent des lignes courtes
+MAX_HOLD_CHARS = 120
+
+
+@lru_cache(maxsize=16)
+def compile_patterns(patterns):
+    # Un seul automate pour tous les motifs, compilé une fois par liste
+    if not patterns:
+        return None
+    return re.compile(
+        r"\s*(?:" + "|".join(f"(?:{pattern})" for pattern in patterns) + ")",
+        re.IGNORECASE)
+
+
+def validate_patterns(patterns):
+    # Renvoie le message d'erreur du premier motif invalide, ou None
+    for pattern in patterns:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            return f"{pattern} : {e}"
+    return None
+
+
+class OutputCleaner:
+
+    def __init__(self, patterns=None, max_hold=MAX_HOLD_CHARS):
+        if patterns is None:
+            patterns = DEFAULT_CLEANUP_PATTERNS
+        self.regex = compile_patterns(tuple(patterns))
+        self.max_hold = max_hold
+        self._line = ''
+        # Ligne trop longue déjà transmise : la suite passe directement
+        self._released = False
+        self._started = False
+        self._output = []
+
+    def feed(self, chunk):
+        # Renvoie la partie du texte qui peut déjà être affichée
+        if '\n' not in chunk:
+            # Cas le plus courant : un token au milieu d'une ligne
+            if self._released:
+                self._output.append(chunk)
+                return chunk
+            self._line += chunk
+            if len(self._line) <= self.max_hold:
+                return ''
+            text = self._emit(self._line)
+            self._line = ''
+            self._released = True
+            self._output.append(text)
+            return text
+        emitted = []
+        while chunk:
+            newline = chunk.find('\n')
+            if newline < 0:
+                part, chunk = chunk, ''
+            else:
+                part, chunk = chunk[:newline + 1], chunk[newline + 1:]
+            if self._released:
+                emitted.append(part)
+            else:
+                self._line += part
+                if part.endswith('\n'):
+                    emitted.append(self._release_line())
+                elif len(self._line) > self.max_hold:
+                    emitted.append(self._emit(self._line))
+                    self._line = ''
+                    self._released = True
+            if part.endswith('\n'):
+                self._released = False
+        text = ''.join(emitted)
+        self._output.append(text)
+        return text
+
+    def finish(self):
+        # Dernière ligne, sans retour à la ligne final
+        text = self._release_line() if self._line else ''
+        self._output.append(text)
+        return text
+
+    def result(self):
+        return ''.join(self._output).strip()
+
+    def _release_line(self):
+        line, self._line = self._line, ''
+        if self.regex is not None and self.regex.match(line):
+            return ''
+        return self._emit(line)
+
+    def _emit(self, text):
+        # Pas de lignes vides en tête de réponse
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+
+def clean_text(text, patterns=None):
+    cleaner = OutputCleaner(patterns)
+    cleaner.feed(text)
+    cleaner.finish()
+    return cleaner.result()
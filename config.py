@@ -0,0 +1,78 @@
+import os
+
+# Valeurs par défaut, surchargeables par variables d'environnement
+DEFAULT_OLLAMA_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434')
+DEFAULT_MODEL = os.environ.get('TEXTREFINE_MODEL', 'qwen2.5:3b')
+# Serveurs Ollama supplémentaires, séparés par des virgules
+EXTRA_OLLAMA_URLS = [
+    url.strip() for url in os.environ.get('OLLAMA_EXTRA_URLS', '').split(',')
+    if url.strip()
+]
+
+# Sondes de santé des serveurs (plusieurs serveurs seulement) : intervalle
+# et délai de réponse en secondes
+PROBE_INTERVAL = float(os.environ.get('TEXTREFINE_PROBE_INTERVAL', '15'))
+PROBE_TIMEOUT = float(os.environ.get('TEXTREFINE_PROBE_TIMEOUT', '3'))
+
+# Délais réseau en secondes : connexion TCP puis attente entre deux lectures
+CONNECT_TIMEOUT = float(os.environ.get('TEXTREFINE_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.environ.get('TEXTREFINE_READ_TIMEOUT', '300'))
+
+# Nombre de connexions conservées ouvertes par hôte Ollama
+POOL_SIZE = int(os.environ.get('TEXTREFINE_POOL_SIZE', '10'))
+
+# Dossier des données persistantes (cache, historique...)
+DATA_DIR = os.environ.get('TEXTREFINE_HOME',
+                          os.path.join(os.path.expanduser('~'),
+                                       '.textrefineqt'))
+
+# Cache des résultats : entrées en mémoire, entrées sur disque, durée de vie
+CACHE_MEMORY_ENTRIES = int(os.environ.get('TEXTREFINE_CACHE_MEMORY', '256'))
+CACHE_DISK_ENTRIES = int(os.environ.get('TEXTREFINE_CACHE_DISK', '5000'))
+CACHE_TTL = float(os.environ.get('TEXTREFINE_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Requêtes simultanées envoyées à Ollama (à aligner sur OLLAMA_NUM_PARALLEL)
+MAX_PARALLEL_REQUESTS = int(
+    os.environ.get('TEXTREFINE_PARALLEL',
+                   os.environ.get('OLLAMA_NUM_PARALLEL', '4')))
+
+# Découpage des documents longs (en tokens estimés)
+LONG_DOCUMENT_TOKENS = int(os.environ.get('TEXTREFINE_LONG_DOCUMENT', '3000'))
+CHUNK_TOKENS = int(os.environ.get('TEXTREFINE_CHUNK_TOKENS', '1500'))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get('TEXTREFINE_CHUNK_OVERLAP', '120'))
+
+# Durée de maintien du modèle en mémoire côté Ollama ("30m", "1h", "-1"...)
+KEEP_ALIVE = os.environ.get('TEXTREFINE_KEEP_ALIVE', '30m')
+
+# Budget de temps d'import du module principal (--startup-profile)
+IMPORT_BUDGET_MS = float(os.environ.get('TEXTREFINE_IMPORT_BUDGET_MS', '150'))
+
+# Reformulation anticipée : délai de stabilité du texte et des tags avant de
+# lancer la requête en arrière-plan
+SPECULATIVE_DEBOUNCE_MS = int(
+    os.environ.get('TEXTREFINE_SPECULATIVE_DEBOUNCE_MS', '1200'))
+
+# Nombre maximal de combinaisons de tags générées en mode variantes
+MAX_VARIANTS = int(os.environ.get('TEXTREFINE_MAX_VARIANTS', '12'))
+
+# Mesures de performance conservées en mémoire (fenêtre glissante)
+TELEMETRY_ENTRIES = int(os.environ.get('TEXTREFINE_TELEMETRY_ENTRIES', '1000'))
+
+# Limites de génération : num_predict selon le tag de longueur et num_ctx
+# selon la taille estimée du prompt (0 : valeurs par défaut du modèle)
+GENERATION_LIMITS = os.environ.get('TEXTREFINE_GENERATION_LIMITS',
+                                   '1') != '0'
+NUM_CTX_MIN = int(os.environ.get('TEXTREFINE_NUM_CTX_MIN', '2048'))
+NUM_CTX_MAX = int(os.environ.get('TEXTREFINE_NUM_CTX_MAX', '32768'))
+
+# Entrées conservées dans l'historique des demandes (0 : sans limite)
+HISTORY_MAX_ENTRIES = int(os.environ.get('TEXTREFINE_HISTORY_MAX', '100000'))
+
+# Mode serveur HTTP (python server.py) : demandes traitées simultanément et
+# demandes en attente au-delà desquelles le serveur répond 503. Sans
+# authentification, il n'écoute qu'en local sauf TEXTREFINE_SERVER_HOST
+SERVER_HOST = os.environ.get('TEXTREFINE_SERVER_HOST', '127.0.0.1')
+SERVER_PORT = int(os.environ.get('TEXTREFINE_SERVER_PORT', '3000'))
+SERVER_WORKERS = int(
+    os.environ.get('TEXTREFINE_SERVER_WORKERS', str(MAX_PARALLEL_REQUESTS)))
+SERVER_QUEUE_SIZE = int(os.environ.get('TEXTREFINE_SERVER_QUEUE', '32'))
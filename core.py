@@ -0,0 +1,439 @@
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import config
+from cache import ResultCache
+from chunking import estimate_tokens, split_document
+from cleaning import OutputCleaner
+from ollama_client import CancelToken, Cancelled
+
+# Logique de reformulation et de traduction indépendante de Qt, partagée par
+# l'interface graphique et le traitement par lots
+
+DEFAULT_SYSTEM_PROMPT = """Tu es un expert en reformulation. Tu dois reformuler le texte selon les paramètres spécifiés par l'utilisateur: ton, format et longueur. IMPORTANT : retourne UNIQUEMENT le texte reformulé, sans aucune mention des paramètres. 
+Respecte scrupuleusement le format demandé, la longueur et le ton. Ne rajoute aucun autre commentaire."""
+
+TONES = [
+    "Professionnel", "Informatif", "Décontracté", "Enthousiaste", "Drôle",
+    "Sarcastique"
+]
+FORMATS = ["Mail", "Paragraphe", "Idées", "Article de blog"]
+LENGTHS = ["Court", "Moyen", "Long"]
+LANGUAGES = [
+    "Anglais", "Français", "Espagnol", "Allemand", "Italien", "Portugais"
+]
+
+# Budget de réponse (num_predict) par tag de longueur : un plancher en
+# tokens et une proportion de la taille du texte d'entrée. Les tags ajoutés
+# par l'utilisateur n'ont pas de limite.
+LENGTH_BUDGETS = {
+    "Court": (256, 0.75),
+    "Moyen": (768, 1.5),
+    "Long": (1536, 2.5)
+}
+# Une traduction fait à peu près la taille du texte source
+TRANSLATION_BUDGET = (256, 2.0)
+# Réserve de contexte pour une réponse sans limite
+UNLIMITED_BUDGET = LENGTH_BUDGETS["Long"]
+# Tokens ajoutés par le gabarit du modèle autour de chaque message
+MESSAGE_OVERHEAD_TOKENS = 8
+
+# Le message système ne dépend d'aucun paramètre : identique d'un appel à
+# l'autre, son évaluation est réutilisée par Ollama. La langue cible est
+# indiquée dans le message utilisateur.
+TRANSLATION_SYSTEM_PROMPT = "Tu es un traducteur automatique. Détecte automatiquement la langue source du texte et traduis-le dans la langue demandée. Retourne UNIQUEMENT la traduction, sans aucun autre commentaire."
+
+
+class TruncatedText(str):
+    # Réponse coupée par num_predict : affichée avec un avertissement, jamais
+    # mise en cache
+    truncated = True
+
+
+def is_truncated(text):
+    return isinstance(text, TruncatedText)
+
+
+def build_reformulation_messages(system_prompt,
+                                 text,
+                                 tone,
+                                 text_format,
+                                 length,
+                                 context=''):
+    # Les paramètres viennent après le texte : deux demandes sur le même
+    # texte partagent le plus long préfixe possible
+    return [{
+        'role': 'system',
+        'content': system_prompt
+    }, {
+        'role':
+        'user',
+        'content': (f"{context}Texte à reformuler: {text}\n"
+                    f"Ton: {tone}\n"
+                    f"Format: {text_format}\n"
+                    f"Longueur: {length}")
+    }]
+
+
+def build_translation_messages(text, target_lang):
+    return [{
+        'role': 'system',
+        'content': TRANSLATION_SYSTEM_PROMPT
+    }, {
+        'role': 'user',
+        'content': f"{text}\n\nLangue cible: {target_lang}"
+    }]
+
+
+def clean_translation(text):
+    return text.strip()
+
+
+def document_part_context(previous_text, index, total):
+    # Consignes d'une partie de document long : l'extrait précédent garde le
+    # ton cohérent d'une partie à l'autre sans être reformulé une seconde fois
+    context = (f"Partie {index + 1} sur {total} d'un document plus long : "
+               f"ne rajoute ni introduction ni conclusion.\n")
+    if previous_text:
+        context += (f"Fin de la partie précédente (contexte uniquement, ne "
+                    f"pas reformuler): {previous_text}\n")
+    return context
+
+
+def generation_budget(text, budget):
+    floor, ratio = budget
+    return max(floor, math.ceil(estimate_tokens(text) * ratio))
+
+
+def prompt_tokens(messages):
+    # Estimation locale majorée d'un quart : mieux vaut un contexte un peu
+    # grand qu'un prompt tronqué par Ollama
+    return math.ceil(
+        sum(
+            estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+            for message in messages) * 1.25)
+
+
+def context_size(prompt_size, num_predict):
+    # Arrondi à la puissance de deux supérieure : Ollama recharge le modèle
+    # quand num_ctx change, peu de valeurs distinctes limitent ces
+    # rechargements. Un texte court reste à NUM_CTX_MIN quel que soit le tag
+    # de longueur.
+    size = config.NUM_CTX_MIN
+    while size < prompt_size + num_predict and size < config.NUM_CTX_MAX:
+        size *= 2
+    return min(size, config.NUM_CTX_MAX)
+
+
+def generation_options(messages, text, budget):
+    options = {}
+    if not config.GENERATION_LIMITS:
+        return options
+    prompt_size = prompt_tokens(messages)
+    num_predict = generation_budget(text, budget or UNLIMITED_BUDGET)
+    num_ctx = context_size(prompt_size, num_predict)
+    options['num_ctx'] = num_ctx
+    if prompt_size >= num_ctx:
+        print(f"Prompt estimé à {prompt_size} tokens, au-delà de num_ctx "
+              f"({num_ctx}) : Ollama le tronquera")
+    elif budget is not None:
+        # La réponse ne peut dépasser le contexte restant
+        num_predict = min(num_predict, num_ctx - prompt_size)
+    if budget is not None:
+        options['num_predict'] = num_predict
+    return options
+
+
+def preload_options():
+    # Contexte des demandes courantes, le plus fréquent
+    if not config.GENERATION_LIMITS:
+        return {}
+    return {'num_ctx': config.NUM_CTX_MIN}
+
+
+def reformulation_options(messages, text, length, stop=None):
+    # Options Ollama d'une reformulation : longueur de réponse bornée selon
+    # le tag, contexte dimensionné sur le prompt, et séquences d'arrêt qui
+    # coupent la génération avant un commentaire final
+    options = generation_options(messages, text, LENGTH_BUDGETS.get(length))
+    if stop:
+        options['stop'] = list(stop)
+    return options
+
+
+def translation_options(messages, text):
+    return generation_options(messages, text, TRANSLATION_BUDGET)
+
+
+def reformulation_cache_key(model,
+                            system_prompt,
+                            text,
+                            tone,
+                            text_format,
+                            length,
+                            context='',
+                            cleanup_patterns=None,
+                            stop=None):
+    params = {'tone': tone, 'format': text_format, 'length': length}
+    if context:
+        params['context'] = context
+    # Le nettoyage fait partie du résultat : des réglages différents ne
+    # partagent pas les entrées du cache
+    if cleanup_patterns is not None:
+        params['cleanup'] = list(cleanup_patterns)
+    if stop:
+        params['stop'] = list(stop)
+    return ResultCache.make_key(model, system_prompt, text, params)
+
+
+def translation_cache_key(model, text, target_lang):
+    return ResultCache.make_key(model, TRANSLATION_SYSTEM_PROMPT, text,
+                                {'target_lang': target_lang})
+
+
+def reformulate(client,
+                model,
+                system_prompt,
+                text,
+                tone,
+                text_format,
+                length,
+                context='',
+                cache=None,
+                read_cache=True,
+                on_chunk=None,
+                cancel_token=None,
+                cleanup_patterns=None,
+                stop=None,
+                operation='reformulation'):
+    key = reformulation_cache_key(model, system_prompt, text, tone,
+                                  text_format, length, context,
+                                  cleanup_patterns, stop)
+    if cache is not None and read_cache:
+        cached_text = cache.get(key)
+        if cached_text is not None:
+            return cached_text
+    messages = build_reformulation_messages(system_prompt, text, tone,
+                                            text_format, length, context)
+    # Nettoyage au fil du flux : on_chunk ne reçoit que le texte conservé
+    cleaner = OutputCleaner(cleanup_patterns)
+
+    def forward(token):
+        cleaned = cleaner.feed(token)
+        if cleaned and on_chunk is not None:
+            on_chunk(cleaned)
+
+    metrics = {}
+    client.chat(model,
+                messages,
+                on_chunk=forward,
+                cancel_token=cancel_token,
+                options=reformulation_options(messages, text, length, stop),
+                operation=operation,
+                on_metrics=metrics.update)
+    tail = cleaner.finish()
+    if tail and on_chunk is not None:
+        on_chunk(tail)
+    result = cleaner.result()
+    if metrics.get('done_reason') == 'length':
+        return TruncatedText(result)
+    if cache is not None and result:
+        cache.put(key, result)
+    return result
+
+
+def reformulate_document(client,
+                         model,
+                         system_prompt,
+                         text,
+                         tone,
+                         text_format,
+                         length,
+                         max_workers=config.MAX_PARALLEL_REQUESTS,
+                         cache=None,
+                         read_cache=True,
+                         on_part=None,
+                         cancel_token=None,
+                         cleanup_patterns=None,
+                         stop=None):
+    # Document long : les parties sont reformulées en parallèle puis
+    # recollées dans l'ordre. on_part(index, texte, total) est appelé dès
+    # qu'une partie est prête.
+    key = reformulation_cache_key(model,
+                                  system_prompt,
+                                  text,
+                                  tone,
+                                  text_format,
+                                  length,
+                                  cleanup_patterns=cleanup_patterns,
+                                  stop=stop)
+    if cache is not None and read_cache:
+        cached_text = cache.get(key)
+        if cached_text is not None:
+            return cached_text
+    chunks = split_document(text)
+    parts = [None] * len(chunks)
+    # Jeton propre au document : une partie en échec arrête les autres
+    parts_token = CancelToken()
+    if cancel_token is not None:
+        cancel_token.on_cancel(parts_token.cancel)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(reformulate,
+                            client,
+                            model,
+                            system_prompt,
+                            chunk.text,
+                            tone,
+                            text_format,
+                            length,
+                            context=document_part_context(
+                                chunk.context, chunk.index, len(chunks)),
+                            cache=cache,
+                            read_cache=read_cache,
+                            cancel_token=parts_token,
+                            cleanup_patterns=cleanup_patterns,
+                            stop=stop,
+                            operation='document'): chunk.index
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                parts[index] = future.result()
+            except Exception:
+                parts_token.cancel()
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                raise
+            if on_part is not None:
+                on_part(index, parts[index], len(chunks))
+    result = '\n\n'.join(parts)
+    if any(is_truncated(part) for part in parts):
+        return TruncatedText(result)
+    if cache is not None and result:
+        cache.put(key, result)
+    return result
+
+
+def reformulate_variants(client,
+                         model,
+                         system_prompt,
+                         text,
+                         combinations,
+                         max_workers=config.MAX_PARALLEL_REQUESTS,
+                         cache=None,
+                         read_cache=True,
+                         on_result=None,
+                         cancel_token=None,
+                         cleanup_patterns=None,
+                         stop=None):
+    # Plusieurs combinaisons (ton, format, longueur) du même texte envoyées
+    # en parallèle. on_result(index, texte, erreur) est appelé dès qu'une
+    # variante est terminée.
+    results = [None] * len(combinations)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(reformulate,
+                            client,
+                            model,
+                            system_prompt,
+                            text,
+                            tone,
+                            text_format,
+                            length,
+                            cache=cache,
+                            read_cache=read_cache,
+                            cancel_token=cancel_token,
+                            cleanup_patterns=cleanup_patterns,
+                            stop=stop,
+                            operation='variante'): index
+            for index, (tone, text_format,
+                        length) in enumerate(combinations)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            error = None
+            try:
+                results[index] = future.result()
+            except Cancelled:
+                continue
+            except Exception as e:
+                error = str(e)
+            if on_result is not None:
+                on_result(index, results[index], error)
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    return results
+
+
+def translate(client,
+              model,
+              text,
+              target_lang,
+              cache=None,
+              read_cache=True,
+              on_chunk=None,
+              cancel_token=None):
+    key = translation_cache_key(model, text, target_lang)
+    if cache is not None and read_cache:
+        cached_text = cache.get(key)
+        if cached_text is not None:
+            return cached_text
+    messages = build_translation_messages(text, target_lang)
+    metrics = {}
+    result = clean_translation(
+        client.chat(model,
+                    messages,
+                    on_chunk=on_chunk,
+                    cancel_token=cancel_token,
+                    options=translation_options(messages, text),
+                    operation='traduction',
+                    on_metrics=metrics.update))
+    if metrics.get('done_reason') == 'length':
+        return TruncatedText(result)
+    if cache is not None and result:
+        cache.put(key, result)
+    return result
+
+
+def translate_many(client,
+                   model,
+                   text,
+                   languages,
+                   max_workers=config.MAX_PARALLEL_REQUESTS,
+                   cache=None,
+                   read_cache=True,
+                   on_result=None,
+                   cancel_token=None):
+    # Traductions envoyées en parallèle : la durée totale est proche de celle
+    # de la plus lente. on_result(langue, texte, erreur) est appelé dès qu'une
+    # langue est terminée.
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(translate,
+                            client,
+                            model,
+                            text,
+                            target_lang,
+                            cache=cache,
+                            read_cache=read_cache,
+                            cancel_token=cancel_token): target_lang
+            for target_lang in languages
+        }
+        for future in as_completed(futures):
+            target_lang = futures[future]
+            error = None
+            try:
+                results[target_lang] = future.result()
+            except Cancelled:
+                continue
+            except Exception as e:
+                error = str(e)
+                results[target_lang] = None
+            if on_result is not None:
+                on_result(target_lang, results[target_lang], error)
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    return results
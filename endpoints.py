@@ -0,0 +1,167 @@
+import threading
+import time
+
+import config
+
+# Plusieurs serveurs Ollama : état de santé, charge et modèles de chacun,
+# pour envoyer chaque requête au serveur le moins chargé
+
+
+def normalize_model(name):
+    # Ollama ajoute le tag ":latest" quand il est omis
+    return name if ':' in name else f"{name}:latest"
+
+
+class Endpoint:
+
+    def __init__(self, url):
+        self.url = url
+        self.healthy = True
+        self.version = None
+        self.probe_ms = None
+        self.last_error = None
+        # Modèles installés et modèles chargés en mémoire (None : inconnus)
+        self.models = None
+        self.loaded = set()
+        self.active = 0
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def has_model(self, model):
+        return self.models is None or normalize_model(model) in self.models
+
+
+class EndpointPool:
+
+    def __init__(self, urls, probe=None, interval=config.PROBE_INTERVAL):
+        # probe(url) renvoie {'version', 'loaded', 'models'} ou lève une
+        # exception
+        self.probe = probe
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+        self._endpoints = []
+        self.set_urls(urls)
+
+    @property
+    def urls(self):
+        with self._lock:
+            return [endpoint.url for endpoint in self._endpoints]
+
+    def set_urls(self, urls):
+        # Les serveurs déjà connus gardent leur état et leurs compteurs. Une
+        # liste sans aucune URL valide laisse la liste actuelle en place.
+        with self._lock:
+            known = {endpoint.url: endpoint for endpoint in self._endpoints}
+            endpoints = []
+            for url in urls:
+                url = url.strip().rstrip('/')
+                if url and url not in (e.url for e in endpoints):
+                    endpoints.append(known.get(url) or Endpoint(url))
+            if endpoints:
+                self._endpoints = endpoints
+            several = len(self._endpoints) > 1
+        if several:
+            self._start_probing()
+        self._wake.set()
+
+    def acquire(self, model, exclude=()):
+        # Serveurs en bonne santé qui ont le modèle d'abord, par nombre de
+        # requêtes en cours, modèle déjà chargé puis latence de la sonde ; les
+        # autres restent des solutions de repli
+        model = normalize_model(model)
+        with self._lock:
+            candidates = [
+                endpoint for endpoint in self._endpoints
+                if endpoint.url not in exclude
+            ]
+            if not candidates:
+                return None
+            endpoint = min(
+                candidates,
+                key=lambda e: (not (e.healthy and e.has_model(model)), e.
+                               active, model not in e.loaded, e.probe_ms
+                               if e.probe_ms is not None else float('inf')))
+            endpoint.active += 1
+            return endpoint
+
+    def release(self, endpoint, elapsed, error=None):
+        with self._lock:
+            endpoint.active -= 1
+            endpoint.requests += 1
+            endpoint.total_ms += elapsed * 1000
+            if error is not None:
+                endpoint.errors += 1
+                endpoint.healthy = False
+                endpoint.last_error = str(error)
+            else:
+                endpoint.healthy = True
+        if error is not None:
+            # Nouvelle sonde sans attendre l'intervalle
+            self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            return [{
+                'url': e.url,
+                'healthy': e.healthy,
+                'version': e.version,
+                'probe_ms': e.probe_ms,
+                'models': len(e.models) if e.models is not None else None,
+                'loaded': sorted(e.loaded),
+                'active': e.active,
+                'requests': e.requests,
+                'errors': e.errors,
+                'avg_ms': e.total_ms / e.requests if e.requests else None,
+                'last_error': e.last_error
+            } for e in self._endpoints]
+
+    def probe_all(self):
+        with self._lock:
+            endpoints = list(self._endpoints)
+        for endpoint in endpoints:
+            start = time.perf_counter()
+            try:
+                info = self.probe(endpoint.url)
+            except Exception as e:
+                with self._lock:
+                    endpoint.healthy = False
+                    endpoint.probe_ms = None
+                    endpoint.last_error = str(e)
+                continue
+            with self._lock:
+                endpoint.healthy = True
+                endpoint.probe_ms = (time.perf_counter() - start) * 1000
+                endpoint.version = info.get('version')
+                endpoint.loaded = {
+                    normalize_model(name)
+                    for name in info.get('loaded', ())
+                }
+                if info.get('models') is not None:
+                    endpoint.models = {
+                        normalize_model(name)
+                        for name in info['models']
+                    }
+                endpoint.last_error = None
+
+    def _start_probing(self):
+        if self.probe is None or self._thread is not None or self._closed:
+            return
+        self._thread = threading.Thread(target=self._probe_loop,
+                                        name="ollama-probes",
+                                        daemon=True)
+        self._thread.start()
+
+    def _probe_loop(self):
+        while not self._closed:
+            self._wake.clear()
+            if len(self.urls) > 1:
+                self.probe_all()
+            self._wake.wait(self.interval)
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
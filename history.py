@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+
+import config
+
+# Historique des reformulations et traductions : base SQLite avec index
+# plein texte, lue page par page pour rester rapide avec beaucoup d'entrées
+
+# Longueur de l'aperçu du texte d'entrée renvoyé avec chaque page
+PREVIEW_CHARS = 160
+
+
+def fts_query(text):
+    # Chaque mot devient un préfixe entre guillemets : la saisie de
+    # l'utilisateur n'est jamais interprétée comme syntaxe FTS5
+    words = text.replace('"', ' ').split()
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def like_pattern(text):
+    escaped = (text.replace('\\', '\\\\').replace('%', '\\%').replace(
+        '_', '\\_'))
+    return f"%{escaped}%"
+
+
+class HistoryStore:
+
+    def __init__(self, path=None, max_entries=config.HISTORY_MAX_ENTRIES):
+        self.path = path or os.path.join(config.DATA_DIR, 'history.sqlite3')
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = None
+        # Sans FTS5 dans le SQLite installé, la recherche passe par LIKE
+        self.full_text = False
+
+    def _connection(self):
+        # Ouverture différée, comme le cache : rien n'est lu au démarrage
+        if self._db is None:
+            import sqlite3
+
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            # Écritures courtes depuis le thread GUI : journal WAL sans
+            # synchronisation complète à chaque validation
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    kind TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    input TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    elapsed_ms REAL
+                )""")
+            try:
+                db.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS history_fts
+                    USING fts5(input, output, content='history',
+                               content_rowid='id')""")
+                db.execute("""
+                    CREATE TRIGGER IF NOT EXISTS history_fts_insert
+                    AFTER INSERT ON history BEGIN
+                        INSERT INTO history_fts(rowid, input, output)
+                        VALUES (new.id, new.input, new.output);
+                    END""")
+                db.execute("""
+                    CREATE TRIGGER IF NOT EXISTS history_fts_delete
+                    AFTER DELETE ON history BEGIN
+                        INSERT INTO history_fts(history_fts, rowid, input,
+                                                output)
+                        VALUES ('delete', old.id, old.input, old.output);
+                    END""")
+                self.full_text = True
+            except sqlite3.OperationalError as e:
+                print(f"Recherche plein texte indisponible ({e}), "
+                      f"recherche simple utilisée")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def add(self, kind, model, params, input_text, output_text,
+            elapsed_ms=None):
+        # kind : "reformulation" ou "traduction" ; params : tags ou langue
+        with self._lock:
+            db = self._connection()
+            cursor = db.execute(
+                "INSERT INTO history (created_at, kind, model, params, "
+                "input, output, elapsed_ms) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), kind, model,
+                 json.dumps(params, ensure_ascii=False), input_text,
+                 output_text, elapsed_ms))
+            entry_id = cursor.lastrowid
+            if self.max_entries and entry_id > self.max_entries:
+                # Les identifiants croissent : les plus anciens sont en tête
+                db.execute("DELETE FROM history WHERE id <= ?",
+                           (entry_id - self.max_entries, ))
+            db.commit()
+            return entry_id
+
+    def page(self, query='', before_id=None, limit=100):
+        # Entrées les plus récentes d'abord. La page suivante commence avant
+        # le dernier identifiant reçu : pas d'OFFSET, coût constant quelle
+        # que soit la profondeur
+        columns = (f"history.id, created_at, kind, model, params, "
+                   f"substr(history.input, 1, {PREVIEW_CHARS}), elapsed_ms")
+        source = "history"
+        conditions = []
+        params = []
+        query = query.strip()
+        match = fts_query(query) if query and self.full_text else ''
+        with self._lock:
+            db = self._connection()
+            if match:
+                # L'index plein texte est parcouru directement dans l'ordre
+                # décroissant des identifiants
+                source = ("history_fts JOIN history "
+                          "ON history.id = history_fts.rowid")
+                conditions.append("history_fts MATCH ?")
+                params.append(match)
+            elif query and not self.full_text:
+                conditions.append("(input LIKE ? ESCAPE '\\' "
+                                  "OR output LIKE ? ESCAPE '\\')")
+                params += [like_pattern(query)] * 2
+            if before_id is not None:
+                conditions.append(
+                    f"{'history_fts.rowid' if match else 'id'} < ?")
+                params.append(before_id)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            order = 'history_fts.rowid' if match else 'id'
+            rows = db.execute(
+                f"SELECT {columns} FROM {source} {where} "
+                f"ORDER BY {order} DESC LIMIT ?", (*params, limit)).fetchall()
+        return [{
+            'id': row[0],
+            'created_at': row[1],
+            'kind': row[2],
+            'model': row[3],
+            'params': json.loads(row[4]),
+            'preview': row[5],
+            'elapsed_ms': row[6]
+        } for row in rows]
+
+    def get(self, entry_id):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT id, created_at, kind, model, params, input, output, "
+                "elapsed_ms FROM history WHERE id = ?",
+                (entry_id, )).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'created_at': row[1],
+            'kind': row[2],
+            'model': row[3],
+            'params': json.loads(row[4]),
+            'input': row[5],
+            'output': row[6],
+            'elapsed_ms': row[7]
+        }
+
+    def delete(self, entry_id):
+        with self._lock:
+            db = self._connection()
+            db.execute("DELETE FROM history WHERE id = ?", (entry_id, ))
+            db.commit()
+
+    def clear(self):
+        with self._lock:
+            db = self._connection()
+            db.execute("DELETE FROM history")
+            db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
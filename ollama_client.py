@@ -0,0 +1,632 @@
+import json
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+from endpoints import EndpointPool
+from telemetry import make_entry
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancelToken:
+    # Jeton d'annulation partagé entre le thread GUI et le thread de travail
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback):
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self):
+        if self._cancelled:
+            raise Cancelled()
+
+
+# Compteurs renvoyés par Ollama dans le dernier message d'une génération, et
+# raison de la fin ("length" : limite num_predict atteinte)
+METRIC_FIELDS = ('total_duration', 'load_duration', 'prompt_eval_count',
+                 'prompt_eval_duration', 'eval_count', 'eval_duration',
+                 'done_reason')
+
+
+class Subscriber:
+    # Appelant rattaché à une génération partagée : reçoit les tokens déjà
+    # produits puis les suivants, et se réveille à la fin ou à l'annulation
+
+    def __init__(self, on_chunk, cancel_token):
+        self.on_chunk = on_chunk
+        self.cancel_token = cancel_token
+        self.wake = threading.Event()
+        self.error = None
+
+    def deliver(self, token):
+        if self.on_chunk is None or self.error is not None:
+            return
+        try:
+            self.on_chunk(token)
+        except Exception as e:
+            # Un rappel en échec détache cet appelant sans arrêter les autres
+            self.error = e
+            self.wake.set()
+
+
+class InFlight:
+    # Génération en cours partagée par tous les appels identiques : elle
+    # n'est interrompue que lorsque plus aucun appelant ne l'attend
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.chunks = []
+        self.subscribers = []
+        self.cancel_token = CancelToken()
+        self.done = False
+        self.result = None
+        self.error = None
+        self.metrics = None
+
+    def publish(self, token):
+        with self.lock:
+            self.chunks.append(token)
+            for subscriber in self.subscribers:
+                subscriber.deliver(token)
+
+    def finish(self, result=None, error=None):
+        with self.lock:
+            self.result = result
+            self.error = error
+            self.done = True
+            for subscriber in self.subscribers:
+                subscriber.wake.set()
+
+
+# Jeton d'annulation de la requête lancée par le thread courant : la
+# connexion prise dans le pool lui est rattachée avant l'envoi, pour pouvoir
+# être coupée avant même la réception des en-têtes (chargement du modèle,
+# évaluation du prompt)
+_pending = threading.local()
+
+
+@contextmanager
+def cancellable(cancel_token):
+    previous = getattr(_pending, 'cancel_token', None)
+    _pending.cancel_token = cancel_token
+    try:
+        yield
+    finally:
+        _pending.cancel_token = previous
+
+
+def shutdown_socket(sock):
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def claim_connection(conn):
+    token = getattr(_pending, 'cancel_token', None)
+    conn.cancel_token = token
+    if token is None:
+        return
+
+    def abort():
+        # La connexion a pu retourner au pool et servir une autre requête
+        if conn.cancel_token is token:
+            shutdown_socket(conn.sock)
+
+    token.on_cancel(abort)
+
+
+class CancellablePoolMixin:
+    # Pool urllib3 dont les connexions restent rattachées au jeton de la
+    # requête entre leur sortie et leur retour dans le pool
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        claim_connection(conn)
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn.cancel_token = None
+        super()._put_conn(conn)
+
+
+def make_adapter(pool_size):
+    from requests.adapters import HTTPAdapter
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    pool_classes = {
+        'http': type('CancellableHTTPConnectionPool',
+                     (CancellablePoolMixin, HTTPConnectionPool), {}),
+        'https': type('CancellableHTTPSConnectionPool',
+                      (CancellablePoolMixin, HTTPSConnectionPool), {})
+    }
+
+    class CancellableAdapter(HTTPAdapter):
+
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = pool_classes
+
+    return CancellableAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+
+
+def abort_response(response):
+    # Coupe la connexion pour débloquer une lecture en cours et arrêter la
+    # génération côté serveur
+    connection = getattr(response.raw, '_connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    response.close()
+
+
+def iter_stream(response):
+    # Le flux est lu jusqu'au bout pour que la connexion retourne au pool
+    for line in response.iter_lines():
+        if not line:
+            continue
+        data = json.loads(line)
+        if data.get('error'):
+            raise RuntimeError(data['error'])
+        yield data
+
+
+class OllamaClient:
+    # Client HTTP partagé : pool de connexions keep-alive, délais explicites
+    # et compteurs de latence par route
+
+    def __init__(self,
+                 base_url=config.DEFAULT_OLLAMA_URL,
+                 connect_timeout=config.CONNECT_TIMEOUT,
+                 read_timeout=config.READ_TIMEOUT,
+                 pool_size=config.POOL_SIZE,
+                 keep_alive=config.KEEP_ALIVE,
+                 extra_urls=()):
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+        # Affiche le temps au premier token et la durée de chaque génération
+        self.log_timings = True
+        # TelemetryStore recevant une mesure par génération (facultatif)
+        self.telemetry = None
+        # Les appels identiques (route, modèle, messages, options) lancés
+        # pendant qu'une génération est en cours s'y rattachent
+        self.coalesce = True
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        # Le premier serveur sert aux listes de modèles et au préchargement,
+        # les générations vont au moins chargé
+        self.endpoints = EndpointPool([base_url, *extra_urls],
+                                      probe=self.probe)
+
+    @property
+    def session(self):
+        # requests est long à importer : il n'est chargé qu'à la première
+        # requête, hors du chemin de démarrage
+        with self._session_lock:
+            if self._session is None:
+                import requests
+
+                session = requests.Session()
+                adapter = make_adapter(self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    @property
+    def base_url(self):
+        urls = self.endpoints.urls
+        return urls[0] if urls else ''
+
+    @base_url.setter
+    def base_url(self, url):
+        self.endpoints.set_urls([url, *self.endpoints.urls[1:]])
+
+    def set_urls(self, urls):
+        self.endpoints.set_urls(urls)
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def _keep_alive_value(self):
+        # Ollama accepte une durée ("30m") ou un nombre de secondes (-1 : sans
+        # limite)
+        try:
+            return int(self.keep_alive)
+        except (TypeError, ValueError):
+            return self.keep_alive
+
+    def _url(self, path, base_url=None):
+        return f"{(base_url or self.base_url).rstrip('/')}{path}"
+
+    def _path_stats(self, path):
+        return self._stats.setdefault(
+            path, {
+                'count': 0,
+                'errors': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'last_ms': 0.0,
+                'prompt_eval_count': 0,
+                'prompt_eval_ms': 0.0,
+                'coalesced': 0
+            })
+
+    def _record(self, path, elapsed, error=False, metrics=None):
+        with self._stats_lock:
+            stats = self._path_stats(path)
+            if metrics:
+                stats['prompt_eval_count'] += metrics.get(
+                    'prompt_eval_count', 0)
+                stats['prompt_eval_ms'] += metrics.get(
+                    'prompt_eval_duration', 0) / 1e6
+            elapsed_ms = elapsed * 1000
+            stats['count'] += 1
+            stats['errors'] += int(error)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['last_ms'] = elapsed_ms
+
+    def _record_coalesced(self, path):
+        with self._stats_lock:
+            self._path_stats(path)['coalesced'] += 1
+
+    def stats(self):
+        # coalesced : appels servis par une génération déjà en cours
+        with self._stats_lock:
+            return {
+                path: dict(values,
+                           avg_ms=values['total_ms'] / values['count']
+                           if values['count'] else 0.0)
+                for path, values in self._stats.items()
+            }
+
+    def close(self):
+        self.endpoints.close()
+        if self._session is not None:
+            self._session.close()
+
+    def generate(self,
+                 model,
+                 prompt,
+                 on_chunk=None,
+                 cancel_token=None,
+                 base_url=None,
+                 on_metrics=None,
+                 options=None,
+                 operation=None):
+        payload = {"model": model, "prompt": prompt}
+        if options:
+            payload["options"] = options
+        return self._stream('/api/generate', payload,
+                            lambda data: data.get('response', ''), on_chunk,
+                            cancel_token, base_url, on_metrics, operation)
+
+    def chat(self,
+             model,
+             messages,
+             on_chunk=None,
+             cancel_token=None,
+             base_url=None,
+             on_metrics=None,
+             options=None,
+             operation=None):
+        # Le modèle applique son propre gabarit aux messages : un message
+        # système identique d'un appel à l'autre permet à Ollama de réutiliser
+        # l'évaluation du préfixe
+        payload = {"model": model, "messages": messages}
+        if options:
+            payload["options"] = options
+        return self._stream(
+            '/api/chat', payload,
+            lambda data: (data.get('message') or {}).get('content', ''),
+            on_chunk, cancel_token, base_url, on_metrics, operation)
+
+    def _stream(self, path, payload, extract, on_chunk, cancel_token,
+                base_url, on_metrics, operation):
+        # operation ("reformulation", "traduction"...) sert à classer la
+        # mesure transmise à self.telemetry
+        if not self.coalesce:
+            return self._generate(path, payload, extract, on_chunk,
+                                  cancel_token, base_url, on_metrics,
+                                  operation)
+        cancel_token = cancel_token or CancelToken()
+        cancel_token.raise_if_cancelled()
+        key = (path, base_url, json.dumps(payload, sort_keys=True))
+        subscriber = Subscriber(on_chunk, cancel_token)
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            joined = flight is not None
+            if not joined:
+                flight = self._flights[key] = InFlight()
+            with flight.lock:
+                # Rattrapage du début du flux avant les tokens suivants
+                for token in flight.chunks:
+                    subscriber.deliver(token)
+                flight.subscribers.append(subscriber)
+        if joined:
+            self._record_coalesced(path)
+            if self.log_timings:
+                print("Génération identique en cours : résultat partagé")
+        else:
+            # La génération tourne dans son propre thread : un appelant qui
+            # annule n'interrompt pas celle des autres
+            threading.Thread(target=self._run_flight,
+                             args=(key, flight, path, payload, extract,
+                                   base_url, operation),
+                             daemon=True).start()
+        cancel_token.on_cancel(subscriber.wake.set)
+        subscriber.wake.wait()
+
+        with self._flights_lock, flight.lock:
+            if subscriber in flight.subscribers:
+                flight.subscribers.remove(subscriber)
+            abandoned = not flight.done and not flight.subscribers
+            if abandoned and self._flights.get(key) is flight:
+                del self._flights[key]
+        if abandoned:
+            flight.cancel_token.cancel()
+        if subscriber.error is not None:
+            raise subscriber.error
+        cancel_token.raise_if_cancelled()
+        if flight.error is not None:
+            raise flight.error
+        if on_metrics is not None and flight.metrics:
+            on_metrics(flight.metrics)
+        return flight.result
+
+    def _run_flight(self, key, flight, path, payload, extract, base_url,
+                    operation):
+        result = error = None
+        try:
+            result = self._generate(
+                path, payload, extract, flight.publish, flight.cancel_token,
+                base_url, lambda metrics: setattr(flight, 'metrics', metrics),
+                operation)
+        except Exception as e:
+            error = e
+        finally:
+            # Les appels suivants relancent une génération (ou lisent le
+            # cache) plutôt que de recevoir ce résultat
+            with self._flights_lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.finish(result, error)
+
+    def _generate(self, path, payload, extract, on_chunk, cancel_token,
+                  base_url, on_metrics, operation):
+        if base_url is not None:
+            return self._stream_from(base_url, path, payload, extract,
+                                     on_chunk, cancel_token, on_metrics,
+                                     operation)
+        # Serveur le moins chargé, puis un autre en cas d'échec tant
+        # qu'aucun token n'a été transmis
+        cancel_token = cancel_token or CancelToken()
+        tried = []
+        streamed = []
+
+        def forward(token):
+            streamed.append(True)
+            if on_chunk is not None:
+                on_chunk(token)
+
+        while True:
+            endpoint = self.endpoints.acquire(payload['model'], exclude=tried)
+            if endpoint is None:
+                raise RuntimeError("Aucun serveur Ollama configuré")
+            tried.append(endpoint.url)
+            start = time.perf_counter()
+            try:
+                result = self._stream_from(endpoint.url, path, payload,
+                                           extract, forward, cancel_token,
+                                           on_metrics, operation)
+            except Cancelled:
+                self.endpoints.release(endpoint, time.perf_counter() - start)
+                raise
+            except Exception as e:
+                self.endpoints.release(endpoint,
+                                       time.perf_counter() - start,
+                                       error=e)
+                if streamed or len(tried) >= len(self.endpoints.urls):
+                    raise
+                print(f"Échec sur {endpoint.url} ({e}), "
+                      f"nouvel essai sur un autre serveur")
+                continue
+            self.endpoints.release(endpoint, time.perf_counter() - start)
+            return result
+
+    def _stream_from(self, base_url, path, payload, extract, on_chunk,
+                     cancel_token, on_metrics, operation=None):
+        # La requête est toujours envoyée en streaming : l'annulation peut
+        # ainsi interrompre la génération à tout moment
+        cancel_token = cancel_token or CancelToken()
+        cancel_token.raise_if_cancelled()
+        if self.log_timings and payload.get('options'):
+            print("Options : " + ", ".join(
+                f"{key}={value}"
+                for key, value in payload['options'].items()))
+        start = time.perf_counter()
+        first_token_at = None
+        chunks = []
+        metrics = None
+        failed = True
+        try:
+            # Annulable dès l'envoi : Ollama n'envoie les en-têtes qu'avec le
+            # premier token, après le chargement et l'évaluation du prompt
+            with cancellable(cancel_token):
+                response = self.session.post(
+                    self._url(path, base_url),
+                    json=dict(payload,
+                              stream=True,
+                              keep_alive=self._keep_alive_value()),
+                    stream=True,
+                    timeout=self.timeout)
+            cancel_token.on_cancel(lambda: abort_response(response))
+            try:
+                response.raise_for_status()
+                for data in iter_stream(response):
+                    token = extract(data)
+                    if token:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            if self.log_timings:
+                                print(f"Premier token après "
+                                      f"{(first_token_at - start) * 1000:.0f}"
+                                      f" ms")
+                        chunks.append(token)
+                        if on_chunk is not None:
+                            on_chunk(token)
+                    if data.get('done'):
+                        metrics = {
+                            key: data[key]
+                            for key in METRIC_FIELDS if key in data
+                        }
+            finally:
+                response.close()
+            failed = False
+        except Exception:
+            cancel_token.raise_if_cancelled()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self._record(path, elapsed, failed
+                         and not cancel_token.cancelled, metrics)
+            if self.telemetry is not None:
+                status = 'erreur' if failed else 'ok'
+                if cancel_token.cancelled:
+                    status = 'annulée'
+                self.telemetry.record(
+                    make_entry(operation,
+                               payload['model'],
+                               base_url,
+                               status,
+                               elapsed,
+                               first_token_at - start
+                               if first_token_at is not None else None,
+                               metrics,
+                               payload.get('options')))
+        cancel_token.raise_if_cancelled()
+        if self.log_timings:
+            print(f"Génération terminée en "
+                  f"{(time.perf_counter() - start) * 1000:.0f} ms")
+            if metrics and 'prompt_eval_count' in metrics:
+                print(f"Prompt évalué : {metrics['prompt_eval_count']} "
+                      f"tokens en "
+                      f"{metrics.get('prompt_eval_duration', 0) / 1e6:.0f} "
+                      f"ms")
+            if metrics and metrics.get('done_reason') == 'length':
+                print(f"Réponse coupée à {metrics.get('eval_count')} tokens "
+                      f"(num_predict)")
+        if on_metrics is not None and metrics:
+            on_metrics(metrics)
+        return ''.join(chunks)
+
+    def preload(self, model, cancel_token=None, base_url=None, options=None):
+        # Une requête sans prompt charge le modèle et le garde en mémoire
+        # pendant keep_alive. Avec le num_ctx des requêtes suivantes, le
+        # modèle n'a pas à être rechargé à la première demande.
+        cancel_token = cancel_token or CancelToken()
+        cancel_token.raise_if_cancelled()
+        start = time.perf_counter()
+        failed = True
+        payload = {"model": model, "keep_alive": self._keep_alive_value()}
+        if options:
+            payload["options"] = options
+        try:
+            # Un chargement bloqué ne doit pas retenir la fermeture de
+            # l'application : l'annulation coupe la connexion
+            with cancellable(cancel_token):
+                response = self.session.post(self._url(
+                    '/api/generate', base_url),
+                                             json=payload,
+                                             timeout=self.timeout)
+            response.raise_for_status()
+            failed = False
+        except Exception:
+            cancel_token.raise_if_cancelled()
+            raise
+        finally:
+            self._record('/api/generate (préchargement)',
+                         time.perf_counter() - start, failed
+                         and not cancel_token.cancelled)
+        cancel_token.raise_if_cancelled()
+
+    def probe(self, url):
+        # Sonde de santé d'un serveur : version, modèles chargés en mémoire
+        # et modèles installés
+        timeout = (self.connect_timeout, config.PROBE_TIMEOUT)
+        version = self.session.get(self._url('/api/version', url),
+                                   timeout=timeout)
+        version.raise_for_status()
+        running = self.session.get(self._url('/api/ps', url), timeout=timeout)
+        running.raise_for_status()
+        tags = self.session.get(self._url('/api/tags', url), timeout=timeout)
+        tags.raise_for_status()
+        return {
+            'version': version.json().get('version'),
+            'loaded': [m['name'] for m in running.json().get('models', [])],
+            'models': [m['name'] for m in tags.json().get('models', [])]
+        }
+
+    def list_models(self, cancel_token=None, base_url=None):
+        cancel_token = cancel_token or CancelToken()
+        cancel_token.raise_if_cancelled()
+        start = time.perf_counter()
+        failed = True
+        try:
+            # « Annuler » coupe la requête au lieu d'attendre sa réponse
+            with cancellable(cancel_token):
+                response = self.session.get(self._url('/api/tags', base_url),
+                                            timeout=self.timeout)
+            response.raise_for_status()
+            models = response.json().get('models', [])
+            failed = False
+        except Exception:
+            cancel_token.raise_if_cancelled()
+            raise
+        finally:
+            self._record('/api/tags', time.perf_counter() - start, failed
+                         and not cancel_token.cancelled)
+        cancel_token.raise_if_cancelled()
+        return models
@@ -0,0 +1,455 @@
+import argparse
+import json
+import queue
+import select
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+import core
+from cache import ResultCache
+from chunking import estimate_tokens
+from cleaning import validate_patterns
+from ollama_client import CancelToken, Cancelled, OllamaClient
+from telemetry import TelemetryStore, percentile
+
+# Mode serveur sans interface graphique : /reformulate et /translate en JSON
+# (réponse complète ou flux NDJSON), derrière une file d'attente bornée et
+# un nombre fixe de workers, et /metrics pour la supervision
+#   python server.py [--port 3000] [--workers 4] [--queue-size 32]
+
+# Types attendus des champs facultatifs du corps JSON
+STRING_FIELDS = ('model', 'system_prompt', 'tone', 'format', 'length',
+                 'target_lang')
+BOOLEAN_FIELDS = ('stream', 'no_cache', 'document')
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    # Une demande en attente ou en cours : le worker publie les événements
+    # (tokens, parties, résultat final) que le handler HTTP relaie
+
+    def __init__(self, kind, params, stream):
+        self.kind = kind
+        self.params = params
+        self.stream = stream
+        self.cancel_token = CancelToken()
+        self.events = queue.Queue()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.created_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+
+    def emit(self, event):
+        if self.stream:
+            self.events.put(event)
+
+
+class ReformulationService:
+
+    def __init__(self,
+                 client,
+                 cache=None,
+                 workers=config.SERVER_WORKERS,
+                 queue_size=config.SERVER_QUEUE_SIZE,
+                 model=config.DEFAULT_MODEL,
+                 system_prompt=core.DEFAULT_SYSTEM_PROMPT):
+        self.client = client
+        self.cache = cache
+        self.model = model
+        self.system_prompt = system_prompt
+        self.workers = workers
+        # Au-delà de queue_size demandes en attente, les suivantes sont
+        # refusées (503) au lieu de s'accumuler devant Ollama
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._counters = {
+            'accepted': 0,
+            'rejected': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0
+        }
+        self._running = set()
+        # (type, attente en file, durée totale) des dernières demandes
+        self._latencies = deque(maxlen=config.TELEMETRY_ENTRIES)
+        self._threads = [
+            threading.Thread(target=self._run_worker,
+                             name=f"server-worker-{index}",
+                             daemon=True) for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job):
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._counters['rejected'] += 1
+            raise QueueFull()
+        with self._lock:
+            self._counters['accepted'] += 1
+
+    def _run_worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            with self._lock:
+                self._running.add(job)
+            try:
+                self._run_job(job)
+            finally:
+                with self._lock:
+                    self._running.discard(job)
+
+    def _run_job(self, job):
+        job.started_at = time.perf_counter()
+        outcome = 'completed'
+        try:
+            # Client parti pendant l'attente : rien n'est envoyé à Ollama
+            job.cancel_token.raise_if_cancelled()
+            if job.kind == 'reformulate':
+                job.result = self._reformulate(job)
+            else:
+                job.result = self._translate(job)
+        except Cancelled:
+            outcome = 'cancelled'
+            job.error = "demande annulée"
+        except Exception as e:
+            outcome = 'failed'
+            job.error = str(e)
+        job.finished_at = time.perf_counter()
+        with self._lock:
+            self._counters[outcome] += 1
+            self._latencies.append(
+                (job.kind, (job.started_at - job.created_at) * 1000,
+                 (job.finished_at - job.created_at) * 1000))
+        if job.error is not None:
+            job.emit({'error': job.error})
+        else:
+            job.emit(dict(self.describe(job), done=True))
+        job.emit(None)
+        job.done.set()
+
+    def _reformulate(self, job):
+        params = job.params
+        text = params['text']
+        arguments = dict(cache=self.cache,
+                         read_cache=not params.get('no_cache', False),
+                         cancel_token=job.cancel_token,
+                         cleanup_patterns=params.get('cleanup_patterns'),
+                         stop=params.get('stop'))
+        model = params.get('model') or self.model
+        system_prompt = params.get('system_prompt') or self.system_prompt
+        tone = params.get('tone') or core.TONES[0]
+        text_format = params.get('format') or core.FORMATS[0]
+        length = params.get('length') or core.LENGTHS[0]
+        # Même seuil que la fenêtre principale pour le découpage
+        if (params.get('document')
+                or estimate_tokens(text) > config.LONG_DOCUMENT_TOKENS):
+            return core.reformulate_document(
+                self.client,
+                model,
+                system_prompt,
+                text,
+                tone,
+                text_format,
+                length,
+                on_part=lambda index, part, total: job.emit({
+                    'part': index,
+                    'total': total,
+                    'text': part
+                }),
+                **arguments)
+        return core.reformulate(
+            self.client,
+            model,
+            system_prompt,
+            text,
+            tone,
+            text_format,
+            length,
+            on_chunk=lambda token: job.emit({'token': token}),
+            **arguments)
+
+    def _translate(self, job):
+        params = job.params
+        return core.translate(
+            self.client,
+            params.get('model') or self.model,
+            params['text'],
+            params['target_lang'],
+            cache=self.cache,
+            read_cache=not params.get('no_cache', False),
+            on_chunk=lambda token: job.emit({'token': token}),
+            cancel_token=job.cancel_token)
+
+    def describe(self, job):
+        return {
+            'output': job.result,
+            # Réponse coupée par la limite de longueur (non mise en cache)
+            'truncated': core.is_truncated(job.result),
+            'model': job.params.get('model') or self.model,
+            'queue_ms': round((job.started_at - job.created_at) * 1000, 1),
+            'elapsed_ms': round((job.finished_at - job.created_at) * 1000, 1)
+        }
+
+    def metrics(self):
+        with self._lock:
+            counters = dict(self._counters)
+            active = len(self._running)
+            latencies = list(self._latencies)
+        by_kind = {}
+        for kind, wait_ms, total_ms in latencies:
+            entry = by_kind.setdefault(kind, {'wait': [], 'total': []})
+            entry['wait'].append(round(wait_ms, 1))
+            entry['total'].append(round(total_ms, 1))
+        return {
+            'queue': {
+                'depth': self.jobs.qsize(),
+                'capacity': self.jobs.maxsize,
+                'active': active,
+                'workers': self.workers
+            },
+            'requests': counters,
+            'latency_ms': {
+                kind: {
+                    'count': len(values['total']),
+                    'queue_p50': percentile(values['wait'], 0.5),
+                    'queue_p95': percentile(values['wait'], 0.95),
+                    'total_p50': percentile(values['total'], 0.5),
+                    'total_p95': percentile(values['total'], 0.95)
+                }
+                for kind, values in by_kind.items()
+            },
+            'ollama': self.client.stats(),
+            'generations': (self.client.telemetry.summary()
+                            if self.client.telemetry is not None else []),
+            'endpoints': self.client.endpoints.stats(),
+            'cache': self.cache.stats() if self.cache is not None else None
+        }
+
+    def close(self):
+        # Les demandes en attente sont abandonnées, celles en cours annulées
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.cancel_token.cancel()
+                self._run_job(job)
+        with self._lock:
+            running = list(self._running)
+        for job in running:
+            job.cancel_token.cancel()
+        for _ in self._threads:
+            self.jobs.put(None)
+        self.client.close()
+
+
+def parse_job(kind, body):
+    # Renvoie (params, flux demandé) ou lève ValueError
+    if not isinstance(body, dict):
+        raise ValueError("le corps doit être un objet JSON")
+    text = body.get('text')
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("champ 'text' manquant ou vide")
+    params = dict(body, text=text.strip())
+    # Un mauvais type irait jusqu'au prompt ("false" serait vrai, etc.)
+    for field in STRING_FIELDS:
+        value = body.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"'{field}' doit être une chaîne")
+    for field in BOOLEAN_FIELDS:
+        if not isinstance(body.get(field, False), bool):
+            raise ValueError(f"'{field}' doit être un booléen")
+    if kind == 'translate' and not body.get('target_lang'):
+        raise ValueError("champ 'target_lang' manquant")
+    for field in ('cleanup_patterns', 'stop'):
+        value = body.get(field)
+        if value is not None and (not isinstance(value, list) or not all(
+                isinstance(item, str) for item in value)):
+            raise ValueError(f"'{field}' doit être une liste de chaînes")
+    # Une expression invalide est refusée ici plutôt que d'occuper un worker
+    error = validate_patterns(body.get('cleanup_patterns') or [])
+    if error is not None:
+        raise ValueError(f"expression de nettoyage invalide : {error}")
+    return params, body.get('stream', False)
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server_version = "TextRefineQt"
+    routes = {'/reformulate': 'reformulate', '/translate': 'translate'}
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def _send_json(self, payload, status=200, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send_json(self.service.metrics())
+        elif self.path == '/health':
+            self._send_json({'status': 'ok'})
+        else:
+            self._send_json({'error': 'route inconnue'}, 404)
+
+    def do_POST(self):
+        kind = self.routes.get(self.path)
+        if kind is None:
+            self._send_json({'error': 'route inconnue'}, 404)
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            params, stream = parse_job(kind, body)
+        except ValueError as e:
+            self._send_json({'error': str(e)}, 400)
+            return
+
+        job = Job(kind, params, stream)
+        try:
+            self.service.submit(job)
+        except QueueFull:
+            self._send_json({'error': "file d'attente pleine"},
+                            503,
+                            headers={'Retry-After': '1'})
+            return
+        if stream:
+            self._stream_job(job)
+            return
+        # Client parti avant la réponse : la génération est arrêtée pour
+        # libérer le worker et Ollama
+        while not job.done.wait(0.1):
+            if self._client_gone():
+                job.cancel_token.cancel()
+                return
+        if job.error is not None:
+            self._send_json({'error': job.error}, 502)
+        else:
+            self._send_json(self.service.describe(job))
+
+    def _client_gone(self):
+        # Connexion lisible sans données : le client l'a fermée
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return bool(readable) and not self.connection.recv(
+                1, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+    def _stream_job(self, job):
+        # Une ligne JSON par événement, connexion fermée à la fin
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        try:
+            while True:
+                event = job.events.get()
+                if event is None:
+                    break
+                self.wfile.write(
+                    json.dumps(event, ensure_ascii=False).encode('utf-8') +
+                    b'\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client parti : la génération est arrêtée côté Ollama
+            job.cancel_token.cancel()
+
+
+class ReformulationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, RequestHandler)
+        self.service = service
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serveur HTTP de reformulation et de traduction")
+    parser.add_argument('--host', default=config.SERVER_HOST)
+    parser.add_argument('--port', type=int, default=config.SERVER_PORT)
+    parser.add_argument('--workers',
+                        type=int,
+                        default=config.SERVER_WORKERS,
+                        help="demandes traitées simultanément")
+    parser.add_argument('--queue-size',
+                        type=int,
+                        default=config.SERVER_QUEUE_SIZE,
+                        help="demandes en attente avant refus (503)")
+    parser.add_argument('--model', default=config.DEFAULT_MODEL)
+    parser.add_argument('--url', default=config.DEFAULT_OLLAMA_URL)
+    parser.add_argument('--extra-url',
+                        action='append',
+                        default=list(config.EXTRA_OLLAMA_URLS),
+                        help="serveur Ollama supplémentaire (répétable)")
+    parser.add_argument('--system-prompt-file',
+                        help="fichier contenant le prompt système")
+    parser.add_argument('--no-cache',
+                        action='store_true',
+                        help="ne pas utiliser le cache des résultats")
+    args = parser.parse_args(argv)
+    args.system_prompt = core.DEFAULT_SYSTEM_PROMPT
+    if args.system_prompt_file:
+        with open(args.system_prompt_file, encoding='utf-8') as f:
+            args.system_prompt = f.read()
+    return args
+
+
+def create_server(args):
+    client = OllamaClient(args.url,
+                          pool_size=max(config.POOL_SIZE, args.workers),
+                          extra_urls=args.extra_url)
+    client.log_timings = False
+    client.telemetry = TelemetryStore()
+    service = ReformulationService(
+        client,
+        cache=None if args.no_cache else ResultCache(),
+        workers=args.workers,
+        queue_size=args.queue_size,
+        model=args.model,
+        system_prompt=args.system_prompt)
+    return ReformulationServer((args.host, args.port), service)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = create_server(args)
+    print(f"Serveur prêt sur http://{args.host}:{server.server_port} "
+          f"({args.workers} workers, file de {args.queue_size})",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Arrêt du serveur", file=sys.stderr)
+    finally:
+        server.server_close()
+        server.service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+import config
+
+# Mesures de chaque génération (compteurs d'Ollama et temps côté client),
+# conservées en mémoire sur une fenêtre glissante pour comparer les modèles
+
+# Colonnes d'une mesure, dans l'ordre de l'export CSV
+FIELDS = ('timestamp', 'operation', 'model', 'endpoint', 'status',
+          'round_trip_ms', 'first_token_ms', 'total_ms', 'load_ms',
+          'prompt_eval_count', 'prompt_eval_ms', 'eval_count', 'eval_ms',
+          'tokens_per_s', 'prompt_tokens_per_s', 'done_reason', 'num_predict',
+          'num_ctx', 'options')
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction *
+                                               (len(ordered) - 1))))
+    return ordered[index]
+
+
+def rate(count, duration_ns):
+    if not count or not duration_ns:
+        return None
+    return count / (duration_ns / 1e9)
+
+
+def make_entry(operation,
+               model,
+               endpoint,
+               status,
+               round_trip,
+               first_token=None,
+               metrics=None,
+               options=None):
+    # round_trip et first_token en secondes, metrics tel que renvoyé par
+    # Ollama (durées en nanosecondes)
+    metrics = metrics or {}
+
+    def ms(key):
+        value = metrics.get(key)
+        return round(value / 1e6, 2) if value is not None else None
+
+    tokens_per_s = rate(metrics.get('eval_count'),
+                        metrics.get('eval_duration'))
+    prompt_tokens_per_s = rate(metrics.get('prompt_eval_count'),
+                               metrics.get('prompt_eval_duration'))
+    options = options or {}
+    return {
+        'timestamp': time.time(),
+        'operation': operation or 'autre',
+        'model': model,
+        'endpoint': endpoint,
+        'status': status,
+        'round_trip_ms': round(round_trip * 1000, 2),
+        'first_token_ms': (round(first_token * 1000, 2)
+                           if first_token is not None else None),
+        'total_ms': ms('total_duration'),
+        'load_ms': ms('load_duration'),
+        'prompt_eval_count': metrics.get('prompt_eval_count'),
+        'prompt_eval_ms': ms('prompt_eval_duration'),
+        'eval_count': metrics.get('eval_count'),
+        'eval_ms': ms('eval_duration'),
+        'tokens_per_s': (round(tokens_per_s, 2)
+                         if tokens_per_s is not None else None),
+        'prompt_tokens_per_s': (round(prompt_tokens_per_s, 2)
+                                if prompt_tokens_per_s is not None else None),
+        'done_reason': metrics.get('done_reason'),
+        'num_predict': options.get('num_predict'),
+        'num_ctx': options.get('num_ctx'),
+        'options': dict(options) or None
+    }
+
+
+class TelemetryStore:
+    # Partagé entre les threads de travail (ajouts) et le thread GUI
+    # (lecture) : les mesures les plus anciennes sortent de la fenêtre
+
+    def __init__(self, max_entries=config.TELEMETRY_ENTRIES):
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self._entries = deque(maxlen=max_entries)
+        # Incrémenté à chaque ajout : le panneau ne recalcule que si besoin
+        self.version = 0
+
+    def record(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            self.version += 1
+
+    def entries(self):
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.version += 1
+
+    def summary(self):
+        groups = {}
+        for entry in self.entries():
+            groups.setdefault((entry['model'], entry['operation']),
+                              []).append(entry)
+        rows = []
+        for (model, operation), entries in sorted(groups.items()):
+            # Les générations annulées ou en erreur ne faussent pas les
+            # latences
+            done = [entry for entry in entries if entry['status'] == 'ok']
+            eval_count = sum(entry['eval_count'] or 0 for entry in done)
+            eval_ms = sum(entry['eval_ms'] or 0 for entry in done)
+            first_tokens = [
+                entry['first_token_ms'] for entry in done
+                if entry['first_token_ms'] is not None
+            ]
+            round_trips = [entry['round_trip_ms'] for entry in done]
+            loads = [
+                entry['load_ms'] for entry in done
+                if entry['load_ms'] is not None
+            ]
+            contexts = sorted({
+                entry['num_ctx'] for entry in entries
+                if entry.get('num_ctx') is not None
+            })
+            rows.append({
+                'model': model,
+                'operation': operation,
+                'count': len(entries),
+                'errors': sum(entry['status'] == 'erreur'
+                              for entry in entries),
+                # Débit global : tokens générés sur le temps de génération
+                'tokens_per_s': (round(eval_count / (eval_ms / 1000), 1)
+                                 if eval_ms else None),
+                'first_token_p50_ms': percentile(first_tokens, 0.5),
+                'first_token_p95_ms': percentile(first_tokens, 0.95),
+                'round_trip_p50_ms': percentile(round_trips, 0.5),
+                'round_trip_p95_ms': percentile(round_trips, 0.95),
+                'load_ms': (round(sum(loads) / len(loads), 1)
+                            if loads else None),
+                # Réponses coupées par num_predict : limite trop basse
+                'truncated': sum(entry.get('done_reason') == 'length'
+                                 for entry in done),
+                'num_ctx': ', '.join(str(size) for size in contexts) or None
+            })
+        return rows
+
+    def export_csv(self, path):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            for entry in self.entries():
+                writer.writerow(
+                    dict(entry,
+                         timestamp=time.strftime(
+                             '%Y-%m-%dT%H:%M:%S',
+                             time.localtime(entry['timestamp'])),
+                         options=json.dumps(entry['options'],
+                                            ensure_ascii=False)
+                         if entry['options'] else ''))
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'summary': self.summary(),
+                'entries': self.entries()
+            },
+                      f,
+                      indent=2,
+                      ensure_ascii=False)
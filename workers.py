@@ -0,0 +1,75 @@
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from ollama_client import CancelToken, Cancelled
+
+# Références vers les threads en cours pour éviter leur destruction prématurée
+_running_workers = set()
+
+
+class RequestWorker(QThread):
+    # Exécute task(cancel_token, emit_progress) hors du thread GUI ; les
+    # résultats reviennent aux widgets par signaux
+    progress = pyqtSignal(object)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, task, parent=None):
+        super().__init__(parent)
+        self.task = task
+        self.cancel_token = CancelToken()
+        self.started_at = None
+        self.finished.connect(self._release)
+
+    def start(self):
+        _running_workers.add(self)
+        self.started_at = time.perf_counter()
+        super().start()
+
+    def elapsed_ms(self):
+        if self.started_at is None:
+            return None
+        return round((time.perf_counter() - self.started_at) * 1000, 1)
+
+    def run(self):
+        try:
+            result = self.task(self.cancel_token, self.progress.emit)
+        except Cancelled:
+            self.cancelled.emit()
+            return
+        except Exception as e:
+            if self.cancel_token.cancelled:
+                self.cancelled.emit()
+            else:
+                self.failed.emit(str(e))
+            return
+        if self.cancel_token.cancelled:
+            self.cancelled.emit()
+        else:
+            self.succeeded.emit(result)
+
+    def cancel(self):
+        self.cancel_token.cancel()
+
+    def _release(self):
+        self.wait()
+        _running_workers.discard(self)
+
+
+def cancel_all_workers():
+    for worker in list(_running_workers):
+        worker.cancel()
+    for worker in list(_running_workers):
+        worker.wait()
+
+
+def if_current(owner, worker, slot):
+    # Un travail remplacé peut encore avoir des signaux en file d'attente :
+    # ils ne sont transmis que si worker est toujours owner.worker
+    def forward(*args):
+        if owner.worker is worker:
+            slot(*args)
+
+    return forward